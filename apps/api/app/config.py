@@ -8,7 +8,64 @@ class Settings(BaseModel):
     env: str = os.getenv("WATCHDOG_ENV", "dev")
     database_url: str = os.getenv("WATCHDOG_DATABASE_URL", "sqlite:///./data/watchdog.db")
     monitor_interval_sec: int = int(os.getenv("WATCHDOG_MONITOR_INTERVAL_SEC", "15"))
+    monitor_min_interval_sec: int = int(os.getenv("WATCHDOG_MONITOR_MIN_INTERVAL_SEC", "5"))
+    monitor_max_interval_sec: int = int(os.getenv("WATCHDOG_MONITOR_MAX_INTERVAL_SEC", "300"))
+    monitor_jitter: float = float(os.getenv("WATCHDOG_MONITOR_JITTER", "0.1"))
+    monitor_incremental: bool = (
+        os.getenv("WATCHDOG_MONITOR_INCREMENTAL", "false").lower() == "true"
+    )
+    monitor_streaming: bool = os.getenv("WATCHDOG_MONITOR_STREAMING", "false").lower() == "true"
     synthetics_interval_sec: int = int(os.getenv("WATCHDOG_SYNTHETICS_INTERVAL_SEC", "30"))
+    sqlite_tuning_enabled: bool = os.getenv("WATCHDOG_SQLITE_TUNING", "true").lower() == "true"
+    sqlite_journal_mode: str = os.getenv("WATCHDOG_SQLITE_JOURNAL_MODE", "WAL")
+    sqlite_synchronous: str = os.getenv("WATCHDOG_SQLITE_SYNCHRONOUS", "NORMAL")
+    sqlite_mmap_size: int = int(os.getenv("WATCHDOG_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    sqlite_cache_size_kib: int = int(os.getenv("WATCHDOG_SQLITE_CACHE_SIZE_KIB", "65536"))
+    sqlite_busy_timeout_ms: int = int(os.getenv("WATCHDOG_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    db_read_pool_size: int = int(os.getenv("WATCHDOG_DB_READ_POOL_SIZE", "4"))
+    ingest_bulk_insert: bool = os.getenv("WATCHDOG_INGEST_BULK_INSERT", "true").lower() == "true"
+    ingest_queue_enabled: bool = (
+        os.getenv("WATCHDOG_INGEST_QUEUE_ENABLED", "true").lower() == "true"
+    )
+    ingest_queue_size: int = int(os.getenv("WATCHDOG_INGEST_QUEUE_SIZE", "1000"))
+    ingest_group_commit_batches: int = int(os.getenv("WATCHDOG_INGEST_GROUP_COMMIT_BATCHES", "64"))
+    ingest_group_commit_rows: int = int(os.getenv("WATCHDOG_INGEST_GROUP_COMMIT_ROWS", "50000"))
+    ingest_flush_interval_ms: int = int(os.getenv("WATCHDOG_INGEST_FLUSH_INTERVAL_MS", "50"))
+    ingest_retry_after_sec: int = int(os.getenv("WATCHDOG_INGEST_RETRY_AFTER_SEC", "1"))
+    series_cache_size: int = int(os.getenv("WATCHDOG_SERIES_CACHE_SIZE", "100000"))
+    metric_rollups_enabled: bool = (
+        os.getenv("WATCHDOG_METRIC_ROLLUPS_ENABLED", "true").lower() == "true"
+    )
+    rollup_min_buckets: int = int(os.getenv("WATCHDOG_ROLLUP_MIN_BUCKETS", "60"))
+    stream_chunk_rows: int = int(os.getenv("WATCHDOG_STREAM_CHUNK_ROWS", "1000"))
+    partitioning: str = os.getenv("WATCHDOG_PARTITIONING", "none")
+    metric_store: str = os.getenv("WATCHDOG_METRIC_STORE", "sql")
+    segment_dir: str = os.getenv("WATCHDOG_SEGMENT_DIR", "./data/segments")
+    segment_seal_after_sec: int = int(os.getenv("WATCHDOG_SEGMENT_SEAL_AFTER_SEC", "300"))
+    segment_seal_interval_sec: int = int(os.getenv("WATCHDOG_SEGMENT_SEAL_INTERVAL_SEC", "60"))
+    # opt-in: once enabled, the compactor deletes telemetry older than the windows below
+    retention_enabled: bool = os.getenv("WATCHDOG_RETENTION_ENABLED", "false").lower() == "true"
+    retention_interval_sec: int = int(os.getenv("WATCHDOG_RETENTION_INTERVAL_SEC", "300"))
+    retention_chunk_rows: int = int(os.getenv("WATCHDOG_RETENTION_CHUNK_ROWS", "5000"))
+    retention_metric_days: int = int(os.getenv("WATCHDOG_RETENTION_METRIC_DAYS", "7"))
+    retention_rollup_1m_days: int = int(os.getenv("WATCHDOG_RETENTION_ROLLUP_1M_DAYS", "14"))
+    retention_rollup_1h_days: int = int(os.getenv("WATCHDOG_RETENTION_ROLLUP_1H_DAYS", "90"))
+    retention_rollup_1d_days: int = int(os.getenv("WATCHDOG_RETENTION_ROLLUP_1D_DAYS", "730"))
+    retention_log_days: int = int(os.getenv("WATCHDOG_RETENTION_LOG_DAYS", "3"))
+    retention_span_days: int = int(os.getenv("WATCHDOG_RETENTION_SPAN_DAYS", "7"))
+    retention_synthetic_days: int = int(os.getenv("WATCHDOG_RETENTION_SYNTHETIC_DAYS", "30"))
+    dogstatsd_udp_enabled: bool = (
+        os.getenv("WATCHDOG_DOGSTATSD_UDP_ENABLED", "false").lower() == "true"
+    )
+    dogstatsd_host: str = os.getenv("WATCHDOG_DOGSTATSD_HOST", "0.0.0.0")
+    dogstatsd_port: int = int(os.getenv("WATCHDOG_DOGSTATSD_PORT", "8125"))
+    dogstatsd_aggregate: bool = os.getenv("WATCHDOG_DOGSTATSD_AGGREGATE", "true").lower() == "true"
+    dogstatsd_max_reported_errors: int = (
+        int(os.getenv("WATCHDOG_DOGSTATSD_MAX_REPORTED_ERRORS", "10"))
+    )
+    dogstatsd_flush_interval_sec: int = (
+        int(os.getenv("WATCHDOG_DOGSTATSD_FLUSH_INTERVAL_SEC", "10"))
+    )
 
 
 @lru_cache
@@ -1,12 +1,59 @@
 from contextlib import contextmanager
 from pathlib import Path
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from sqlmodel import Session, SQLModel, create_engine
 
-from .config import get_settings
+from .config import Settings, get_settings
 
 
 settings = get_settings()
-engine = create_engine(settings.database_url, echo=False)
+
+
+def is_sqlite_file(url: str) -> bool:
+    return url.startswith("sqlite:///") and ":memory:" not in url
+
+
+def sqlite_pragmas(settings: Settings) -> list[str]:
+    return [
+        f"PRAGMA journal_mode={settings.sqlite_journal_mode}",
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA mmap_size={settings.sqlite_mmap_size}",
+        f"PRAGMA cache_size=-{settings.sqlite_cache_size_kib}",
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def _on_connect(engine: Engine, pragmas: list[str]) -> None:
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, _record) -> None:
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def build_engines(settings: Settings) -> tuple[Engine, Engine]:
+    url = settings.database_url
+    if not (settings.sqlite_tuning_enabled and is_sqlite_file(url)):
+        engine = create_engine(url, echo=False)
+        return engine, engine
+    # SQLite allows a single writer: serialize writes through one connection and
+    # serve queries from a separate pool of read-only connections (WAL readers
+    # do not block behind the writer).
+    pragmas = sqlite_pragmas(settings)
+    write_engine = create_engine(url, echo=False, pool_size=1, max_overflow=0)
+    read_engine = create_engine(
+        url, echo=False, pool_size=settings.db_read_pool_size, max_overflow=0
+    )
+    _on_connect(write_engine, pragmas)
+    _on_connect(read_engine, [*pragmas, "PRAGMA query_only=ON"])
+    return write_engine, read_engine
+
+
+engine, read_engine = build_engines(settings)
 
 
 def init_db() -> None:
@@ -19,3 +66,9 @@ def init_db() -> None:
 def get_session():
     with Session(engine) as session:
         yield session
+
+
+@contextmanager
+def get_read_session():
+    with Session(read_engine) as session:
+        yield session
@@ -1,4 +1,6 @@
 import asyncio
+import logging
+import time
 from contextlib import asynccontextmanager
 from datetime import datetime
 
@@ -8,32 +10,88 @@ from fastapi.middleware.cors import CORSMiddleware
 from sqlmodel import select
 
 from .config import get_settings
-from .db import init_db, get_session
+from .db import init_db, get_read_session, get_session
 from .models import Monitor, SyntheticCheck, SyntheticResult
+from .responses import FastJSONResponse
 from .routes.ingest import ingest_router
 from .routes.query import query_router
 from .routes.monitors import monitors_router
 from .routes.incidents import incidents_router
 from .routes.slo import slo_router
+from .routes.stats import stats_router
 from .routes.synthetics import synthetics_router
-from .services.monitor_eval import evaluate_monitor, upsert_alert
+from .services.dogstatsd_udp import start_dogstatsd_server
+from .services.ingest_queue import IngestQueueFull
+from .services.ingest_writer import write_now
+from .services.monitor_eval import evaluate_monitors, upsert_alerts
+from .services.monitor_scheduler import MonitorSchedule
+from .services.monitor_stream import monitor_stream
+from .services.partitions import partition_router
+from .services.segment_store import segment_store
+from .services.service_registry import service_registry
+from .state import (
+    dogstatsd_aggregator,
+    dogstatsd_protocol,
+    ingest_queue,
+    monitor_scheduler,
+    retention_compactor,
+)
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
 
 
+def evaluate_batch(monitors: list[Monitor]) -> None:
+    # streaming evaluation rides on the incremental windows
+    if settings.monitor_incremental or settings.monitor_streaming:
+        evaluations = monitor_stream.evaluate(monitors, sync=False)
+    else:
+        evaluations = evaluate_monitors(monitors)
+    upsert_alerts(
+        [
+            (monitor, evaluation)
+            for monitor, evaluation in zip(monitors, evaluations)
+            if evaluation is not None
+        ]
+    )
+
+
+async def run_batch(batch: list[MonitorSchedule]) -> None:
+    try:
+        await asyncio.to_thread(evaluate_batch, [schedule.monitor for schedule in batch])
+    except Exception:  # noqa: BLE001
+        logger.exception("monitor evaluation failed")
+    finally:
+        monitor_scheduler.finish(batch)
+
+
 async def monitor_loop(stop_event: asyncio.Event) -> None:
+    # The monitor list is re-read every WATCHDOG_MONITOR_INTERVAL_SEC; in
+    # between, the loop sleeps until the next monitor is due and hands each
+    # due batch to a worker thread without waiting for it.
+    running: set[asyncio.Task] = set()
+    next_sync = 0.0
     while not stop_event.is_set():
-        with get_session() as session:
-            monitors = session.exec(select(Monitor)).all()
-        for monitor in monitors:
-            evaluation = evaluate_monitor(monitor)
-            upsert_alert(monitor, evaluation)
-        await asyncio.sleep(settings.monitor_interval_sec)
+        if time.monotonic() >= next_sync:
+            with get_read_session() as session:
+                monitors = session.exec(select(Monitor)).all()
+            monitor_scheduler.sync(monitors)
+            if settings.monitor_incremental or settings.monitor_streaming:
+                await asyncio.to_thread(monitor_stream.sync, monitors)
+            next_sync = time.monotonic() + settings.monitor_interval_sec
+        batch = monitor_scheduler.take_due()
+        if batch:
+            task = asyncio.create_task(run_batch(batch))
+            running.add(task)
+            task.add_done_callback(running.discard)
+        due = monitor_scheduler.next_due()
+        wake = next_sync if due is None else min(next_sync, due)
+        await asyncio.sleep(max(wake - time.monotonic(), 0.05))
 
 
 async def synthetics_loop(stop_event: asyncio.Event) -> None:
     while not stop_event.is_set():
-        with get_session() as session:
+        with get_read_session() as session:
             checks = session.exec(select(SyntheticCheck)).all()
         async with httpx.AsyncClient() as client:
             for check in checks:
@@ -64,19 +122,78 @@ async def synthetics_loop(stop_event: asyncio.Event) -> None:
         await asyncio.sleep(settings.synthetics_interval_sec)
 
 
+async def flush_dogstatsd() -> None:
+    rows = dogstatsd_aggregator.flush()
+    if not rows:
+        return
+    if ingest_queue.running:
+        try:
+            ingest_queue.submit("metric", rows)
+            return
+        except IngestQueueFull:
+            pass
+    await asyncio.to_thread(write_now, "metric", rows)
+
+
+async def dogstatsd_flush_loop(stop_event: asyncio.Event) -> None:
+    while not stop_event.is_set():
+        await asyncio.sleep(settings.dogstatsd_flush_interval_sec)
+        await flush_dogstatsd()
+
+
+async def retention_loop(stop_event: asyncio.Event) -> None:
+    while not stop_event.is_set():
+        await asyncio.sleep(settings.retention_interval_sec)
+        await asyncio.to_thread(retention_compactor.run)
+
+
+async def segment_seal_loop(stop_event: asyncio.Event) -> None:
+    while not stop_event.is_set():
+        await asyncio.sleep(settings.segment_seal_interval_sec)
+        await asyncio.to_thread(segment_store.seal, get_session)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
+    with get_session() as session:
+        service_registry.load(session)
+        partition_router.load(session)
+        if segment_store.enabled:
+            segment_store.recover(session)
+    if settings.ingest_queue_enabled or settings.dogstatsd_udp_enabled:
+        ingest_queue.start()
+    dogstatsd_transport = None
+    if settings.dogstatsd_udp_enabled:
+        dogstatsd_transport = await start_dogstatsd_server(
+            dogstatsd_protocol, settings.dogstatsd_host, settings.dogstatsd_port
+        )
     stop_event = asyncio.Event()
     monitor_task = asyncio.create_task(monitor_loop(stop_event))
     synthetic_task = asyncio.create_task(synthetics_loop(stop_event))
+    flush_task = asyncio.create_task(dogstatsd_flush_loop(stop_event))
+    retention_task = None
+    if settings.retention_enabled:
+        retention_task = asyncio.create_task(retention_loop(stop_event))
+    seal_task = None
+    if segment_store.enabled:
+        seal_task = asyncio.create_task(segment_seal_loop(stop_event))
     yield
     stop_event.set()
     monitor_task.cancel()
     synthetic_task.cancel()
+    flush_task.cancel()
+    if retention_task is not None:
+        retention_task.cancel()
+    if seal_task is not None:
+        seal_task.cancel()
+    if dogstatsd_transport is not None:
+        dogstatsd_transport.close()
+    await flush_dogstatsd()
+    await asyncio.to_thread(ingest_queue.stop)
 
 
-app = FastAPI(title="WatchDog API", lifespan=lifespan)
+app = FastAPI(title="WatchDog API", lifespan=lifespan, default_response_class=FastJSONResponse)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -91,6 +208,7 @@ app.include_router(monitors_router)
 app.include_router(incidents_router)
 app.include_router(slo_router)
 app.include_router(synthetics_router)
+app.include_router(stats_router)
 
 
 @app.get("/health")
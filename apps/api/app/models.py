@@ -1,26 +1,81 @@
-from datetime import datetime
+import re
+from datetime import date, datetime
 from typing import Any, Optional
 
-from sqlalchemy import Column, JSON
+from sqlalchemy import Column, Index, JSON, Table, UniqueConstraint, event
 from sqlmodel import Field, SQLModel
 
 
 class Service(SQLModel, table=True):
+    __table_args__ = (UniqueConstraint("name", name="uq_service_name"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
     env: str = "prod"
 
 
-class MetricPoint(SQLModel, table=True):
+class Series(SQLModel, table=True):
+    __table_args__ = (UniqueConstraint("name", "service", "tagset", name="uq_series_key"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
+    service: str
+    tagset: str
+    tags: dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSON))
+
+
+class MetricPoint(SQLModel, table=True):
+    __table_args__ = (Index("ix_metricpoint_series_ts", "series_id", "ts"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    series_id: int = Field(foreign_key="series.id")
     ts: datetime
     value: float
-    tags: dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSON))
+
+
+class MetricRollup(SQLModel, table=True):
+    __table_args__ = (
+        UniqueConstraint(
+            "resolution", "name", "service", "tagset", "bucket", name="uq_metricrollup_key"
+        ),
+        Index("ix_metricrollup_resolution_bucket", "resolution", "bucket"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    resolution: int
+    name: str
     service: str
+    tagset: str
+    bucket: datetime
+    count: int
+    sum: float
+    min: float
+    max: float
+    sketch: dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSON))
+
+
+class MetricSegment(SQLModel, table=True):
+    __table_args__ = (
+        UniqueConstraint("series_id", "day", name="uq_metricsegment_series_day"),
+        Index("ix_metricsegment_day", "day"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    series_id: int = Field(foreign_key="series.id")
+    day: date
+    start_ts: datetime
+    end_ts: datetime
+    count: int
+    size: int
 
 
 class LogEvent(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_logevent_service_ts", "service", "ts"),
+        Index("ix_logevent_level_ts", "level", "ts"),
+        Index("ix_logevent_ts", "ts"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     ts: datetime
     service: str
@@ -29,7 +84,53 @@ class LogEvent(SQLModel, table=True):
     attrs: dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSON))
 
 
+LOG_TABLE_RE = re.compile(r"^logevent(_\d{8})?$")
+
+
+def log_fts_ddl(name: str, dialect: str) -> list[str]:
+    # Full-text index over message for logevent and each daily partition: an
+    # external-content FTS5 table kept in sync by triggers on SQLite, a GIN
+    # expression index on Postgres.
+    if dialect == "postgresql":
+        return [
+            f"CREATE INDEX IF NOT EXISTS ix_{name}_message_fts ON {name} "
+            "USING gin (to_tsvector('simple', message))"
+        ]
+    if dialect != "sqlite":
+        return []
+    fts = f"{name}_fts"
+    insert = f"INSERT INTO {fts}(rowid, message) VALUES (new.id, new.message);"
+    delete = f"INSERT INTO {fts}({fts}, rowid, message) VALUES ('delete', old.id, old.message);"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"message, content='{name}', content_rowid='id', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {name} BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {name} BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF message ON {name} "
+        f"BEGIN {delete} {insert} END",
+    ]
+
+
+@event.listens_for(Table, "after_create")
+def create_log_fts(table: Table, connection, **_kw) -> None:
+    if LOG_TABLE_RE.match(table.name):
+        for statement in log_fts_ddl(table.name, connection.dialect.name):
+            connection.exec_driver_sql(statement)
+
+
+@event.listens_for(Table, "after_drop")
+def drop_log_fts(table: Table, connection, **_kw) -> None:
+    if LOG_TABLE_RE.match(table.name) and connection.dialect.name == "sqlite":
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {table.name}_fts")
+
+
 class Span(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_span_trace_id", "trace_id"),
+        Index("ix_span_service_start_ts", "service", "start_ts"),
+        Index("ix_span_start_ts", "start_ts"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     trace_id: str
     span_id: str
@@ -42,6 +143,31 @@ class Span(SQLModel, table=True):
     tags: dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSON))
 
 
+# Postings lists: "key:value" -> ids of the series, logs or spans carrying that
+# tag. Clustered on (tag, ref_id) so every list is read back already sorted.
+class SeriesPosting(SQLModel, table=True):
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    tag: str = Field(primary_key=True)
+    ref_id: int = Field(primary_key=True)
+
+
+class LogPosting(SQLModel, table=True):
+    __table_args__ = (Index("ix_logposting_ref_id", "ref_id"), {"sqlite_with_rowid": False})
+
+    tag: str = Field(primary_key=True)
+    ref_id: int = Field(primary_key=True)
+    ts: datetime
+
+
+class SpanPosting(SQLModel, table=True):
+    __table_args__ = (Index("ix_spanposting_ref_id", "ref_id"), {"sqlite_with_rowid": False})
+
+    tag: str = Field(primary_key=True)
+    ref_id: int = Field(primary_key=True)
+    ts: datetime
+
+
 class Monitor(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
@@ -53,6 +179,8 @@ class Monitor(SQLModel, table=True):
 
 
 class Alert(SQLModel, table=True):
+    __table_args__ = (Index("ix_alert_monitor_id", "monitor_id"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     monitor_id: int = Field(foreign_key="monitor.id")
     status: str
@@ -98,6 +226,8 @@ class SyntheticCheck(SQLModel, table=True):
 
 
 class SyntheticResult(SQLModel, table=True):
+    __table_args__ = (Index("ix_syntheticresult_check_id_ts", "check_id", "ts"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     check_id: int = Field(foreign_key="syntheticcheck.id")
     ts: datetime
@@ -0,0 +1,11 @@
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from .utils.fastjson import dumps
+
+
+class FastJSONResponse(JSONResponse):
+    # Routes that return this directly also skip FastAPI's jsonable_encoder pass.
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
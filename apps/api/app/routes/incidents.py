@@ -2,7 +2,7 @@ from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import select
 
-from ..db import get_session
+from ..db import get_read_session, get_session
 from ..deps import require_api_key
 from ..models import Incident, IncidentEvent
 from ..schemas import IncidentIn, IncidentEventIn
@@ -12,7 +12,7 @@ incidents_router = APIRouter(prefix="/api/v1/incidents", dependencies=[Depends(r
 
 @incidents_router.get("")
 async def list_incidents() -> list[dict]:
-    with get_session() as session:
+    with get_read_session() as session:
         incidents = session.exec(select(Incident)).all()
         return [incident.model_dump() for incident in incidents]
 
@@ -34,7 +34,7 @@ async def create_incident(payload: IncidentIn) -> dict:
 
 @incidents_router.get("/{incident_id}")
 async def get_incident(incident_id: int) -> dict:
-    with get_session() as session:
+    with get_read_session() as session:
         incident = session.get(Incident, incident_id)
         if not incident:
             raise HTTPException(status_code=404, detail="incident not found")
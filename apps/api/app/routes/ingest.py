@@ -1,73 +1,102 @@
-from fastapi import APIRouter, Body, Depends, HTTPException
-from sqlmodel import select
+import asyncio
+from typing import Callable
 
-from ..db import get_session
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response, status
+from starlette.concurrency import run_in_threadpool
+
+from ..config import get_settings
 from ..deps import require_api_key
-from ..models import LogEvent, MetricPoint, Span, Service
 from ..schemas import LogEventIn, MetricPointIn, SpanIn
+from ..services.ingest_queue import IngestQueueFull
+from ..services.ingest_writer import to_rows, write_now
 from ..sse import LogBroadcaster
-from ..state import get_broadcaster
-from ..utils.dogstatsd import parse_line, DogstatsdParseError
+from ..state import (
+    dogstatsd_aggregator,
+    dogstatsd_http_counters,
+    get_broadcaster,
+    ingest_queue,
+)
+from ..utils.dogstatsd import parse_batch, DogstatsdParseError
 
 
 ingest_router = APIRouter(prefix="/api/v1/ingest", dependencies=[Depends(require_api_key)])
+settings = get_settings()
+
+
+async def submit(
+    kind: str,
+    rows: list[dict],
+    response: Response,
+    on_commit: Callable[[list[dict]], None] | None = None,
+) -> dict:
+    if settings.ingest_queue_enabled and ingest_queue.running:
+        try:
+            ingest_queue.submit(kind, rows, on_commit)
+        except IngestQueueFull as exc:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(exc),
+                headers={"Retry-After": str(settings.ingest_retry_after_sec)},
+            ) from exc
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {"accepted": len(rows)}
+    stored = await run_in_threadpool(write_now, kind, rows)
+    if on_commit is not None:
+        on_commit(stored)
+    return {"ingested": len(stored)}
 
 
 @ingest_router.post("/metrics")
-async def ingest_metrics(payload: list[MetricPointIn]) -> dict:
-    with get_session() as session:
-        for item in payload:
-            existing = session.exec(select(Service).where(Service.name == item.service)).first()
-            if not existing:
-                session.add(Service(name=item.service, env="prod"))
-            session.add(MetricPoint(**item.model_dump()))
-        session.commit()
-    return {"ingested": len(payload)}
+async def ingest_metrics(payload: list[MetricPointIn], response: Response) -> dict:
+    return await submit("metric", to_rows(payload), response)
 
 
 @ingest_router.post("/logs")
 async def ingest_logs(
     payload: list[LogEventIn],
+    response: Response,
     broadcaster: LogBroadcaster = Depends(get_broadcaster),
 ) -> dict:
-    with get_session() as session:
-        for item in payload:
-            existing = session.exec(select(Service).where(Service.name == item.service)).first()
-            if not existing:
-                session.add(Service(name=item.service, env="prod"))
-            log = LogEvent(**item.model_dump())
-            session.add(log)
-            await broadcaster.publish(log.service, log.model_dump())
-        session.commit()
-    return {"ingested": len(payload)}
+    rows = to_rows(payload)
+    loop = asyncio.get_running_loop()
+
+    # live tail subscribers only see lines that were actually stored
+    def on_commit(stored: list[dict]) -> None:
+        loop.call_soon_threadsafe(broadcaster.publish_rows, stored)
+
+    return await submit("log", rows, response, on_commit)
 
 
 @ingest_router.post("/traces")
-async def ingest_traces(payload: list[SpanIn]) -> dict:
-    with get_session() as session:
-        for item in payload:
-            existing = session.exec(select(Service).where(Service.name == item.service)).first()
-            if not existing:
-                session.add(Service(name=item.service, env="prod"))
-            session.add(Span(**item.model_dump()))
-        session.commit()
-    return {"ingested": len(payload)}
+async def ingest_traces(payload: list[SpanIn], response: Response) -> dict:
+    return await submit("span", to_rows(payload), response)
 
 
 @ingest_router.post("/dogstatsd")
-async def ingest_dogstatsd(payload: str = Body(..., media_type="text/plain")) -> dict:
-    lines = [line.strip() for line in payload.splitlines() if line.strip()]
-    points = []
-    for line in lines:
-        try:
-            points.append(parse_line(line))
-        except DogstatsdParseError as exc:
-            raise HTTPException(status_code=400, detail=str(exc)) from exc
-    with get_session() as session:
-        for point in points:
-            existing = session.exec(select(Service).where(Service.name == point["service"])).first()
-            if not existing:
-                session.add(Service(name=point["service"], env="prod"))
-            session.add(MetricPoint(**point))
-        session.commit()
-    return {"ingested": len(points)}
+async def ingest_dogstatsd(
+    response: Response,
+    payload: str = Body(..., media_type="text/plain"),
+    partial: bool = Query(default=False),
+) -> dict:
+    dogstatsd_http_counters["batches"] += 1
+    try:
+        batch = parse_batch(
+            payload, strict=not partial, max_errors=settings.dogstatsd_max_reported_errors
+        )
+    except DogstatsdParseError as exc:
+        dogstatsd_http_counters["rejected_batches"] += 1
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    dogstatsd_http_counters["accepted_lines"] += len(batch)
+    dogstatsd_http_counters["rejected_lines"] += batch.rejected
+    if settings.dogstatsd_aggregate:
+        dogstatsd_aggregator.add_batch(batch)
+        response.status_code = status.HTTP_202_ACCEPTED
+        result = {"accepted": len(batch)}
+    elif len(batch):
+        result = await submit("metric", batch.rows(), response)
+    else:
+        result = {"accepted": 0}
+    if partial:
+        result["rejected"] = batch.rejected
+        result["errors"] = [{"line": line, "error": error} for line, error in batch.errors]
+    return result
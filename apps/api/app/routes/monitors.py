@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import select
 
-from ..db import get_session
+from ..db import get_read_session, get_session
 from ..deps import require_api_key
 from ..models import Monitor, Alert
 from ..schemas import MonitorIn, MonitorOut, AlertOut
@@ -12,7 +12,7 @@ monitors_router = APIRouter(prefix="/api/v1/monitors", dependencies=[Depends(req
 
 @monitors_router.get("")
 async def list_monitors() -> list[MonitorOut]:
-    with get_session() as session:
+    with get_read_session() as session:
         monitors = session.exec(select(Monitor)).all()
         return [MonitorOut(**monitor.model_dump()) for monitor in monitors]
 
@@ -58,7 +58,7 @@ async def delete_monitor(monitor_id: int) -> dict:
 
 @monitors_router.get("/alerts")
 async def list_alerts() -> list[AlertOut]:
-    with get_session() as session:
+    with get_read_session() as session:
         alerts = session.exec(select(Alert)).all()
         return [AlertOut(**alert.model_dump()) for alert in alerts]
 
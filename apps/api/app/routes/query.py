@@ -1,20 +1,113 @@
+from collections.abc import Iterator
 from datetime import datetime
-from fastapi import APIRouter, Depends, Query
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from fastapi.responses import StreamingResponse
+from sqlalchemy.sql import Select
 from sqlmodel import select
 
-from ..db import get_session
+from ..config import get_settings
+from ..db import get_read_session, read_engine
 from ..deps import require_api_key
-from ..models import LogEvent, MetricPoint, Span, Service
+from ..models import Span, Service
+from ..responses import FastJSONResponse
+from ..services.log_search import log_search_stmt
+from ..services.metric_query import (
+    BUCKET_KEYS,
+    POINT_KEYS,
+    aggregate,
+    bucket_rows,
+    bucketed,
+    iter_point_rows,
+    iter_raw_points,
+    parse_rollup,
+)
+from ..services.partitions import partition_router
+from ..services.tag_index import TagFilter, parse_tag_filter
+from ..services.trace_search import trace_search_stmt
 from ..sse import LogBroadcaster
 from ..state import get_broadcaster
+from ..utils.cursor import Cursor, CursorError, decode_cursor, encode_cursor
+from ..utils.fastjson import to_columns
+from ..utils.log_query import LogQueryError
+from ..utils.ndjson import NDJSON_MEDIA_TYPE, encode_lines, wants_ndjson
+
+settings = get_settings()
 
 query_router = APIRouter(prefix="/api/v1", dependencies=[Depends(require_api_key)])
 
+DEFAULT_PAGE = 100
+MAX_PAGE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# "rows" is a list of objects; "columns" is one array per field, which is far
+# smaller and cheaper to encode for long results
+Layout = Literal["rows", "columns"]
+
+
+def shape(keys, rows, layout: Layout):
+    if layout == "columns":
+        return to_columns(keys, rows)
+    keys = tuple(keys)
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def ndjson_response(rows: Iterator[dict]) -> StreamingResponse:
+    return StreamingResponse(
+        encode_lines(rows, settings.stream_chunk_rows), media_type=NDJSON_MEDIA_TYPE
+    )
+
+
+def stream_rows(stmt: Select) -> Iterator[dict]:
+    # the read session lives as long as the response body is being sent
+    with get_read_session() as session:
+        options = {"yield_per": settings.stream_chunk_rows}
+        yield from session.execute(stmt, execution_options=options).mappings()
+
+
+def page_limit(limit: int | None, ndjson: bool) -> int | None:
+    # JSON pages are capped; a stream may export everything the filters match
+    if ndjson:
+        return limit
+    if limit is not None and limit > MAX_PAGE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"limit above {MAX_PAGE} needs Accept: {NDJSON_MEDIA_TYPE}",
+        )
+    return limit or DEFAULT_PAGE
+
+
+def page_cursor(cursor: str | None) -> Cursor | None:
+    try:
+        return decode_cursor(cursor) if cursor else None
+    except CursorError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+def page(
+    keys, rows: list, limit: int, ts_key: str, layout: Layout, keyset: bool = True
+) -> FastJSONResponse:
+    # rows holds up to limit + 1; the extra one only says another page exists
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        if keyset:
+            last = rows[-1]._mapping
+            headers[NEXT_CURSOR_HEADER] = encode_cursor(last[ts_key], last["id"])
+    return FastJSONResponse(shape(keys, rows, layout), headers=headers)
+
+
+def tag_filter(tag: list[str]) -> TagFilter:
+    # repeated tag params are ANDed; "host:a|host:b" ORs within one param
+    try:
+        return parse_tag_filter(tag)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
 
 @query_router.get("/services")
 async def list_services() -> list[dict]:
-    with get_session() as session:
+    with get_read_session() as session:
         services = session.exec(select(Service)).all()
         return [service.model_dump() for service in services]
 
@@ -26,28 +119,53 @@ async def metrics_timeseries(
     from_ts: datetime | None = Query(default=None, alias="from"),
     to_ts: datetime | None = Query(default=None, alias="to"),
     rollup: str | None = None,
-) -> dict:
-    with get_session() as session:
-        stmt = select(MetricPoint).where(MetricPoint.name == name)
-        if service:
-            stmt = stmt.where(MetricPoint.service == service)
-        if from_ts:
-            stmt = stmt.where(MetricPoint.ts >= from_ts)
-        if to_ts:
-            stmt = stmt.where(MetricPoint.ts <= to_ts)
-        points = session.exec(stmt).all()
-    values = [point.value for point in points]
-    rollups = {}
-    if values:
-        rollups = {
-            "avg": sum(values) / len(values),
-            "min": min(values),
-            "max": max(values),
-        }
-    return {
-        "points": [point.model_dump() for point in points],
-        "rollups": rollups,
-    }
+    raw: bool = False,
+    tag: list[str] = Query(default=[]),
+    layout: Layout = "rows",
+    accept: str | None = Header(default=None),
+):
+    try:
+        rollup_sec = parse_rollup(rollup) if rollup else None
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    tags = tag_filter(tag)
+    if wants_ndjson(accept):
+        return ndjson_response(
+            stream_timeseries(name, service, from_ts, to_ts, rollup_sec, raw, tags)
+        )
+    result: dict = {}
+    with get_read_session() as session:
+        result["rollups"] = aggregate(session, name, service, from_ts, to_ts, tags)
+        if rollup_sec:
+            rows = bucket_rows(session, name, service, from_ts, to_ts, rollup_sec, tags)
+            result["series"] = shape(BUCKET_KEYS, rows, layout)
+        if raw:
+            rows = iter_point_rows(session, name, service, from_ts, to_ts, tags)
+            result["points"] = shape(POINT_KEYS, rows, layout)
+    return FastJSONResponse(result)
+
+
+def stream_timeseries(
+    name: str,
+    service: str | None,
+    start: datetime | None,
+    end: datetime | None,
+    rollup_sec: int | None,
+    raw: bool,
+    tags: TagFilter,
+) -> Iterator[dict]:
+    # one line per object, tagged with the key it would sit under in the JSON body
+    with get_read_session() as session:
+        yield {"kind": "rollups", **aggregate(session, name, service, start, end, tags)}
+        if rollup_sec:
+            for bucket in bucketed(session, name, service, start, end, rollup_sec, tags):
+                yield {"kind": "series", **bucket}
+        if raw:
+            points = iter_raw_points(
+                session, name, service, start, end, tags, settings.stream_chunk_rows
+            )
+            for point in points:
+                yield {"kind": "points", **point}
 
 
 @query_router.get("/logs/search")
@@ -57,23 +175,39 @@ async def search_logs(
     level: str | None = None,
     from_ts: datetime | None = Query(default=None, alias="from"),
     to_ts: datetime | None = Query(default=None, alias="to"),
-    limit: int = 100,
-) -> list[dict]:
-    with get_session() as session:
-        stmt = select(LogEvent)
-        if service:
-            stmt = stmt.where(LogEvent.service == service)
-        if level:
-            stmt = stmt.where(LogEvent.level == level)
-        if from_ts:
-            stmt = stmt.where(LogEvent.ts >= from_ts)
-        if to_ts:
-            stmt = stmt.where(LogEvent.ts <= to_ts)
-        logs = session.exec(stmt).all()
-    if q:
-        logs = [log for log in logs if q.lower() in log.message.lower()]
-    logs = sorted(logs, key=lambda item: item.ts, reverse=True)[:limit]
-    return [log.model_dump() for log in logs]
+    limit: int | None = Query(default=None, ge=1),
+    tag: list[str] = Query(default=[]),
+    sort: Literal["time", "rank"] = "time",
+    cursor: str | None = None,
+    layout: Layout = "rows",
+    accept: str | None = Header(default=None),
+):
+    tags = tag_filter(tag)
+    if cursor and sort == "rank":
+        raise HTTPException(status_code=400, detail="cursors page time-ordered results only")
+    ndjson = wants_ndjson(accept)
+    limit = page_limit(limit, ndjson)
+    try:
+        stmt = log_search_stmt(
+            read_engine.dialect.name,
+            q=q,
+            service=service,
+            level=level,
+            start=from_ts,
+            end=to_ts,
+            tags=tags,
+            limit=limit if ndjson else limit + 1,
+            sort=sort,
+            cursor=page_cursor(cursor),
+        )
+    except LogQueryError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if ndjson:
+        return ndjson_response(stream_rows(stmt))
+    with get_read_session() as session:
+        result = session.execute(stmt)
+        keys, logs = result.keys(), result.all()
+    return page(keys, logs, limit, "ts", layout, sort == "time")
 
 
 @query_router.get("/traces/search")
@@ -83,32 +217,49 @@ async def search_traces(
     to_ts: datetime | None = Query(default=None, alias="to"),
     min_duration_ms: int | None = None,
     status: str | None = None,
-) -> list[dict]:
-    with get_session() as session:
-        stmt = select(Span)
-        if service:
-            stmt = stmt.where(Span.service == service)
-        if from_ts:
-            stmt = stmt.where(Span.start_ts >= from_ts)
-        if to_ts:
-            stmt = stmt.where(Span.start_ts <= to_ts)
-        if min_duration_ms:
-            stmt = stmt.where(Span.duration_ms >= min_duration_ms)
-        if status:
-            stmt = stmt.where(Span.status == status)
-        spans = session.exec(stmt).all()
-    return [span.model_dump() for span in spans]
+    tag: list[str] = Query(default=[]),
+    limit: int | None = Query(default=None, ge=1),
+    cursor: str | None = None,
+    layout: Layout = "rows",
+    accept: str | None = Header(default=None),
+):
+    tags = tag_filter(tag)
+    ndjson = wants_ndjson(accept)
+    limit = page_limit(limit, ndjson)
+    stmt = trace_search_stmt(
+        service=service,
+        start=from_ts,
+        end=to_ts,
+        min_duration_ms=min_duration_ms,
+        status=status,
+        tags=tags,
+        limit=limit if ndjson else limit + 1,
+        cursor=page_cursor(cursor),
+    )
+    if ndjson:
+        return ndjson_response(stream_rows(stmt))
+    with get_read_session() as session:
+        result = session.execute(stmt)
+        keys, spans = result.keys(), result.all()
+    return page(keys, spans, limit, "start_ts", layout)
 
 
 @query_router.get("/traces/{trace_id}")
-async def trace_detail(trace_id: str) -> dict:
-    with get_session() as session:
-        stmt = select(Span).where(Span.trace_id == trace_id)
-        spans = sorted(session.exec(stmt).all(), key=lambda item: item.start_ts)
-    return {
-        "trace_id": trace_id,
-        "spans": [span.model_dump() for span in spans],
-    }
+async def trace_detail(
+    trace_id: str, layout: Layout = "rows", accept: str | None = Header(default=None)
+):
+    spans_source = partition_router.source(Span.__table__)
+    stmt = (
+        select(spans_source)
+        .where(spans_source.c.trace_id == trace_id)
+        .order_by(spans_source.c.start_ts)
+    )
+    if wants_ndjson(accept):
+        return ndjson_response(stream_rows(stmt))
+    with get_read_session() as session:
+        result = session.execute(stmt)
+        spans = shape(result.keys(), result.all(), layout)
+    return FastJSONResponse({"trace_id": trace_id, "spans": spans})
 
 
 @query_router.get("/logs/tail")
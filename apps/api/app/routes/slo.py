@@ -2,7 +2,7 @@ from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends
 from sqlmodel import select
 
-from ..db import get_session
+from ..db import get_read_session, get_session
 from ..deps import require_api_key
 from ..models import Monitor, SLO, Alert
 from ..schemas import SLOIn
@@ -12,7 +12,7 @@ slo_router = APIRouter(prefix="/api/v1/slo", dependencies=[Depends(require_api_k
 
 @slo_router.get("")
 async def list_slos() -> list[dict]:
-    with get_session() as session:
+    with get_read_session() as session:
         slos = session.exec(select(SLO)).all()
         return [slo.model_dump() for slo in slos]
 
@@ -29,7 +29,7 @@ async def create_slo(payload: SLOIn) -> dict:
 
 @slo_router.get("/{slo_id}/status")
 async def slo_status(slo_id: int) -> dict:
-    with get_session() as session:
+    with get_read_session() as session:
         slo = session.get(SLO, slo_id)
         if not slo:
             return {"error": "slo not found"}
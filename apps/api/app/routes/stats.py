@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends
+
+from ..deps import require_api_key
+from ..services.monitor_stream import monitor_stream
+from ..services.partitions import partition_router
+from ..services.segment_store import segment_store
+from ..services.series_registry import series_registry
+from ..state import (
+    dogstatsd_aggregator,
+    dogstatsd_http_counters,
+    dogstatsd_protocol,
+    ingest_queue,
+    monitor_scheduler,
+    retention_compactor,
+)
+
+stats_router = APIRouter(prefix="/api/v1/stats", dependencies=[Depends(require_api_key)])
+
+
+@stats_router.get("")
+async def get_stats() -> dict:
+    return {
+        "ingest_queue": ingest_queue.stats(),
+        "dogstatsd_http": dict(dogstatsd_http_counters),
+        "dogstatsd_udp": dogstatsd_protocol.stats(),
+        "dogstatsd_aggregator": dogstatsd_aggregator.stats(),
+        "retention": retention_compactor.stats(),
+        "partitions": partition_router.stats(),
+        "segments": segment_store.stats(),
+        "series_cache": series_registry.stats(),
+        "monitor_windows": monitor_stream.stats(),
+        "monitor_scheduler": monitor_scheduler.stats(),
+    }
@@ -2,7 +2,7 @@ from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import select
 
-from ..db import get_session
+from ..db import get_read_session, get_session
 from ..deps import require_api_key
 from ..models import SyntheticCheck, SyntheticResult
 from ..schemas import SyntheticCheckIn
@@ -12,7 +12,7 @@ synthetics_router = APIRouter(prefix="/api/v1/synthetics", dependencies=[Depends
 
 @synthetics_router.get("")
 async def list_checks() -> list[dict]:
-    with get_session() as session:
+    with get_read_session() as session:
         checks = session.exec(select(SyntheticCheck)).all()
         return [check.model_dump() for check in checks]
 
@@ -40,7 +40,7 @@ async def delete_check(check_id: int) -> dict:
 
 @synthetics_router.get("/{check_id}/results")
 async def list_results(check_id: int, limit: int = 20) -> list[dict]:
-    with get_session() as session:
+    with get_read_session() as session:
         results = session.exec(
             select(SyntheticResult)
             .where(SyntheticResult.check_id == check_id)
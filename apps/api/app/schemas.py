@@ -12,7 +12,7 @@ class ServiceCreate(BaseModel):
 class MetricPointIn(BaseModel):
     name: str
     ts: datetime
-    value: float
+    value: float = Field(allow_inf_nan=False)
     tags: dict[str, Any] = Field(default_factory=dict)
     service: str
 
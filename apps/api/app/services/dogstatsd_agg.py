@@ -0,0 +1,101 @@
+import math
+import threading
+from datetime import datetime
+
+from ..utils.dogstatsd import DogstatsdBatch
+
+
+class _Series:
+    __slots__ = ("name", "type", "tags", "service", "value", "count", "samples", "members")
+
+    def __init__(self, name: str, metric_type: str, tags: dict, service: str) -> None:
+        self.name = name
+        self.type = metric_type
+        self.tags = tags
+        self.service = service
+        self.value = 0.0
+        self.count = 0.0
+        self.samples: list[float] = []
+        self.members: set[str] = set()
+
+    def add(self, value, sample_rate: float) -> None:
+        if self.type == "c":
+            self.value += value / sample_rate
+        elif self.type == "g":
+            self.value = value
+        elif self.type == "s":
+            self.members.add(value)
+        else:
+            self.count += 1 / sample_rate
+            self.samples.append(value)
+
+    def rows(self, ts: datetime) -> list[dict]:
+        if self.type == "s":
+            return [self._row(self.name, ts, float(len(self.members)))]
+        if self.type in ("c", "g"):
+            return [self._row(self.name, ts, self.value)]
+        samples = sorted(self.samples)
+        p95 = samples[max(math.ceil(len(samples) * 0.95) - 1, 0)]
+        return [
+            self._row(f"{self.name}.count", ts, self.count),
+            self._row(f"{self.name}.avg", ts, sum(samples) / len(samples)),
+            self._row(f"{self.name}.max", ts, samples[-1]),
+            self._row(f"{self.name}.95percentile", ts, p95),
+        ]
+
+    def _row(self, name: str, ts: datetime, value: float) -> dict:
+        return {"name": name, "ts": ts, "value": value, "tags": self.tags, "service": self.service}
+
+
+class DogstatsdAggregator:
+    def __init__(self) -> None:
+        self._series: dict[tuple, _Series] = {}
+        self._lock = threading.Lock()
+        self.points = 0
+        self.flushes = 0
+        self.rows_flushed = 0
+
+    def add(self, point: dict) -> None:
+        key = (point["name"], point["type"], tuple(sorted(point["tags"].items())))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(
+                    point["name"], point["type"], point["tags"], point["service"]
+                )
+            series.add(point["value"], point["sample_rate"])
+            self.points += 1
+
+    def add_batch(self, batch: DogstatsdBatch) -> None:
+        tag_keys = [tuple(sorted(tags.items())) for tags in batch.tagsets]
+        services = [tags.get("service", "unknown") for tags in batch.tagsets]
+        names, types, tagset_ids = batch.names, batch.types, batch.tagset_ids
+        sample_rates = batch.sample_rates
+        with self._lock:
+            for i, name in enumerate(names):
+                tagset_id = tagset_ids[i]
+                key = (name, types[i], tag_keys[tagset_id])
+                series = self._series.get(key)
+                if series is None:
+                    series = self._series[key] = _Series(
+                        name, types[i], batch.tagsets[tagset_id], services[tagset_id]
+                    )
+                series.add(batch.value(i), sample_rates[i])
+            self.points += len(names)
+
+    def flush(self, ts: datetime | None = None) -> list[dict]:
+        ts = ts or datetime.utcnow()
+        with self._lock:
+            series, self._series = self._series, {}
+        rows = [row for item in series.values() for row in item.rows(ts)]
+        self.flushes += 1
+        self.rows_flushed += len(rows)
+        return rows
+
+    def stats(self) -> dict:
+        return {
+            "series": len(self._series),
+            "points": self.points,
+            "flushes": self.flushes,
+            "rows_flushed": self.rows_flushed,
+        }
@@ -0,0 +1,57 @@
+import asyncio
+import logging
+
+from ..utils.dogstatsd import parse_batch
+from .dogstatsd_agg import DogstatsdAggregator
+from .ingest_queue import IngestQueue, IngestQueueFull
+
+logger = logging.getLogger(__name__)
+
+
+class DogstatsdProtocol(asyncio.DatagramProtocol):
+    def __init__(
+        self, ingest_queue: IngestQueue, aggregator: DogstatsdAggregator | None = None
+    ) -> None:
+        self.ingest_queue = ingest_queue
+        self.aggregator = aggregator
+        self.packets = 0
+        self.points = 0
+        self.parse_errors = 0
+        self.dropped = 0
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        self.packets += 1
+        batch = parse_batch(data, strict=False)
+        self.parse_errors += batch.rejected
+        if not len(batch):
+            return
+        if self.aggregator is not None:
+            self.aggregator.add_batch(batch)
+            self.points += len(batch)
+            return
+        try:
+            self.ingest_queue.submit("metric", batch.rows())
+        except IngestQueueFull:
+            self.dropped += len(batch)
+            return
+        self.points += len(batch)
+
+    def error_received(self, exc: Exception) -> None:
+        logger.warning("dogstatsd socket error: %s", exc)
+
+    def stats(self) -> dict:
+        return {
+            "packets": self.packets,
+            "points": self.points,
+            "parse_errors": self.parse_errors,
+            "dropped": self.dropped,
+        }
+
+
+async def start_dogstatsd_server(
+    protocol: DogstatsdProtocol, host: str, port: int
+) -> asyncio.DatagramTransport:
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(lambda: protocol, local_addr=(host, port))
+    logger.info("dogstatsd listening on udp://%s:%d", host, port)
+    return transport
@@ -0,0 +1,175 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, ContextManager
+
+from sqlmodel import Session
+
+from .ingest_writer import write_rows, write_split
+
+logger = logging.getLogger(__name__)
+
+# (kind, rows, called from the writer thread with the rows that were committed)
+Batch = tuple[str, list[dict], Callable[[list[dict]], None] | None]
+
+
+class IngestQueueFull(Exception):
+    pass
+
+
+class IngestQueue:
+    def __init__(
+        self,
+        session_factory: Callable[[], ContextManager[Session]],
+        maxsize: int = 1000,
+        max_batches: int = 64,
+        max_rows: int = 50_000,
+        flush_interval_sec: float = 0.05,
+    ) -> None:
+        self._session_factory = session_factory
+        self._queue: queue.Queue[Batch] = queue.Queue(maxsize=maxsize)
+        self.max_batches = max_batches
+        self.max_rows = max_rows
+        self.flush_interval_sec = flush_interval_sec
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._latencies: deque[float] = deque(maxlen=512)
+        self.commits = 0
+        self.batches_written = 0
+        self.rows_written = 0
+        self.rejected = 0
+        self.batches_dropped = 0
+        self.rows_dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ingest-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def submit(
+        self, kind: str, rows: list[dict], on_commit: Callable[[list[dict]], None] | None = None
+    ) -> None:
+        try:
+            self._queue.put_nowait((kind, rows, on_commit))
+        except queue.Full as exc:
+            self.rejected += 1
+            raise IngestQueueFull("ingest queue full") from exc
+
+    def flush(self) -> None:
+        self._queue.join()
+
+    def _run(self) -> None:
+        while True:
+            items = self._collect()
+            if items:
+                self._commit(items)
+            elif self._stop.is_set():
+                return
+
+    def _collect(self) -> list[Batch]:
+        try:
+            first = self._queue.get(timeout=self.flush_interval_sec)
+        except queue.Empty:
+            return []
+        items = [first]
+        rows = len(first[1])
+        deadline = time.monotonic() + self.flush_interval_sec
+        while len(items) < self.max_batches and rows < self.max_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            items.append(item)
+            rows += len(item[1])
+        return items
+
+    def _commit(self, items: list[Batch]) -> None:
+        start = time.perf_counter()
+        try:
+            if len(items) > 1:
+                try:
+                    self._write(items)
+                    return
+                except Exception:  # noqa: BLE001
+                    # every batch was already acknowledged: one bad batch must
+                    # not take the rest of the group down with it
+                    logger.warning(
+                        "ingest group commit failed, retrying %d batches one by one",
+                        len(items),
+                        exc_info=True,
+                    )
+            for kind, rows, on_commit in items:
+                # down to the rows that cannot be stored, if need be
+                stored, dropped = write_split(self._session_factory, kind, rows)
+                self.rows_written += len(stored)
+                self.rows_dropped += dropped
+                if stored:
+                    self.batches_written += 1
+                    self._committed(on_commit, stored)
+                else:
+                    self.batches_dropped += 1
+        finally:
+            self._latencies.append(time.perf_counter() - start)
+            for _ in items:
+                self._queue.task_done()
+
+    def _write(self, items: list[Batch]) -> None:
+        with self._session_factory() as session:
+            for kind, rows, _on_commit in items:
+                write_rows(session, kind, rows)
+            session.commit()
+        self.commits += 1
+        self.batches_written += len(items)
+        self.rows_written += sum(len(rows) for _kind, rows, _on_commit in items)
+        for _kind, rows, on_commit in items:
+            self._committed(on_commit, rows)
+
+    def _committed(
+        self, on_commit: Callable[[list[dict]], None] | None, rows: list[dict]
+    ) -> None:
+        if on_commit is None:
+            return
+        try:
+            on_commit(rows)
+        except Exception:  # noqa: BLE001
+            logger.exception("ingest commit callback failed")
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latencies)
+        commit_latency_ms = {}
+        if latencies:
+            commit_latency_ms = {
+                "last": self._latencies[-1] * 1000,
+                "avg": sum(latencies) / len(latencies) * 1000,
+                "p95": latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] * 1000,
+                "max": latencies[-1] * 1000,
+            }
+        return {
+            "running": self.running,
+            "depth": self._queue.qsize(),
+            "capacity": self._queue.maxsize,
+            "commits": self.commits,
+            "batches_written": self.batches_written,
+            "rows_written": self.rows_written,
+            "rejected": self.rejected,
+            "batches_dropped": self.batches_dropped,
+            "rows_dropped": self.rows_dropped,
+            "commit_latency_ms": commit_latency_ms,
+        }
@@ -0,0 +1,96 @@
+import logging
+import math
+from typing import Iterable
+
+from pydantic import BaseModel
+from sqlmodel import Session, SQLModel
+
+from ..config import get_settings
+from ..db import get_session
+from ..models import LogEvent, MetricPoint, Span
+from .metric_rollups import update_rollups
+from .monitor_stream import monitor_stream
+from .partitions import partition_router
+from .series_registry import series_registry
+from .service_registry import service_registry
+from .tag_index import has_terms, write_postings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+MODELS: dict[str, type[SQLModel]] = {
+    "metric": MetricPoint,
+    "log": LogEvent,
+    "span": Span,
+}
+
+
+def to_rows(items: Iterable[BaseModel]) -> list[dict]:
+    return [item.model_dump() for item in items]
+
+
+def write_rows(session: Session, kind: str, rows: list[dict], bulk: bool | None = None) -> None:
+    if kind == "metric":
+        # SQL has no place for nan/inf (SQLite stores NaN as NULL), so a stray
+        # non-finite point is dropped here instead of failing its whole batch
+        rows = [row for row in rows if math.isfinite(row["value"])]
+    if not rows:
+        return
+    model = MODELS[kind]
+    service_registry.ensure(session, {row["service"] for row in rows})
+    if bulk is None:
+        bulk = settings.ingest_bulk_insert
+    if monitor_stream.enabled:
+        monitor_stream.observe(session, kind, rows)
+    if kind == "metric":
+        if settings.metric_rollups_enabled:
+            update_rollups(session, rows)
+        series_ids = series_registry.resolve(session, rows)
+        rows = [
+            {"series_id": series_id, "ts": row["ts"], "value": row["value"]}
+            for series_id, row in zip(series_ids, rows)
+        ]
+    table = model.__table__
+    # logs and spans with tags need their new ids back for the postings lists
+    tagged = kind != "metric" and has_terms(table, rows)
+    ids: list[int] = []
+    if partition_router.partitioned(table):
+        ids = partition_router.write(session, table, rows, returning=tagged)
+    elif bulk and tagged:
+        stmt = table.insert().returning(table.c.id, sort_by_parameter_order=True)
+        ids = list(session.execute(stmt, rows).scalars())
+    elif bulk:
+        session.execute(table.insert(), rows)
+    else:
+        objects = [model(**row) for row in rows]
+        session.add_all(objects)
+        if tagged:
+            session.flush()
+            ids = [obj.id for obj in objects]
+    if tagged:
+        write_postings(session, table, ids, rows)
+
+
+def write_split(session_factory, kind: str, rows: list[dict]) -> tuple[list[dict], int]:
+    # One transaction for the batch; if it fails, the batch is halved until the
+    # rows that cannot be stored are isolated, so a bad row (or series, in a
+    # DogStatsD flush) costs only itself. Returns the stored rows and the
+    # number dropped.
+    try:
+        with session_factory() as session:
+            write_rows(session, kind, rows)
+            session.commit()
+        return rows, 0
+    except Exception:  # noqa: BLE001
+        if len(rows) <= 1:
+            logger.exception("dropped %d %s row(s) that could not be stored", len(rows), kind)
+            return [], len(rows)
+    middle = len(rows) // 2
+    left, left_dropped = write_split(session_factory, kind, rows[:middle])
+    right, right_dropped = write_split(session_factory, kind, rows[middle:])
+    return left + right, left_dropped + right_dropped
+
+
+def write_now(kind: str, rows: list[dict]) -> list[dict]:
+    stored, _dropped = write_split(get_session, kind, rows)
+    return stored
@@ -0,0 +1,84 @@
+from datetime import date, datetime
+
+from sqlalchemy import Table, column, func, literal_column, select, table
+from sqlalchemy.sql import Select
+
+from ..models import LogEvent
+from ..utils.cursor import Cursor, before_cursor
+from ..utils.log_query import parse_log_query, to_fts5, to_tsquery
+from .partitions import Refine, partition_router
+from .tag_index import TagFilter, posting_filter
+
+LOGS = LogEvent.__table__
+# must match the expression of the Postgres GIN index (models.log_fts_ddl)
+TS_CONFIG = literal_column("'simple'")
+
+
+def text_filter(query: str, dialect: str, ranked: bool = False) -> Refine:
+    # ranked adds a "rank" column to each member (best matches lowest)
+    node = parse_log_query(query)
+    if dialect == "sqlite":
+        match = to_fts5(node)
+
+        def refine(stmt: Select, member: Table, _day: date | None) -> Select:
+            name = f"{member.name}_fts"
+            fts = table(name, column("rowid"), column("rank"), column(name))
+            if not ranked:
+                # a materialized id list: cheap to probe while walking a
+                # (service|level, ts) index newest first, where a join would
+                # run the MATCH once per visited row
+                matches = select(fts.c.rowid).where(fts.c[name].match(match))
+                return stmt.where(member.c.id.in_(matches))
+            return (
+                stmt.add_columns(fts.c.rank.label("rank"))
+                .join(fts, fts.c.rowid == member.c.id)
+                .where(fts.c[name].match(match))
+            )
+
+        return refine
+    tsquery = func.to_tsquery(TS_CONFIG, to_tsquery(node))
+
+    def refine(stmt: Select, member: Table, _day: date | None) -> Select:
+        vector = func.to_tsvector(TS_CONFIG, member.c.message)
+        stmt = stmt.where(vector.op("@@")(tsquery))
+        if ranked:
+            stmt = stmt.add_columns((-func.ts_rank(vector, tsquery)).label("rank"))
+        return stmt
+
+    return refine
+
+
+def log_search_stmt(
+    dialect: str,
+    q: str | None = None,
+    service: str | None = None,
+    level: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    tags: TagFilter | None = None,
+    limit: int | None = 100,
+    sort: str = "time",
+    cursor: Cursor | None = None,
+) -> Select:
+    # matching, filtering, ordering and LIMIT all happen in the database
+    refine = []
+    if tags:
+        refine.append(posting_filter(LOGS, tags))
+    ranked = bool(q) and sort == "rank"
+    if q:
+        refine.append(text_filter(q, dialect, ranked))
+    source = partition_router.source(LOGS, start, end, refine)
+    stmt = select(*(source.c[log_column.name] for log_column in LOGS.c))
+    if service:
+        stmt = stmt.where(source.c.service == service)
+    if level:
+        stmt = stmt.where(source.c.level == level)
+    if start:
+        stmt = stmt.where(source.c.ts >= start)
+    if end:
+        stmt = stmt.where(source.c.ts <= end)
+    if ranked:
+        return stmt.order_by(source.c.rank, source.c.ts.desc()).limit(limit)
+    if cursor:
+        stmt = stmt.where(before_cursor(source.c.ts, source.c.id, cursor))
+    return stmt.order_by(source.c.ts.desc(), source.c.id.desc()).limit(limit)
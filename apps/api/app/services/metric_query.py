@@ -0,0 +1,470 @@
+import heapq
+import re
+from collections import defaultdict
+from collections.abc import Collection, Iterator
+from datetime import datetime
+from operator import itemgetter
+
+from sqlalchemy import BigInteger, Integer, cast, func, literal_column
+from sqlalchemy.sql import ColumnElement, FromClause, Select
+from sqlmodel import Session, select
+
+from ..config import get_settings
+from ..models import MetricPoint, MetricRollup, Series, SeriesPosting
+from .metric_rollups import RESOLUTIONS, floor_ts
+from .partitions import partition_router
+from .segment_store import from_micros, segment_store
+from .tag_index import TagFilter, matching_ids
+
+settings = get_settings()
+
+ROLLUP_RE = re.compile(r"^(\d+)([smhd])$")
+UNIT_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+BUCKET_KEYS = ("ts", "avg", "min", "max", "count")
+POINT_KEYS = ("id", "name", "ts", "value", "tags", "service")
+
+
+def parse_rollup(rollup: str) -> int:
+    match = ROLLUP_RE.match(rollup.strip())
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"invalid rollup: {rollup}")
+    return int(match.group(1)) * UNIT_SECONDS[match.group(2)]
+
+
+def choose_resolution(
+    start: datetime | None, end: datetime | None, rollup_sec: int | None = None
+) -> int | None:
+    # Coarsest rollup that still yields rollup_min_buckets buckets over the window
+    # (and divides the requested rollup). Edge buckets are read whole, so the
+    # window is widened by at most one bucket on each side.
+    if not settings.metric_rollups_enabled:
+        return None
+    usable = [
+        resolution
+        for resolution in sorted(RESOLUTIONS, reverse=True)
+        if rollup_sec is None or rollup_sec % resolution == 0
+    ]
+    if start is not None:
+        span = ((end or datetime.utcnow()) - start).total_seconds()
+        for resolution in usable:
+            if span >= resolution * settings.rollup_min_buckets:
+                return resolution
+    # The segment store is storage-only: decoding segments to aggregate them is
+    # far slower than SQL (scripts/bench_segments.py), so aggregates take the
+    # finest rollup instead. Segments are still decoded for raw points, and for
+    # buckets no rollup divides.
+    if segment_store.enabled and usable:
+        return usable[-1]
+    return None
+
+
+def epoch_bucket(column, seconds: int, dialect: str) -> ColumnElement:
+    if dialect == "sqlite":
+        epoch = cast(func.strftime("%s", column), Integer)
+        return (epoch // seconds) * seconds
+    epoch = func.extract("epoch", column)
+    return cast(func.floor(epoch / seconds) * seconds, BigInteger)
+
+
+def metric_source(start: datetime | None, end: datetime | None) -> FromClause:
+    return partition_router.source(MetricPoint.__table__, start, end)
+
+
+def series_stmt(name: str, service: str | None, tags: TagFilter | None = None) -> Select:
+    return select(Series.id).where(*series_filters(name, [service] if service else None, tags))
+
+
+def series_filters(
+    name: str, services: Collection[str] | None, tags: TagFilter | None = None
+) -> list:
+    filters = [Series.name == name]
+    if services:
+        services = sorted(services)
+        if len(services) == 1:
+            filters.append(Series.service == services[0])
+        else:
+            filters.append(Series.service.in_(services))
+    if tags:
+        filters.append(Series.id.in_(matching_ids(SeriesPosting.__table__, tags)))
+    return filters
+
+
+def metric_filters(
+    source: FromClause,
+    name: str,
+    service: str | None,
+    start: datetime | None,
+    end: datetime | None,
+    tags: TagFilter | None = None,
+) -> list:
+    filters = [source.c.series_id.in_(series_stmt(name, service, tags))]
+    if start:
+        filters.append(source.c.ts >= start)
+    if end:
+        filters.append(source.c.ts <= end)
+    return filters
+
+
+def rollup_filters(
+    resolution: int,
+    name: str,
+    service: str | None,
+    start: datetime | None,
+    end: datetime | None,
+    tags: TagFilter | None = None,
+) -> list:
+    filters = [MetricRollup.resolution == resolution, MetricRollup.name == name]
+    if service:
+        filters.append(MetricRollup.service == service)
+    if tags:
+        # rollups are keyed by tagset rather than series id
+        matching = select(Series.tagset).where(Series.id.in_(series_stmt(name, service, tags)))
+        filters.append(MetricRollup.tagset.in_(matching))
+    if start:
+        filters.append(MetricRollup.bucket >= floor_ts(start, resolution))
+    if end:
+        filters.append(MetricRollup.bucket <= end)
+    return filters
+
+
+def aggregate_stmt(source: FromClause, filters: list) -> Select:
+    return select(
+        func.count(source.c.value),
+        func.avg(source.c.value),
+        func.min(source.c.value),
+        func.max(source.c.value),
+    ).where(*filters)
+
+
+def rollup_aggregate_stmt(filters: list) -> Select:
+    return select(
+        func.sum(MetricRollup.count),
+        func.sum(MetricRollup.sum) / func.sum(MetricRollup.count),
+        func.min(MetricRollup.min),
+        func.max(MetricRollup.max),
+    ).where(*filters)
+
+
+def bucket_stmt(source: FromClause, filters: list, seconds: int, dialect: str) -> Select:
+    bucket = epoch_bucket(source.c.ts, seconds, dialect).label("bucket")
+    return (
+        select(
+            bucket,
+            func.count(source.c.value),
+            func.avg(source.c.value),
+            func.min(source.c.value),
+            func.max(source.c.value),
+        )
+        .where(*filters)
+        .group_by(literal_column("bucket"))
+        .order_by(literal_column("bucket"))
+    )
+
+
+def rollup_bucket_stmt(filters: list, seconds: int, dialect: str) -> Select:
+    # labelled apart from the metricrollup.bucket column so GROUP BY binds to the alias
+    bucket = epoch_bucket(MetricRollup.bucket, seconds, dialect).label("bucket_ts")
+    return (
+        select(
+            bucket,
+            func.sum(MetricRollup.count),
+            func.sum(MetricRollup.sum) / func.sum(MetricRollup.count),
+            func.min(MetricRollup.min),
+            func.max(MetricRollup.max),
+        )
+        .where(*filters)
+        .group_by(literal_column("bucket_ts"))
+        .order_by(literal_column("bucket_ts"))
+    )
+
+
+def merge_stats(parts: list[tuple[int, float, float, float]]) -> tuple:
+    # (count, sum, min, max) partials -> (count, avg, min, max)
+    parts = [part for part in parts if part[0]]
+    if not parts:
+        return 0, None, None, None
+    count = sum(part[0] for part in parts)
+    total = sum(part[1] for part in parts)
+    return (
+        count,
+        total / count,
+        min(part[2] for part in parts),
+        max(part[3] for part in parts),
+    )
+
+
+def segment_buckets(chunks: list, seconds: int) -> dict[int, list]:
+    step = seconds * 1_000_000
+    buckets: dict[int, list] = {}
+    for _series, timestamps, values in chunks:
+        for micros, value in zip(timestamps, values):
+            bucket = micros // step * seconds
+            partial = buckets.get(bucket)
+            if partial is None:
+                buckets[bucket] = [1, value, value, value]
+                continue
+            partial[0] += 1
+            partial[1] += value
+            partial[2] = min(partial[2], value)
+            partial[3] = max(partial[3], value)
+    return buckets
+
+
+def stats_by_service(
+    session: Session,
+    name: str,
+    services: Collection[str] | None,
+    start: datetime | None,
+    end: datetime | None,
+    tags: TagFilter | None = None,
+) -> dict[str, list[tuple]]:
+    # One GROUP BY service scan shared by every caller interested in this metric:
+    # service -> (count, sum, min, max) partials for merge_stats. services=None
+    # keeps every service.
+    resolution = choose_resolution(start, end)
+    if resolution:
+        filters = rollup_filters(resolution, name, None, start, end, tags)
+        if services:
+            filters.append(MetricRollup.service.in_(sorted(services)))
+        stmt = (
+            select(
+                MetricRollup.service,
+                func.sum(MetricRollup.count),
+                func.sum(MetricRollup.sum),
+                func.min(MetricRollup.min),
+                func.max(MetricRollup.max),
+            )
+            .where(*filters)
+            .group_by(MetricRollup.service)
+        )
+    else:
+        source = metric_source(start, end)
+        filters = series_filters(name, services, tags)
+        if start:
+            filters.append(source.c.ts >= start)
+        if end:
+            filters.append(source.c.ts <= end)
+        stmt = (
+            select(
+                Series.service,
+                func.count(source.c.value),
+                func.sum(source.c.value),
+                func.min(source.c.value),
+                func.max(source.c.value),
+            )
+            .join(Series, Series.id == source.c.series_id)
+            .where(*filters)
+            .group_by(Series.service)
+        )
+    parts: dict[str, list[tuple]] = defaultdict(list)
+    for service, *partial in session.execute(stmt):
+        parts[service].append(tuple(partial))
+    if not resolution and segment_store.enabled:
+        series_ids = select(Series.id).where(*series_filters(name, services, tags))
+        for series, _timestamps, values in segment_store.scan(session, series_ids, start, end):
+            parts[series.service].append((len(values), sum(values), min(values), max(values)))
+    return parts
+
+
+def bucket_stats_by_service(
+    session: Session,
+    name: str,
+    services: Collection[str] | None,
+    start: datetime | None,
+    end: datetime | None,
+    seconds: int,
+    tags: TagFilter | None = None,
+) -> dict[tuple[int, str], list[tuple]]:
+    # stats_by_service split into epoch buckets of `seconds`: (bucket, service) ->
+    # partials. Read from the coarsest rollup dividing the bucket when enabled.
+    dialect = session.get_bind().dialect.name
+    resolution = None
+    if settings.metric_rollups_enabled:
+        resolution = max((r for r in RESOLUTIONS if seconds % r == 0), default=None)
+    if resolution:
+        filters = rollup_filters(resolution, name, None, start, end, tags)
+        if services:
+            filters.append(MetricRollup.service.in_(sorted(services)))
+        bucket = epoch_bucket(MetricRollup.bucket, seconds, dialect).label("bucket_ts")
+        stmt = (
+            select(
+                bucket,
+                MetricRollup.service,
+                func.sum(MetricRollup.count),
+                func.sum(MetricRollup.sum),
+                func.min(MetricRollup.min),
+                func.max(MetricRollup.max),
+            )
+            .where(*filters)
+            .group_by(literal_column("bucket_ts"), MetricRollup.service)
+        )
+    else:
+        source = metric_source(start, end)
+        filters = series_filters(name, services, tags)
+        if start:
+            filters.append(source.c.ts >= start)
+        if end:
+            filters.append(source.c.ts <= end)
+        bucket = epoch_bucket(source.c.ts, seconds, dialect).label("bucket")
+        stmt = (
+            select(
+                bucket,
+                Series.service,
+                func.count(source.c.value),
+                func.sum(source.c.value),
+                func.min(source.c.value),
+                func.max(source.c.value),
+            )
+            .join(Series, Series.id == source.c.series_id)
+            .where(*filters)
+            .group_by(literal_column("bucket"), Series.service)
+        )
+    parts: dict[tuple[int, str], list[tuple]] = defaultdict(list)
+    for bucket_ts, service, *partial in session.execute(stmt):
+        parts[(int(bucket_ts), service)].append(tuple(partial))
+    if not resolution and segment_store.enabled:
+        series_ids = select(Series.id).where(*series_filters(name, services, tags))
+        by_service = defaultdict(list)
+        for chunk in segment_store.scan(session, series_ids, start, end):
+            by_service[chunk[0].service].append(chunk)
+        for service, chunks in by_service.items():
+            for bucket_ts, partial in segment_buckets(chunks, seconds).items():
+                parts[(bucket_ts, service)].append(tuple(partial))
+    return parts
+
+
+def aggregate(
+    session: Session,
+    name: str,
+    service: str | None,
+    start: datetime | None,
+    end: datetime | None,
+    tags: TagFilter | None = None,
+) -> dict:
+    resolution = choose_resolution(start, end)
+    if resolution:
+        filters = rollup_filters(resolution, name, service, start, end, tags)
+        stmt = rollup_aggregate_stmt(filters)
+    else:
+        source = metric_source(start, end)
+        stmt = aggregate_stmt(source, metric_filters(source, name, service, start, end, tags))
+    count, avg, min_value, max_value = session.exec(stmt).one()
+    if not resolution and segment_store.enabled:
+        parts = [(count, (avg or 0.0) * count, min_value, max_value)]
+        chunks = segment_store.scan(session, series_stmt(name, service, tags), start, end)
+        for _series, _timestamps, values in chunks:
+            parts.append((len(values), sum(values), min(values), max(values)))
+        count, avg, min_value, max_value = merge_stats(parts)
+    if not count:
+        return {}
+    return {"avg": avg, "min": min_value, "max": max_value, "count": count}
+
+
+def bucket_rows(
+    session: Session,
+    name: str,
+    service: str | None,
+    start: datetime | None,
+    end: datetime | None,
+    seconds: int,
+    tags: TagFilter | None = None,
+) -> list[tuple]:
+    # (ts, avg, min, max, count) per bucket, in BUCKET_KEYS order
+    dialect = session.get_bind().dialect.name
+    resolution = choose_resolution(start, end, seconds)
+    if resolution:
+        filters = rollup_filters(resolution, name, service, start, end, tags)
+        stmt = rollup_bucket_stmt(filters, seconds, dialect)
+    else:
+        source = metric_source(start, end)
+        filters = metric_filters(source, name, service, start, end, tags)
+        stmt = bucket_stmt(source, filters, seconds, dialect)
+    rows = session.exec(stmt).all()
+    if not resolution and segment_store.enabled:
+        buckets: dict[int, list] = defaultdict(list)
+        for bucket, count, avg, min_value, max_value in rows:
+            buckets[int(bucket)].append((count, avg * count, min_value, max_value))
+        chunks = segment_store.scan(session, series_stmt(name, service, tags), start, end)
+        for bucket, partial in segment_buckets(chunks, seconds).items():
+            buckets[bucket].append(partial)
+        rows = [(bucket, *merge_stats(parts)) for bucket, parts in sorted(buckets.items())]
+    return [
+        (datetime.utcfromtimestamp(int(bucket)), avg, min_value, max_value, count)
+        for bucket, count, avg, min_value, max_value in rows
+    ]
+
+
+def bucketed(
+    session: Session,
+    name: str,
+    service: str | None,
+    start: datetime | None,
+    end: datetime | None,
+    seconds: int,
+    tags: TagFilter | None = None,
+) -> list[dict]:
+    rows = bucket_rows(session, name, service, start, end, seconds, tags)
+    return [dict(zip(BUCKET_KEYS, row)) for row in rows]
+
+
+def raw_points(
+    session: Session,
+    name: str,
+    service: str | None,
+    start: datetime | None,
+    end: datetime | None,
+    tags: TagFilter | None = None,
+) -> list[dict]:
+    return list(iter_raw_points(session, name, service, start, end, tags))
+
+
+def iter_raw_points(
+    session: Session,
+    name: str,
+    service: str | None,
+    start: datetime | None,
+    end: datetime | None,
+    tags: TagFilter | None = None,
+    chunk_rows: int | None = None,
+) -> Iterator[dict]:
+    for row in iter_point_rows(session, name, service, start, end, tags, chunk_rows):
+        yield dict(zip(POINT_KEYS, row))
+
+
+def iter_point_rows(
+    session: Session,
+    name: str,
+    service: str | None,
+    start: datetime | None,
+    end: datetime | None,
+    tags: TagFilter | None = None,
+    chunk_rows: int | None = None,
+) -> Iterator[tuple]:
+    # ts-ordered tuples in POINT_KEYS order; with chunk_rows the SQL side is read
+    # through a server-side cursor and merged lazily with the (already
+    # ts-ordered) segment chunks
+    source = metric_source(start, end)
+    stmt = (
+        select(
+            source.c.id, Series.name, source.c.ts, source.c.value, Series.tags, Series.service
+        )
+        .join(Series, Series.id == source.c.series_id)
+        .where(*metric_filters(source, name, service, start, end, tags))
+        .order_by(source.c.ts)
+    )
+    options = {"yield_per": chunk_rows} if chunk_rows else {}
+    points = session.execute(stmt, execution_options=options).tuples()
+    if not segment_store.enabled:
+        yield from points
+        return
+    chunks = segment_store.scan(session, series_stmt(name, service, tags), start, end)
+    yield from heapq.merge(
+        points,
+        *(segment_points(*chunk) for chunk in chunks),
+        key=itemgetter(POINT_KEYS.index("ts")),
+    )
+
+
+def segment_points(series: Series, timestamps, values) -> Iterator[tuple]:
+    for micros, value in zip(timestamps, values):
+        yield None, series.name, from_micros(micros), value, series.tags, series.service
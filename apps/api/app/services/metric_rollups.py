@@ -0,0 +1,153 @@
+import json
+import math
+from datetime import datetime, timezone
+
+from sqlalchemy import Insert, Row, bindparam, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+
+from ..models import MetricRollup
+from ..utils import sketch
+
+RESOLUTIONS = (60, 3600, 86400)
+
+RollupKey = tuple[int, str, str, str, datetime]
+
+
+def tagset_key(tags: dict | None) -> str:
+    return json.dumps(tags or {}, sort_keys=True, separators=(",", ":"))
+
+
+def floor_ts(ts: datetime, resolution: int) -> datetime:
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    epoch = int((ts - datetime(1970, 1, 1)).total_seconds())
+    return datetime.utcfromtimestamp(epoch - epoch % resolution)
+
+
+def partial_rollups(rows: list[dict]) -> dict[RollupKey, dict]:
+    partials: dict[RollupKey, dict] = {}
+    for row in rows:
+        value = row["value"]
+        # nan/inf would break the sketch and poison count/sum/min/max
+        if not math.isfinite(value):
+            continue
+        tagset = tagset_key(row.get("tags"))
+        for resolution in RESOLUTIONS:
+            bucket = floor_ts(row["ts"], resolution)
+            key = (resolution, row["name"], row["service"], tagset, bucket)
+            partial = partials.get(key)
+            if partial is None:
+                partials[key] = {
+                    "count": 1,
+                    "sum": value,
+                    "min": value,
+                    "max": value,
+                    "sketch": sketch.add(sketch.new_sketch(), value),
+                }
+                continue
+            partial["count"] += 1
+            partial["sum"] += value
+            partial["min"] = min(partial["min"], value)
+            partial["max"] = max(partial["max"], value)
+            sketch.add(partial["sketch"], value)
+    return partials
+
+
+KEY_COLUMNS = ["resolution", "name", "service", "tagset", "bucket"]
+
+
+def upsert_stmt(session: Session) -> Insert:
+    # count/sum/min/max merge inside the database, so concurrent writers (the
+    # ingest queue, direct writes, the compactor, segment sealing) never lose
+    # an update or trip the unique key
+    table = MetricRollup.__table__
+    if session.get_bind().dialect.name == "postgresql":
+        stmt, least, greatest = pg_insert(table), func.least, func.greatest
+    else:
+        stmt, least, greatest = sqlite_insert(table), func.min, func.max
+    excluded = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=KEY_COLUMNS,
+        set_={
+            "count": table.c.count + excluded["count"],
+            "sum": table.c.sum + excluded["sum"],
+            "min": least(table.c.min, excluded["min"]),
+            "max": greatest(table.c.max, excluded["max"]),
+        },
+    )
+
+
+def _load_sketches(session: Session, keys) -> dict[RollupKey, Row]:
+    by_resolution: dict[int, tuple[set, set]] = {}
+    for resolution, name, _service, _tagset, bucket in keys:
+        names, buckets = by_resolution.setdefault(resolution, (set(), set()))
+        names.add(name)
+        buckets.add(bucket)
+    existing = {}
+    for resolution, (names, buckets) in by_resolution.items():
+        stmt = (
+            select(
+                MetricRollup.id,
+                MetricRollup.resolution,
+                MetricRollup.name,
+                MetricRollup.service,
+                MetricRollup.tagset,
+                MetricRollup.bucket,
+                MetricRollup.sketch,
+            )
+            .where(
+                MetricRollup.resolution == resolution,
+                MetricRollup.name.in_(names),
+                MetricRollup.bucket.in_(buckets),
+            )
+            .with_for_update()
+        )
+        for rollup in session.exec(stmt):
+            key = (rollup.resolution, rollup.name, rollup.service, rollup.tagset, rollup.bucket)
+            existing[key] = rollup
+    return existing
+
+
+def merge_rollups(session: Session, partials: dict[RollupKey, dict]) -> None:
+    if not partials:
+        return
+    session.execute(
+        upsert_stmt(session),
+        [
+            {
+                **dict(zip(KEY_COLUMNS, key)),
+                "count": partial["count"],
+                "sum": partial["sum"],
+                "min": partial["min"],
+                "max": partial["max"],
+                "sketch": sketch.new_sketch(),
+            }
+            for key, partial in partials.items()
+        ],
+    )
+    # Sketches merge in Python. The upsert has already locked the rows
+    # (Postgres; FOR UPDATE makes it explicit) or taken the database write
+    # lock (SQLite) until commit, so this read-merge-write cannot interleave.
+    existing = _load_sketches(session, partials.keys())
+    updates = [
+        {
+            "rollup_id": existing[key].id,
+            "new_sketch": sketch.merge(
+                sketch.merge(sketch.new_sketch(), existing[key].sketch), partial["sketch"]
+            ),
+        }
+        for key, partial in partials.items()
+    ]
+    table = MetricRollup.__table__
+    stmt = (
+        table.update()
+        .where(table.c.id == bindparam("rollup_id"))
+        .values(sketch=bindparam("new_sketch"))
+    )
+    session.execute(stmt, updates)
+
+
+def update_rollups(session: Session, rows: list[dict]) -> None:
+    merge_rollups(session, partial_rollups(rows))
@@ -1,9 +1,24 @@
+import logging
+from collections import defaultdict
+from collections.abc import Collection, Sequence
 from datetime import datetime, timedelta
-from sqlmodel import select
+from sqlalchemy import case, func, literal_column
+from sqlalchemy.sql import Select
+from sqlmodel import Session, select
 
-from ..db import get_session
-from ..models import Alert, LogEvent, MetricPoint, Monitor
-from ..utils.monitor_dsl import parse_query
+from ..db import get_read_session, get_session
+from ..models import Alert, LogEvent, Monitor
+from ..utils.monitor_dsl import MonitorQuery, parse_query
+from .metric_query import epoch_bucket, merge_stats, stats_by_service
+from .partitions import partition_router
+from .tag_index import TagFilter, posting_filter
+
+logger = logging.getLogger(__name__)
+
+# (source, metric, window, tag filter): monitors sharing one scan per tick
+GroupKey = tuple[str, str | None, timedelta, tuple[tuple[str, ...], ...]]
+# (position in the monitor list, parsed query)
+Member = tuple[int, MonitorQuery]
 
 
 def parse_window(window: str) -> timedelta:
@@ -14,66 +29,159 @@ def parse_window(window: str) -> timedelta:
     raise ValueError("invalid window")
 
 
+def log_error_stmt(
+    services: Collection[str] | None,
+    tags: TagFilter | None,
+    start: datetime,
+    end: datetime,
+    bucket_seconds: int | None = None,
+    dialect: str = "sqlite",
+) -> Select:
+    # (service, total, errors) per service over the window, whatever the log
+    # volume; with bucket_seconds, (service, total, errors, bucket) per bucket
+    refine = [posting_filter(LogEvent.__table__, tags)] if tags else []
+    logs_source = partition_router.source(LogEvent.__table__, start, end, refine)
+    is_error = case((func.lower(logs_source.c.level) == "error", 1), else_=0)
+    stmt = (
+        select(logs_source.c.service, func.count(), func.coalesce(func.sum(is_error), 0))
+        .where(logs_source.c.ts >= start, logs_source.c.ts <= end)
+        .group_by(logs_source.c.service)
+    )
+    if bucket_seconds:
+        bucket = epoch_bucket(logs_source.c.ts, bucket_seconds, dialect).label("bucket")
+        stmt = stmt.add_columns(bucket).group_by(literal_column("bucket"))
+    if services:
+        services = sorted(services)
+        if len(services) == 1:
+            stmt = stmt.where(logs_source.c.service == services[0])
+        else:
+            stmt = stmt.where(logs_source.c.service.in_(services))
+    return stmt
+
+
+def group_key(query: MonitorQuery, window: timedelta) -> GroupKey:
+    tags = tuple(tuple(clause) for clause in query.filter_tags)
+    return query.source, query.metric, window, tags
+
+
 def evaluate_monitor(monitor: Monitor) -> dict:
-    query = parse_query(monitor.query)
-    window = parse_window(monitor.window)
-    end = datetime.utcnow()
-    start = end - window
+    # unlike the batch, a single monitor with a bad query or window raises
+    parse_query(monitor.query)
+    parse_window(monitor.window)
+    return evaluate_monitors([monitor])[0]
+
+
+def group_monitors(monitors: Sequence[Monitor]) -> dict[GroupKey, list[Member]]:
+    # Monitors whose query no longer parses are left out (and evaluate to None).
+    groups: dict[GroupKey, list[Member]] = defaultdict(list)
+    for index, monitor in enumerate(monitors):
+        try:
+            query = parse_query(monitor.query)
+            window = parse_window(monitor.window)
+        except ValueError as exc:
+            logger.warning("monitor %s skipped: %s", monitor.id, exc)
+            continue
+        groups[group_key(query, window)].append((index, query))
+    return groups
+
+
+def group_scope(members: list[Member]) -> set[str] | None:
+    # services a group has to read; None when some member watches all of them
+    services = {query.filter_service for _index, query in members}
+    return None if None in services else services
+
+
+def evaluate_monitors(
+    monitors: Sequence[Monitor], now: datetime | None = None
+) -> list[dict | None]:
+    # Monitors sharing (source, metric, window, tag filter) share one GROUP BY
+    # service scan; each then reads its own service's slice (or all of them).
+    end = now or datetime.utcnow()
+    results: list[dict | None] = [None] * len(monitors)
+    with get_read_session() as session:
+        for (source, metric, window, tags), members in group_monitors(monitors).items():
+            start = end - window
+            scope = group_scope(members)
+            filter_tags = [list(clause) for clause in tags]
+            if source == "metric":
+                parts = stats_by_service(session, metric, scope, start, end, filter_tags)
+            else:
+                stmt = log_error_stmt(scope, filter_tags, start, end)
+                rows = session.execute(stmt)
+                parts = {service: [(total, errors)] for service, total, errors in rows}
+            slice_results(source, members, parts, monitors, results)
+    return results
+
+
+def slice_results(
+    source: str,
+    members: list[Member],
+    parts: dict[str, list[tuple]],
+    monitors: Sequence[Monitor],
+    results: list[dict | None],
+) -> None:
+    for index, query in members:
+        if query.filter_service:
+            selected = parts.get(query.filter_service, [])
+        else:
+            selected = [part for slice_ in parts.values() for part in slice_]
+        current = monitor_value(source, selected)
+        results[index] = {"value": current, "triggered": current > monitors[index].threshold}
+
+
+def monitor_value(source: str, parts: list[tuple]) -> float:
+    if source == "metric":
+        count, avg, _min, _max = merge_stats(parts)
+        return avg if count else 0.0
+    total = sum(part[0] for part in parts)
+    errors = sum(part[1] for part in parts)
+    return errors / total if total else 0.0
+
+
+def upsert_alerts(evaluations: Sequence[tuple[Monitor, dict]]) -> None:
+    # one writer session and commit for a whole tick
+    if not evaluations:
+        return
+    now = datetime.utcnow()
     with get_session() as session:
-        if query.source == "metric":
-            stmt = select(MetricPoint).where(
-                MetricPoint.name == query.metric,
-                MetricPoint.ts >= start,
-                MetricPoint.ts <= end,
+        ids = [monitor.id for monitor, _evaluation in evaluations]
+        alerts: dict[int, Alert] = {}
+        for alert in session.exec(select(Alert).where(Alert.monitor_id.in_(ids))):
+            alerts.setdefault(alert.monitor_id, alert)
+        for monitor, evaluation in evaluations:
+            apply_evaluation(session, alerts.get(monitor.id), monitor, evaluation, now)
+        session.commit()
+
+
+def apply_evaluation(
+    session: Session, alert: Alert | None, monitor: Monitor, evaluation: dict, now: datetime
+) -> Alert | None:
+    if evaluation["triggered"]:
+        if not alert:
+            alert = Alert(
+                monitor_id=monitor.id,
+                status="firing",
+                fired_at=now,
+                payload=evaluation,
             )
-            if query.filter_service:
-                stmt = stmt.where(MetricPoint.service == query.filter_service)
-            points = session.exec(stmt).all()
-            values = [p.value for p in points]
-            avg = sum(values) / len(values) if values else 0.0
-            current = avg
+            session.add(alert)
         else:
-            stmt = select(LogEvent).where(
-                LogEvent.ts >= start,
-                LogEvent.ts <= end,
-            )
-            if query.filter_service:
-                stmt = stmt.where(LogEvent.service == query.filter_service)
-            logs = session.exec(stmt).all()
-            total = len(logs)
-            errors = len([log for log in logs if log.level.lower() == "error"])
-            current = errors / total if total else 0.0
-        triggered = current > monitor.threshold
-        return {
-            "value": current,
-            "triggered": triggered,
-        }
+            alert.status = "firing"
+            alert.payload = evaluation
+        return alert
+    if alert and alert.status == "firing":
+        alert.status = "resolved"
+        alert.resolved_at = now
+        alert.payload = evaluation
+    return alert
 
 
 def upsert_alert(monitor: Monitor, evaluation: dict) -> Alert:
     now = datetime.utcnow()
     with get_session() as session:
         stmt = select(Alert).where(Alert.monitor_id == monitor.id)
-        alert = session.exec(stmt).first()
-        if evaluation["triggered"]:
-            if not alert:
-                alert = Alert(
-                    monitor_id=monitor.id,
-                    status="firing",
-                    fired_at=now,
-                    payload=evaluation,
-                )
-                session.add(alert)
-            else:
-                alert.status = "firing"
-                alert.payload = evaluation
-            session.commit()
-            session.refresh(alert)
-            return alert
-        if alert and alert.status == "firing":
-            alert.status = "resolved"
-            alert.resolved_at = now
-            alert.payload = evaluation
-            session.commit()
+        alert = apply_evaluation(session, session.exec(stmt).first(), monitor, evaluation, now)
+        session.commit()
+        if alert:
             session.refresh(alert)
         return alert
@@ -0,0 +1,145 @@
+import heapq
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from ..models import Monitor
+from .monitor_eval import parse_window
+
+# how often a monitor runs relative to its window: more often the more severe
+SEVERITY_FACTORS = {"critical": 0.25, "high": 0.5, "medium": 1.0, "low": 2.0}
+# a medium monitor runs this many times per window
+RUNS_PER_WINDOW = 10
+
+
+@dataclass
+class MonitorSchedule:
+    monitor: Monitor
+    interval: float
+    due: float
+    # seconds between the due time and the start of the last run
+    lag: float = 0.0
+    duration: float = 0.0
+    runs: int = 0
+    skipped: int = 0
+    running: bool = False
+    started: float = 0.0
+
+
+class MonitorScheduler:
+    # Due times per monitor, in a heap of (due, monitor id). Each monitor's
+    # interval follows from its window and severity, clamped to
+    # [min_interval, max_interval], and every due time is jittered so the
+    # fleet does not query at one instant. A monitor whose previous run is
+    # still going when it comes due skips that turn. Times are clock()
+    # seconds; evaluation itself is left to the caller (see main.monitor_loop).
+    def __init__(
+        self,
+        min_interval: float,
+        max_interval: float,
+        jitter: float = 0.1,
+        clock: Callable[[], float] = time.monotonic,
+        rng: random.Random | None = None,
+    ) -> None:
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.jitter = jitter
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._schedules: dict[int, MonitorSchedule] = {}
+        self._heap: list[tuple[float, int]] = []
+        self.skipped = 0
+
+    def interval(self, monitor: Monitor) -> float:
+        try:
+            window = parse_window(monitor.window).total_seconds()
+        except ValueError:
+            window = self.max_interval * RUNS_PER_WINDOW
+        factor = SEVERITY_FACTORS.get(monitor.severity.lower(), 1.0)
+        interval = window / RUNS_PER_WINDOW * factor
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def sync(self, monitors: list[Monitor]) -> None:
+        # the current monitor list: new monitors start somewhere in their first
+        # interval, edited ones keep their slot unless the interval changed
+        now = self._clock()
+        current = {}
+        for monitor in monitors:
+            interval = self.interval(monitor)
+            schedule = self._schedules.get(monitor.id)
+            if schedule is None or schedule.interval != interval:
+                due = now + self._rng.uniform(0, interval)
+                if schedule is None:
+                    schedule = MonitorSchedule(monitor, interval, due)
+                else:
+                    schedule.interval, schedule.due = interval, due
+                heapq.heappush(self._heap, (due, monitor.id))
+            schedule.monitor = monitor
+            current[monitor.id] = schedule
+        self._schedules = current
+
+    def next_due(self) -> float | None:
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def take_due(self) -> list[MonitorSchedule]:
+        now = self._clock()
+        batch = []
+        while self._heap and self._heap[0][0] <= now:
+            due, monitor_id = heapq.heappop(self._heap)
+            schedule = self._schedules.get(monitor_id)
+            # entries of deleted or rescheduled monitors
+            if schedule is None or schedule.due != due:
+                continue
+            self._reschedule(schedule, now)
+            if schedule.running:
+                schedule.skipped += 1
+                self.skipped += 1
+                continue
+            schedule.running = True
+            schedule.started = now
+            schedule.lag = now - due
+            batch.append(schedule)
+        return batch
+
+    def finish(self, batch: list[MonitorSchedule]) -> None:
+        now = self._clock()
+        for schedule in batch:
+            schedule.running = False
+            schedule.duration = now - schedule.started
+            schedule.runs += 1
+
+    def stats(self) -> dict:
+        schedules = self._schedules.values()
+        return {
+            "monitors": len(self._schedules),
+            "running": sum(schedule.running for schedule in schedules),
+            "skipped": self.skipped,
+            "max_lag_sec": round(max((s.lag for s in schedules), default=0.0), 3),
+            "per_monitor": {
+                monitor_id: {
+                    "interval_sec": round(schedule.interval, 3),
+                    "lag_sec": round(schedule.lag, 3),
+                    "duration_sec": round(schedule.duration, 3),
+                    "runs": schedule.runs,
+                    "skipped": schedule.skipped,
+                }
+                for monitor_id, schedule in self._schedules.items()
+            },
+        }
+
+    def _reschedule(self, schedule: MonitorSchedule, now: float) -> None:
+        # keep the cadence, but a monitor that fell behind does not run twice
+        # to catch up
+        step = schedule.interval * (1 + self._rng.uniform(-self.jitter, self.jitter))
+        schedule.due = max(schedule.due + step, now + schedule.interval * (1 - self.jitter))
+        heapq.heappush(self._heap, (schedule.due, schedule.monitor.id))
+
+    def _drop_stale(self) -> None:
+        while self._heap:
+            due, monitor_id = self._heap[0]
+            schedule = self._schedules.get(monitor_id)
+            if schedule is not None and schedule.due == due:
+                return
+            heapq.heappop(self._heap)
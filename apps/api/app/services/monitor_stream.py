@@ -0,0 +1,297 @@
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+from ..config import get_settings
+from ..db import get_read_session
+from ..models import Alert, Monitor
+from ..utils.monitor_dsl import MonitorQuery
+from .monitor_eval import GroupKey, apply_evaluation, monitor_value
+from .monitor_window import (
+    SLICE_SEC,
+    IncrementalEvaluator,
+    ReadPlan,
+    to_epoch,
+    window_start,
+)
+from .tag_index import tag_terms
+
+settings = get_settings()
+
+# (bucket, service) -> one combined partial, for a single group
+Delta = dict[tuple[int, str], tuple]
+PENDING_KEY = "monitor_stream"
+
+
+@dataclass
+class Pending:
+    # what one uncommitted transaction has added so far
+    deltas: dict[GroupKey, Delta] = field(default_factory=lambda: defaultdict(dict))
+    triggered: dict[int, bool] = field(default_factory=dict)
+    # commit sequence, taken when the transaction starts to commit
+    seq: int | None = None
+
+
+def row_partial(kind: str, row: dict) -> tuple:
+    if kind == "metric":
+        value = row["value"]
+        return 1, value, value, value
+    return 1, int(row["level"].lower() == "error")
+
+
+def combine(source: str, left: tuple, right: tuple) -> tuple:
+    if source == "metric":
+        return (
+            left[0] + right[0],
+            left[1] + right[1],
+            min(left[2], right[2]),
+            max(left[3], right[3]),
+        )
+    return left[0] + right[0], left[1] + right[1]
+
+
+def merge_slot(source: str, delta: Delta, slot: tuple[int, str], partial: tuple) -> None:
+    previous = delta.get(slot)
+    delta[slot] = partial if previous is None else combine(source, previous, partial)
+
+
+class Matcher:
+    # Compiled from the monitor groups: (metric name, service) and log service
+    # -> the groups whose window a row lands in. Service-less groups sit under
+    # None; tag filters are checked per row, against that row's terms only.
+    def __init__(self, scopes: dict[GroupKey, set[str] | None]) -> None:
+        self._metric: dict[tuple[str, str | None], list[GroupKey]] = defaultdict(list)
+        self._logs: dict[str | None, list[GroupKey]] = defaultdict(list)
+        for key, scope in scopes.items():
+            source, metric, _window, _tags = key
+            for service in scope if scope is not None else [None]:
+                if source == "metric":
+                    self._metric[(metric, service)].append(key)
+                else:
+                    self._logs[service].append(key)
+
+    def match(self, kind: str, row: dict) -> list[GroupKey]:
+        if kind == "metric":
+            name = row["name"]
+            keys = self._metric.get((name, row["service"]), [])
+            keys = keys + self._metric.get((name, None), [])
+            field = "tags"
+        else:
+            keys = self._logs.get(row["service"], []) + self._logs.get(None, [])
+            field = "attrs"
+        if not keys:
+            return keys
+        terms = None
+        matched = []
+        for key in keys:
+            if key[3]:
+                if terms is None:
+                    terms = set(tag_terms(row.get(field)))
+                if not all(terms.intersection(clause) for clause in key[3]):
+                    continue
+            matched.append(key)
+        return matched
+
+
+class StreamingEvaluator(IncrementalEvaluator):
+    # Incremental windows that are also fed by the ingest path. Each written
+    # batch goes through the compiled matcher, updates the windows it touches
+    # and re-checks only their monitors; alerts that flip are written in the
+    # ingest transaction, and the windows take the batch once it commits. The
+    # polling tick still reconciles open slices against the database and
+    # recompiles the matcher when monitors change.
+    def __init__(self, session_factory, enabled: bool = False) -> None:
+        super().__init__(session_factory)
+        self.enabled = enabled
+        self._matcher: Matcher | None = None
+        self._members: dict[GroupKey, list[tuple[Monitor, MonitorQuery]]] = {}
+        self._triggered: dict[int, bool] = {}
+        # Every committing transaction gets a sequence number. A window read
+        # first waits out the commits already in flight, so all commits up to
+        # its watermark are in the database it reads; deltas applied while it
+        # runs are re-added after its merge only when they are newer. (A commit
+        # starting between the watermark and the read's statement can still be
+        # counted twice, until that slice is next re-read.)
+        self._seq = 0
+        self._in_flight: set[int] = set()
+        self._commits = threading.Condition(self._lock)
+        self._reading: Counter[GroupKey] = Counter()
+        self._recent: dict[GroupKey, list[tuple[int, Delta]]] = defaultdict(list)
+        self.rows_matched = 0
+        self.alerts_changed = 0
+
+    def _synced(self, groups, monitors) -> None:
+        self._members = {
+            key: [(monitors[index], query) for index, query in members]
+            for key, members in groups.items()
+        }
+        self._matcher = Matcher(self._scopes)
+        ids = {monitor.id for monitor in monitors}
+        self._triggered = {
+            monitor_id: triggered
+            for monitor_id, triggered in self._triggered.items()
+            if monitor_id in ids
+        }
+
+    def _evaluated(self, monitors, results) -> None:
+        for monitor, result in zip(monitors, results):
+            if result is not None:
+                self._triggered[monitor.id] = result["triggered"]
+
+    def observe(self, session: Session, kind: str, rows: list[dict]) -> None:
+        if kind not in ("metric", "log"):
+            return
+        now = datetime.utcnow()
+        with self._lock:
+            if self._matcher is None:
+                return
+            deltas: dict[GroupKey, Delta] = defaultdict(dict)
+            for row in rows:
+                keys = self._matcher.match(kind, row)
+                if not keys:
+                    continue
+                self.rows_matched += 1
+                partial = row_partial(kind, row)
+                bucket = to_epoch(row["ts"]) // SLICE_SEC * SLICE_SEC
+                for key in keys:
+                    if bucket < window_start(key[2], now):
+                        continue
+                    merge_slot(key[0], deltas[key], (bucket, row["service"]), partial)
+            if not deltas:
+                return
+            pending = self._pending(session)
+            for key, delta in deltas.items():
+                for slot, partial in delta.items():
+                    merge_slot(key[0], pending.deltas[key], slot, partial)
+            changed = self._check(pending, deltas, now)
+        if changed:
+            self._write_alerts(session, changed)
+
+    def _pending(self, session: Session) -> Pending:
+        # Batches of one transaction see each other before they commit; the
+        # windows only take them once the transaction does. The listeners stay
+        # on the session and pick up whatever its current transaction left.
+        pending = session.info.get(PENDING_KEY)
+        if pending is None:
+            pending = session.info[PENDING_KEY] = Pending()
+            if not event.contains(session, "after_commit", self._on_commit):
+                event.listen(session, "before_commit", self._on_before_commit)
+                event.listen(session, "after_commit", self._on_commit)
+                event.listen(session, "after_transaction_end", self._on_end)
+        return pending
+
+    def _on_before_commit(self, session: Session) -> None:
+        pending = session.info.get(PENDING_KEY)
+        if pending is not None and pending.seq is None:
+            with self._lock:
+                self._seq += 1
+                pending.seq = self._seq
+                self._in_flight.add(pending.seq)
+
+    def _on_commit(self, session: Session) -> None:
+        pending = session.info.pop(PENDING_KEY, None)
+        if pending is not None:
+            self._apply(pending)
+
+    def _on_end(self, session: Session, transaction) -> None:
+        # rolled back, or closed without committing
+        if transaction.parent is not None:
+            return
+        pending = session.info.pop(PENDING_KEY, None)
+        if pending is not None and pending.seq is not None:
+            with self._lock:
+                self._in_flight.discard(pending.seq)
+                self._commits.notify_all()
+
+    def _read_started(self, plan: ReadPlan) -> None:
+        with self._lock:
+            watermark = self._seq
+            self._commits.wait_for(
+                lambda: all(seq > watermark for seq in self._in_flight)
+            )
+            plan.watermark = watermark
+            self._reading[plan.key] += 1
+
+    def _merged(self, plan: ReadPlan, replaced: bool) -> None:
+        if plan.watermark is None:
+            return
+        if replaced:
+            # commits after the watermark that landed in slices the read replaced
+            for seq, delta in self._recent.get(plan.key, []):
+                if seq <= plan.watermark:
+                    continue
+                for (bucket, service), partial in delta.items():
+                    if bucket >= plan.start:
+                        slices = plan.state.slices.setdefault(bucket, {})
+                        slices.setdefault(service, []).append(partial)
+        self._reading[plan.key] -= 1
+        if not self._reading[plan.key]:
+            del self._reading[plan.key]
+            self._recent.pop(plan.key, None)
+
+    def _check(
+        self, pending: Pending, deltas: dict[GroupKey, Delta], now: datetime
+    ) -> list[tuple[Monitor, dict]]:
+        changed = []
+        for key in deltas:
+            state = self._groups.get(key)
+            if state is None:
+                continue
+            parts = state.parts(window_start(key[2], now))
+            for (_bucket, service), partial in pending.deltas[key].items():
+                parts.setdefault(service, []).append(partial)
+            for monitor, query in self._members.get(key, []):
+                if query.filter_service:
+                    selected = parts.get(query.filter_service, [])
+                else:
+                    selected = [part for slice_ in parts.values() for part in slice_]
+                value = monitor_value(key[0], selected)
+                triggered = value > monitor.threshold
+                was = pending.triggered.get(monitor.id, self._triggered.get(monitor.id, False))
+                if triggered != was:
+                    pending.triggered[monitor.id] = triggered
+                    changed.append((monitor, {"value": value, "triggered": triggered}))
+        return changed
+
+    def _write_alerts(self, session: Session, changed: list[tuple[Monitor, dict]]) -> None:
+        # same writer session as the rows, so alert and data commit together
+        now = datetime.utcnow()
+        ids = [monitor.id for monitor, _evaluation in changed]
+        alerts: dict[int, Alert] = {}
+        for alert in session.exec(select(Alert).where(Alert.monitor_id.in_(ids))):
+            alerts.setdefault(alert.monitor_id, alert)
+        for monitor, evaluation in changed:
+            apply_evaluation(session, alerts.get(monitor.id), monitor, evaluation, now)
+
+    def _apply(self, pending: Pending) -> None:
+        with self._lock:
+            for key, delta in pending.deltas.items():
+                state = self._groups.get(key)
+                if state is None:
+                    continue
+                for (bucket, service), partial in delta.items():
+                    state.slices.setdefault(bucket, {}).setdefault(service, []).append(partial)
+                if self._reading[key]:
+                    self._recent[key].append((pending.seq, delta))
+            for monitor_id, triggered in pending.triggered.items():
+                if triggered != self._triggered.get(monitor_id, False):
+                    self._triggered[monitor_id] = triggered
+                    self.alerts_changed += 1
+            self._in_flight.discard(pending.seq)
+            self._commits.notify_all()
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats.update(
+            streaming=self.enabled,
+            rows_matched=self.rows_matched,
+            alerts_changed=self.alerts_changed,
+        )
+        return stats
+
+
+monitor_stream = StreamingEvaluator(get_read_session, enabled=settings.monitor_streaming)
@@ -0,0 +1,188 @@
+import threading
+from itertools import zip_longest
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import Session
+
+from ..models import Monitor
+from .metric_query import bucket_stats_by_service
+from .metric_rollups import RESOLUTIONS
+from .monitor_eval import (
+    GroupKey,
+    Member,
+    group_monitors,
+    group_scope,
+    log_error_stmt,
+    slice_results,
+)
+
+EPOCH = datetime(1970, 1, 1)
+# one slice per finest rollup bucket, so metric windows rebuild straight from rollups
+SLICE_SEC = RESOLUTIONS[0]
+# slices re-read on every tick besides the open one, for rows that arrive late
+SETTLE_SLICES = 1
+
+
+def to_epoch(ts: datetime) -> int:
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return int((ts - EPOCH).total_seconds())
+
+
+def window_start(window: timedelta, now: datetime) -> int:
+    # first slice still (partly) inside the window
+    return to_epoch(now - window) // SLICE_SEC * SLICE_SEC
+
+
+@dataclass
+class GroupWindow:
+    # partials per slice start (epoch seconds) and service: (count, sum, min, max)
+    # for metrics, (total, errors) for logs
+    scope: frozenset[str] | None
+    slices: dict[int, dict[str, list[tuple]]] = field(default_factory=dict)
+    # slices from here on are re-read on the next tick; earlier ones are final
+    open_from: int = 0
+
+    def covers(self, scope: set[str] | None) -> bool:
+        if self.scope is None:
+            return True
+        return scope is not None and scope <= self.scope
+
+    def parts(self, since: int = 0) -> dict[str, list[tuple]]:
+        merged: dict[str, list[tuple]] = {}
+        for bucket, services in self.slices.items():
+            if bucket < since:
+                continue
+            for service, partials in services.items():
+                merged.setdefault(service, []).extend(partials)
+        return merged
+
+
+@dataclass
+class ReadPlan:
+    # one group's read for a tick: slices from `start` on are replaced, those
+    # before `first` have left the window
+    key: GroupKey
+    state: GroupWindow
+    first: int
+    start: int
+    current: int
+    # ingest commits the read is known to include (see monitor_stream)
+    watermark: int | None = None
+
+
+class IncrementalEvaluator:
+    # Sliding windows kept as ring buffers of SLICE_SEC partials per monitor
+    # group. A tick reads only the slices still open, evicts the ones that
+    # left the window and merges the rest in memory, so query cost follows the
+    # ingest rate rather than the window length. A group seen for the first
+    # time (after a restart, or a new monitor) is rebuilt with one bucketed
+    # read over its whole window: from metric rollups, or logs directly.
+    def __init__(self, session_factory) -> None:
+        self._session_factory = session_factory
+        self._groups: dict[GroupKey, GroupWindow] = {}
+        # services each group reads, over all monitors last synced
+        self._scopes: dict[GroupKey, set[str] | None] = {}
+        # windows are also fed from ingest threads (see monitor_stream)
+        self._lock = threading.Lock()
+
+    def sync(self, monitors: list[Monitor]) -> None:
+        groups = group_monitors(monitors)
+        with self._lock:
+            self._sync(groups, monitors)
+
+    def evaluate(
+        self, monitors: list[Monitor], now: datetime | None = None, sync: bool = True
+    ) -> list[dict | None]:
+        # sync=False evaluates some of the monitors last passed to sync(),
+        # leaving the other groups' windows alone
+        now = now or datetime.utcnow()
+        groups = group_monitors(monitors)
+        results: list[dict | None] = [None] * len(monitors)
+        with self._lock:
+            if sync:
+                self._sync(groups, monitors)
+            plans = [self._plan(key, members, now) for key, members in groups.items()]
+        # the reads run without the lock, so ingest threads feeding the
+        # windows (see monitor_stream) never wait behind them
+        reads: list[dict[tuple[int, str], list[tuple]]] = []
+        try:
+            with self._session_factory() as session:
+                for plan in plans:
+                    self._read_started(plan)
+                    reads.append(self._read(session, plan.key, plan.state, plan.start, now))
+        finally:
+            with self._lock:
+                # a failed read leaves its group's slices as they were
+                for plan, read in zip_longest(plans, reads):
+                    self._merge(plan, read)
+                if len(reads) == len(plans):
+                    for plan in plans:
+                        members = groups[plan.key]
+                        slice_results(plan.key[0], members, plan.state.parts(), monitors, results)
+                    self._evaluated(monitors, results)
+        return results
+
+    def _sync(self, groups: dict[GroupKey, list[Member]], monitors: list[Monitor]) -> None:
+        self._scopes = {key: group_scope(members) for key, members in groups.items()}
+        # windows of deleted or edited monitors
+        for key in self._groups.keys() - groups.keys():
+            del self._groups[key]
+        self._synced(groups, monitors)
+
+    def _synced(self, groups: dict[GroupKey, list[Member]], monitors: list[Monitor]) -> None:
+        pass
+
+    def _evaluated(self, monitors: list[Monitor], results: list[dict | None]) -> None:
+        pass
+
+    def _read_started(self, plan: ReadPlan) -> None:
+        pass
+
+    def _merged(self, plan: ReadPlan, replaced: bool) -> None:
+        pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "groups": len(self._groups),
+                "slices": sum(len(state.slices) for state in self._groups.values()),
+            }
+
+    def _plan(self, key: GroupKey, members: list[Member], now: datetime) -> ReadPlan:
+        scope = self._scopes[key] if key in self._scopes else group_scope(members)
+        state = self._groups.get(key)
+        if state is None or not state.covers(scope):
+            state = GroupWindow(frozenset(scope) if scope is not None else None)
+            self._groups[key] = state
+        first = window_start(key[2], now)
+        current = to_epoch(now) // SLICE_SEC * SLICE_SEC
+        return ReadPlan(key, state, first, max(first, state.open_from), current)
+
+    def _merge(self, plan: ReadPlan, read: dict[tuple[int, str], list[tuple]] | None) -> None:
+        if read is not None:
+            state = plan.state
+            for bucket in [b for b in state.slices if b < plan.first or b >= plan.start]:
+                del state.slices[bucket]
+            for (bucket, service), partials in read.items():
+                state.slices.setdefault(bucket, {})[service] = partials
+            state.open_from = plan.current - SETTLE_SLICES * SLICE_SEC
+        self._merged(plan, read is not None)
+
+    def _read(
+        self, session: Session, key: GroupKey, state: GroupWindow, start: int, now: datetime
+    ) -> dict[tuple[int, str], list[tuple]]:
+        source, metric, _window, tags = key
+        filter_tags = [list(clause) for clause in tags]
+        since = EPOCH + timedelta(seconds=start)
+        if source == "metric":
+            return bucket_stats_by_service(
+                session, metric, state.scope, since, now, SLICE_SEC, filter_tags
+            )
+        dialect = session.get_bind().dialect.name
+        stmt = log_error_stmt(state.scope, filter_tags, since, now, SLICE_SEC, dialect)
+        return {
+            (int(bucket), service): [(total, errors)]
+            for service, total, errors, bucket in session.execute(stmt)
+        }
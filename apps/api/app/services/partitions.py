@@ -0,0 +1,187 @@
+import re
+import threading
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from typing import Callable, Sequence
+
+from sqlalchemy import Column, Index, MetaData, Table, event, inspect, select, union_all
+from sqlalchemy.sql import FromClause, Select
+from sqlmodel import Session
+
+from ..config import get_settings
+from ..models import LogEvent, LogPosting, MetricPoint, Span, SpanPosting
+
+settings = get_settings()
+
+# base table -> column its daily partitions are keyed on
+PARTITIONED = {
+    MetricPoint.__tablename__: "ts",
+    LogEvent.__tablename__: "ts",
+    Span.__tablename__: "start_ts",
+    # postings share their row's day, so they drop together
+    LogPosting.__tablename__: "ts",
+    SpanPosting.__tablename__: "ts",
+}
+BASE_TABLES = {
+    model.__tablename__: model.__table__
+    for model in (MetricPoint, LogEvent, Span, LogPosting, SpanPosting)
+}
+PARTITION_RE = re.compile(r"^(\w+)_(\d{8})$")
+
+# (member select, member table, its day or None for the base table) -> select
+Refine = Callable[[Select, Table, date | None], Select]
+
+
+def day_of(ts: datetime) -> date:
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc)
+    return ts.date()
+
+
+def partition_name(base: Table, day: date) -> str:
+    return f"{base.name}_{day:%Y%m%d}"
+
+
+def partition_table(base: Table, day: date, metadata: MetaData) -> Table:
+    name = partition_name(base, day)
+    if name in metadata.tables:
+        return metadata.tables[name]
+    table = Table(
+        name,
+        metadata,
+        *(
+            Column(column.name, column.type, primary_key=column.primary_key)
+            for column in base.columns
+        ),
+        **base.kwargs,
+    )
+    for index in base.indexes:
+        Index(
+            index.name.replace(base.name, name, 1),
+            *(table.c[column.name] for column in index.columns),
+        )
+    return table
+
+
+class PartitionRouter:
+    # Daily tables (<table>_YYYYMMDD) for metricpoint, logevent and span. The
+    # unpartitioned base table stays in every read, so rows written before
+    # partitioning was switched on remain visible (and age out via DELETE).
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self._metadata = MetaData()
+        self._days: dict[str, dict[date, Table]] = defaultdict(dict)
+        self._lock = threading.Lock()
+
+    def load(self, session: Session) -> None:
+        days: dict[str, dict[date, Table]] = defaultdict(dict)
+        for name in inspect(session.connection()).get_table_names():
+            match = PARTITION_RE.match(name)
+            if not match or match.group(1) not in PARTITIONED:
+                continue
+            base = BASE_TABLES[match.group(1)]
+            day = datetime.strptime(match.group(2), "%Y%m%d").date()
+            days[base.name][day] = partition_table(base, day, self._metadata)
+        with self._lock:
+            self._days = days
+
+    def partitioned(self, base: Table) -> bool:
+        return self.enabled and base.name in PARTITIONED
+
+    def days(
+        self, base: Table, start: datetime | None = None, end: datetime | None = None
+    ) -> list[tuple[date, Table]]:
+        first = day_of(start) if start else date.min
+        last = day_of(end) if end else date.max
+        with self._lock:
+            days = self._days.get(base.name, {})
+            return [(day, days[day]) for day in sorted(days) if first <= day <= last]
+
+    def tables(
+        self, base: Table, start: datetime | None = None, end: datetime | None = None
+    ) -> list[Table]:
+        return [table for _day, table in self.days(base, start, end)]
+
+    def partition(self, base: Table, day: date) -> Table | None:
+        with self._lock:
+            return self._days.get(base.name, {}).get(day)
+
+    def source(
+        self,
+        base: Table,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        refine: Sequence[Refine] = (),
+    ) -> FromClause:
+        # refine steps run against each member table, for filters that pair a
+        # partition with a same-day companion table (postings, full-text index)
+        parts: list[tuple[date | None, Table]] = [(None, base)]
+        if self.partitioned(base):
+            parts += self.days(base, start, end)
+        if len(parts) == 1 and not refine:
+            return base
+        selects = []
+        for day, table in parts:
+            member = select(*table.c)
+            for step in refine:
+                member = step(member, table, day)
+            selects.append(member)
+        stmt = selects[0] if len(selects) == 1 else union_all(*selects)
+        return stmt.subquery(f"{base.name}_parts")
+
+    def write(
+        self, session: Session, base: Table, rows: list[dict], returning: bool = False
+    ) -> list[int]:
+        # with returning, the new ids come back in the order of rows
+        ts_column = PARTITIONED[base.name]
+        by_day: dict[date, list[int]] = defaultdict(list)
+        for position, row in enumerate(rows):
+            by_day[day_of(row[ts_column])].append(position)
+        ids = [0] * len(rows) if returning else []
+        for day, positions in by_day.items():
+            table = self._ensure(session, base, day)
+            day_rows = [rows[position] for position in positions]
+            if not returning:
+                session.execute(table.insert(), day_rows)
+                continue
+            stmt = table.insert().returning(table.c.id, sort_by_parameter_order=True)
+            for position, row_id in zip(positions, session.execute(stmt, day_rows).scalars()):
+                ids[position] = row_id
+        return ids
+
+    def _ensure(self, session: Session, base: Table, day: date) -> Table:
+        with self._lock:
+            table = self._days[base.name].get(day)
+        if table is not None:
+            return table
+        table = partition_table(base, day, self._metadata)
+        table.create(session.connection(), checkfirst=True)
+
+        def remember(_session: Session) -> None:
+            with self._lock:
+                self._days[base.name][day] = table
+
+        event.listen(session, "after_commit", remember, once=True)
+        return table
+
+    def expired(self, base: Table, cutoff: datetime) -> list[tuple[date, Table]]:
+        # whole days only: a partition goes once all of its day is before the cutoff
+        with self._lock:
+            days = self._days.get(base.name, {})
+            return [(day, days[day]) for day in sorted(days) if day < day_of(cutoff)]
+
+    def drop(self, session: Session, base: Table, day: date, table: Table) -> None:
+        table.drop(session.connection(), checkfirst=True)
+
+        def forget(_session: Session) -> None:
+            with self._lock:
+                self._days[base.name].pop(day, None)
+
+        event.listen(session, "after_commit", forget, once=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {name: len(days) for name, days in self._days.items()}
+
+
+partition_router = PartitionRouter(enabled=settings.partitioning == "daily")
@@ -0,0 +1,202 @@
+import logging
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Callable, ContextManager
+
+from sqlalchemy import Table, delete, func, select
+from sqlmodel import Session
+
+from ..config import Settings
+from ..models import LogEvent, MetricPoint, MetricRollup, Series, Span, SyntheticResult
+from .metric_rollups import update_rollups
+from .partitions import partition_router
+from .segment_store import segment_store
+from .tag_index import POSTINGS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RetentionPolicy:
+    name: str
+    model: type
+    ts_column: str
+    max_age: timedelta
+    resolution: int | None = None
+    downsample: bool = False
+
+    def expired(self, cutoff: datetime) -> list:
+        table = self.model.__table__
+        clauses = [table.c[self.ts_column] < cutoff]
+        if self.resolution is not None:
+            clauses.append(table.c.resolution == self.resolution)
+        return clauses
+
+
+def build_policies(settings: Settings) -> list[RetentionPolicy]:
+    # raw points are folded into rollups at ingest; only when that is switched
+    # off does the compactor have to downsample them before they expire
+    policies = [
+        RetentionPolicy(
+            "metricpoint",
+            MetricPoint,
+            "ts",
+            timedelta(days=settings.retention_metric_days),
+            downsample=not settings.metric_rollups_enabled,
+        ),
+        RetentionPolicy(
+            "metricrollup_1m",
+            MetricRollup,
+            "bucket",
+            timedelta(days=settings.retention_rollup_1m_days),
+            resolution=60,
+        ),
+        RetentionPolicy(
+            "metricrollup_1h",
+            MetricRollup,
+            "bucket",
+            timedelta(days=settings.retention_rollup_1h_days),
+            resolution=3600,
+        ),
+        RetentionPolicy(
+            "metricrollup_1d",
+            MetricRollup,
+            "bucket",
+            timedelta(days=settings.retention_rollup_1d_days),
+            resolution=86400,
+        ),
+        RetentionPolicy("logevent", LogEvent, "ts", timedelta(days=settings.retention_log_days)),
+        RetentionPolicy("span", Span, "start_ts", timedelta(days=settings.retention_span_days)),
+        RetentionPolicy(
+            "syntheticresult",
+            SyntheticResult,
+            "ts",
+            timedelta(days=settings.retention_synthetic_days),
+        ),
+    ]
+    return [policy for policy in policies if policy.max_age > timedelta(0)]
+
+
+class RetentionCompactor:
+    def __init__(
+        self,
+        session_factory: Callable[[], ContextManager[Session]],
+        policies: list[RetentionPolicy],
+        chunk_rows: int = 5000,
+        pause_sec: float = 0.01,
+    ) -> None:
+        self._session_factory = session_factory
+        self.policies = policies
+        self.chunk_rows = chunk_rows
+        self.pause_sec = pause_sec
+        self.runs = 0
+        self.rows_deleted = 0
+        self.errors = 0
+        self.last_run: dict = {}
+
+    def run(self, now: datetime | None = None) -> dict:
+        now = now or datetime.utcnow()
+        start = time.perf_counter()
+        tables = {}
+        for policy in self.policies:
+            policy_start = time.perf_counter()
+            try:
+                dropped, deleted = self._expire(policy, now - policy.max_age)
+            except Exception:  # noqa: BLE001
+                self.errors += 1
+                logger.exception("retention failed for %s", policy.name)
+                continue
+            tables[policy.name] = {
+                "rows_deleted": deleted,
+                "partitions_dropped": dropped,
+                "seconds": time.perf_counter() - policy_start,
+            }
+        rows_deleted = sum(table["rows_deleted"] for table in tables.values())
+        report = {
+            "ts": now,
+            "rows_deleted": rows_deleted,
+            "seconds": time.perf_counter() - start,
+            "tables": tables,
+        }
+        self.runs += 1
+        self.rows_deleted += rows_deleted
+        self.last_run = report
+        logger.info("retention reclaimed %d rows in %.3fs", rows_deleted, report["seconds"])
+        return report
+
+    def _expire(self, policy: RetentionPolicy, cutoff: datetime) -> tuple[int, int]:
+        base = policy.model.__table__
+        dropped = deleted = 0
+        if partition_router.partitioned(base):
+            for day, partition in partition_router.expired(base, cutoff):
+                deleted += self._drop_partition(policy, day, partition)
+                dropped += 1
+        if policy.model is MetricPoint and segment_store.enabled:
+            with self._session_factory() as session:
+                deleted += segment_store.expire(session, cutoff, policy.downsample)
+                session.commit()
+        # one short transaction per chunk so the ingest writer can take the
+        # (single) write connection in between
+        while True:
+            with self._session_factory() as session:
+                count = self._delete_chunk(session, policy, cutoff)
+                session.commit()
+            deleted += count
+            if count < self.chunk_rows:
+                return dropped, deleted
+            time.sleep(self.pause_sec)
+
+    def _drop_partition(self, policy: RetentionPolicy, day: date, partition: Table) -> int:
+        with self._session_factory() as session:
+            rows = session.execute(select(func.count()).select_from(partition)).scalar_one()
+            if policy.downsample:
+                last_id = 0
+                while True:
+                    chunk = self._downsample(session, partition, partition.c.id > last_id)
+                    if not chunk:
+                        break
+                    last_id = chunk[-1]
+            base = policy.model.__table__
+            partition_router.drop(session, base, day, partition)
+            if base.name in POSTINGS:
+                postings = POSTINGS[base.name][0]
+                postings_partition = partition_router.partition(postings, day)
+                if postings_partition is not None:
+                    partition_router.drop(session, postings, day, postings_partition)
+            session.commit()
+        return rows
+
+    def _delete_chunk(self, session: Session, policy: RetentionPolicy, cutoff: datetime) -> int:
+        table = policy.model.__table__
+        stmt = select(table.c.id).where(*policy.expired(cutoff)).limit(self.chunk_rows)
+        ids = session.execute(stmt).scalars().all()
+        if not ids:
+            return 0
+        if policy.downsample:
+            self._downsample(session, table, table.c.id.in_(ids))
+        session.execute(delete(table).where(table.c.id.in_(ids)))
+        if table.name in POSTINGS:
+            postings = POSTINGS[table.name][0]
+            session.execute(delete(postings).where(postings.c.ref_id.in_(ids)))
+        return len(ids)
+
+    def _downsample(self, session: Session, table: Table, where) -> list[int]:
+        stmt = (
+            select(table.c.id, Series.name, table.c.ts, table.c.value, Series.tags, Series.service)
+            .join(Series, Series.id == table.c.series_id)
+            .where(where)
+            .order_by(table.c.id)
+            .limit(self.chunk_rows)
+        )
+        rows = session.execute(stmt).mappings().all()
+        update_rollups(session, [dict(row) for row in rows])
+        return [row["id"] for row in rows]
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "rows_deleted": self.rows_deleted,
+            "errors": self.errors,
+            "last_run": self.last_run,
+        }
@@ -0,0 +1,254 @@
+import logging
+import mmap
+import os
+import shutil
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, ContextManager, Iterator
+
+from sqlalchemy import Row, Select, Table, delete, event, select
+from sqlmodel import Session
+
+from ..config import get_settings
+from ..models import MetricPoint, MetricSegment, Series
+from ..utils.gorilla import decode_block, encode_block, iter_blocks
+from .metric_rollups import update_rollups
+from .partitions import partition_router
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+# (series row, timestamps in epoch microseconds, values) for one decoded block range
+SegmentChunk = tuple[Row, memoryview, memoryview]
+
+
+def to_micros(ts: datetime) -> int:
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return (ts - EPOCH) // MICROSECOND
+
+
+def from_micros(micros: int) -> datetime:
+    return EPOCH + micros * MICROSECOND
+
+
+class SegmentStore:
+    # Sealed metric points live in append-only files, one per (day, series):
+    # <root>/<YYYYMMDD>/<series_id>.seg, a run of Gorilla blocks. metricsegment
+    # records each file's committed size; bytes past it (a crashed or rolled
+    # back seal) are ignored by readers and overwritten by the next append.
+    # Points stay in metricpoint until they are seal_after_sec old.
+    def __init__(
+        self,
+        root: str,
+        enabled: bool = False,
+        seal_after_sec: int = 300,
+        block_points: int = 1024,
+        chunk_rows: int = 20_000,
+    ) -> None:
+        self.root = Path(root)
+        self.enabled = enabled
+        self.seal_after_sec = seal_after_sec
+        self.block_points = block_points
+        self.chunk_rows = chunk_rows
+        self.points_sealed = 0
+        self.errors = 0
+        self.blocks_written = 0
+        self.bytes_written = 0
+
+    def path(self, day: date, series_id: int) -> Path:
+        return self.root / f"{day:%Y%m%d}" / f"{series_id}.seg"
+
+    def recover(self, session: Session) -> None:
+        stmt = select(MetricSegment.series_id, MetricSegment.day, MetricSegment.size)
+        for series_id, day, size in session.exec(stmt):
+            path = self.path(day, series_id)
+            if path.exists() and path.stat().st_size > size:
+                with path.open("r+b") as handle:
+                    handle.truncate(size)
+
+    def seal(
+        self, session_factory: Callable[[], ContextManager[Session]], now: datetime | None = None
+    ) -> int:
+        cutoff = (now or datetime.utcnow()) - timedelta(seconds=self.seal_after_sec)
+        base = MetricPoint.__table__
+        tables = [base]
+        if partition_router.partitioned(base):
+            tables += partition_router.tables(base, None, cutoff)
+        sealed = 0
+        for table in tables:
+            count = self.chunk_rows
+            while count == self.chunk_rows:
+                try:
+                    with session_factory() as session:
+                        count = self._seal_chunk(session, table, cutoff)
+                        session.commit()
+                except Exception:  # noqa: BLE001
+                    self.errors += 1
+                    logger.exception("sealing %s into segments failed", table.name)
+                    break
+                sealed += count
+        self.points_sealed += sealed
+        return sealed
+
+    def _seal_chunk(self, session: Session, table: Table, cutoff: datetime) -> int:
+        stmt = (
+            select(table.c.id, table.c.series_id, table.c.ts, table.c.value)
+            .where(table.c.ts < cutoff)
+            .order_by(table.c.id)
+            .limit(self.chunk_rows)
+        )
+        rows = session.execute(stmt).all()
+        if not rows:
+            return 0
+        points: dict[tuple[int, date], list[tuple[int, float]]] = defaultdict(list)
+        for row in rows:
+            micros = to_micros(row.ts)
+            points[(row.series_id, from_micros(micros).date())].append((micros, row.value))
+        segments = {
+            (segment.series_id, segment.day): segment
+            for segment in session.scalars(
+                select(MetricSegment).where(
+                    MetricSegment.series_id.in_({series_id for series_id, _day in points}),
+                    MetricSegment.day.in_({day for _series_id, day in points}),
+                )
+            )
+        }
+        for (series_id, day), series_points in points.items():
+            series_points.sort()
+            segment = segments.get((series_id, day))
+            if segment is None:
+                ts = from_micros(series_points[0][0])
+                segment = MetricSegment(
+                    series_id=series_id, day=day, start_ts=ts, end_ts=ts, count=0, size=0
+                )
+            self._append(session, segment, series_points)
+        session.execute(delete(table).where(table.c.id.in_([row.id for row in rows])))
+        return len(rows)
+
+    def _append(
+        self, session: Session, segment: MetricSegment, points: list[tuple[int, float]]
+    ) -> None:
+        start_ts, end_ts = from_micros(points[0][0]), from_micros(points[-1][0])
+        blocks = b"".join(
+            encode_block(
+                [micros for micros, _value in points[i : i + self.block_points]],
+                [value for _micros, value in points[i : i + self.block_points]],
+            )
+            for i in range(0, len(points), self.block_points)
+        )
+        path = self.path(segment.day, segment.series_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("r+b" if path.exists() else "wb") as handle:
+            handle.seek(segment.size)
+            handle.write(blocks)
+            handle.truncate()
+            handle.flush()
+            # the metricsegment size committed after this is what makes the block visible
+            os.fsync(handle.fileno())
+        segment.start_ts = min(segment.start_ts, start_ts)
+        segment.end_ts = max(segment.end_ts, end_ts)
+        segment.count += len(points)
+        segment.size += len(blocks)
+        session.add(segment)
+        self.blocks_written += -(-len(points) // self.block_points)
+        self.bytes_written += len(blocks)
+
+    def scan(
+        self,
+        session: Session,
+        series_ids: Select,
+        start: datetime | None,
+        end: datetime | None,
+    ) -> list[SegmentChunk]:
+        stmt = (
+            select(Series, MetricSegment.day, MetricSegment.size)
+            .join(MetricSegment, MetricSegment.series_id == Series.id)
+            .where(Series.id.in_(series_ids))
+        )
+        if start:
+            stmt = stmt.where(MetricSegment.end_ts >= start)
+        if end:
+            stmt = stmt.where(MetricSegment.start_ts <= end)
+        first = to_micros(start) if start else None
+        last = to_micros(end) if end else None
+        chunks = []
+        for series, day, size in session.exec(stmt).all():
+            for timestamps, values in self._read(self.path(day, series.id), size, first, last):
+                chunks.append((series, timestamps, values))
+        return chunks
+
+    def _read(
+        self, path: Path, size: int, first: int | None, last: int | None
+    ) -> Iterator[tuple[memoryview, memoryview]]:
+        try:
+            handle = path.open("rb")
+        except FileNotFoundError:
+            return
+        with handle, mmap.mmap(handle.fileno(), size, access=mmap.ACCESS_READ) as mapped:
+            buf = memoryview(mapped)
+            try:
+                for offset, first_ts, last_ts, _count in iter_blocks(buf, size):
+                    if (first is not None and last_ts < first) or (
+                        last is not None and first_ts > last
+                    ):
+                        continue
+                    timestamps, values = decode_block(buf, offset)
+                    lo = 0 if first is None else bisect_left(timestamps, first)
+                    hi = len(timestamps) if last is None else bisect_right(timestamps, last)
+                    if lo < hi:
+                        yield memoryview(timestamps)[lo:hi], memoryview(values)[lo:hi]
+            finally:
+                buf.release()
+
+    def expire(self, session: Session, cutoff: datetime, downsample: bool = False) -> int:
+        # whole days only, like partitions: a day goes once all of it is before the cutoff
+        first_kept = cutoff.date()
+        stmt = select(MetricSegment, Series).join(Series, Series.id == MetricSegment.series_id)
+        segments = session.exec(stmt.where(MetricSegment.day < first_kept)).all()
+        if downsample:
+            for segment, series in segments:
+                rows = [
+                    {
+                        "name": series.name,
+                        "ts": from_micros(micros),
+                        "value": value,
+                        "tags": series.tags,
+                        "service": series.service,
+                    }
+                    for timestamps, values in self._read(
+                        self.path(segment.day, series.id), segment.size, None, None
+                    )
+                    for micros, value in zip(timestamps, values)
+                ]
+                update_rollups(session, rows)
+        session.execute(delete(MetricSegment).where(MetricSegment.day < first_kept))
+        days = {segment.day for segment, _series in segments}
+
+        def remove_files(_session: Session) -> None:
+            for day in days:
+                shutil.rmtree(self.root / f"{day:%Y%m%d}", ignore_errors=True)
+
+        event.listen(session, "after_commit", remove_files, once=True)
+        return sum(segment.count for segment, _series in segments)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "points_sealed": self.points_sealed,
+            "errors": self.errors,
+            "blocks_written": self.blocks_written,
+            "bytes_written": self.bytes_written,
+        }
+
+
+segment_store = SegmentStore(
+    settings.segment_dir,
+    enabled=settings.metric_store == "segments",
+    seal_after_sec=settings.segment_seal_after_sec,
+)
@@ -0,0 +1,100 @@
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import event, select, tuple_
+from sqlmodel import Session
+
+from ..config import get_settings
+from ..models import Series
+from .metric_rollups import tagset_key
+from .service_registry import insert_ignore
+from .tag_index import write_postings
+
+settings = get_settings()
+
+SeriesKey = tuple[str, str, str]
+LOOKUP_CHUNK = 500
+
+
+def series_key(row: dict) -> SeriesKey:
+    return row["name"], row["service"], tagset_key(row.get("tags"))
+
+
+class SeriesRegistry:
+    # LRU of (name, service, canonical tags) -> series.id. Ids only enter the
+    # cache once the transaction that created them commits.
+    def __init__(self, capacity: int = 100_000) -> None:
+        self.capacity = capacity
+        self._ids: OrderedDict[SeriesKey, int] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ids.clear()
+
+    def resolve(self, session: Session, rows: list[dict]) -> list[int]:
+        keys = [series_key(row) for row in rows]
+        ids: dict[SeriesKey, int] = {}
+        missing: dict[SeriesKey, dict] = {}
+        with self._lock:
+            for key, row in zip(keys, rows):
+                if key in ids or key in missing:
+                    continue
+                series_id = self._ids.get(key)
+                if series_id is None:
+                    missing[key] = row.get("tags") or {}
+                    continue
+                self._ids.move_to_end(key)
+                ids[key] = series_id
+            self.hits += len(ids)
+            self.misses += len(missing)
+        if missing:
+            created = self._lookup(session, missing)
+            ids.update(created)
+
+            def remember(_session: Session) -> None:
+                with self._lock:
+                    self._ids.update(created)
+                    while len(self._ids) > self.capacity:
+                        self._ids.popitem(last=False)
+
+            event.listen(session, "after_commit", remember, once=True)
+        return [ids[key] for key in keys]
+
+    def _lookup(self, session: Session, missing: dict[SeriesKey, dict]) -> dict[SeriesKey, int]:
+        table = Series.__table__
+        rows = [
+            {"name": name, "service": service, "tagset": tagset, "tags": tags}
+            for (name, service, tagset), tags in missing.items()
+        ]
+        session.execute(insert_ignore(session, table, ["name", "service", "tagset"]), rows)
+        keys = list(missing)
+        ids = {}
+        for i in range(0, len(keys), LOOKUP_CHUNK):
+            stmt = select(table.c.id, table.c.name, table.c.service, table.c.tagset).where(
+                tuple_(table.c.name, table.c.service, table.c.tagset).in_(
+                    keys[i : i + LOOKUP_CHUNK]
+                )
+            )
+            for series_id, name, service, tagset in session.execute(stmt):
+                ids[(name, service, tagset)] = series_id
+        write_postings(
+            session,
+            table,
+            [ids[key] for key in keys],
+            [{"tags": tags} for tags in missing.values()],
+        )
+        return ids
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._ids),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+series_registry = SeriesRegistry(settings.series_cache_size)
@@ -0,0 +1,49 @@
+import threading
+from typing import Iterable
+
+from sqlalchemy import Insert, Table, event, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+
+from ..models import Service
+
+
+def insert_ignore(session: Session, table: Table, index_elements: list[str]) -> Insert:
+    dialect = session.get_bind().dialect.name
+    if dialect == "sqlite":
+        return sqlite_insert(table).on_conflict_do_nothing(index_elements=index_elements)
+    if dialect == "postgresql":
+        return pg_insert(table).on_conflict_do_nothing(index_elements=index_elements)
+    return insert(table)
+
+
+class ServiceRegistry:
+    def __init__(self) -> None:
+        self._names: set[str] = set()
+        self._lock = threading.Lock()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._names
+
+    def load(self, session: Session) -> None:
+        names = set(session.exec(select(Service.name)).all())
+        with self._lock:
+            self._names = names
+
+    def ensure(self, session: Session, names: Iterable[str]) -> list[str]:
+        missing = sorted({name for name in names if name not in self._names})
+        if not missing:
+            return []
+        rows = [{"name": name, "env": "prod"} for name in missing]
+        session.execute(insert_ignore(session, Service.__table__, ["name"]), rows)
+
+        def remember(_session: Session) -> None:
+            with self._lock:
+                self._names.update(missing)
+
+        event.listen(session, "after_commit", remember, once=True)
+        return missing
+
+
+service_registry = ServiceRegistry()
@@ -0,0 +1,99 @@
+from datetime import date
+
+from sqlalchemy import Table, false, intersect, select
+from sqlalchemy.sql import Select
+from sqlmodel import Session
+
+from ..models import LogEvent, LogPosting, Series, SeriesPosting, Span, SpanPosting
+from .partitions import PARTITIONED, Refine, partition_router
+from .service_registry import insert_ignore
+
+# AND of ORs over "key:value" terms: [["env:prod"], ["host:a", "host:b"]]
+TagFilter = list[list[str]]
+
+MAX_TERM_LENGTH = 200
+
+# indexed table -> (postings table, column holding its tags)
+POSTINGS: dict[str, tuple[Table, str]] = {
+    Series.__tablename__: (SeriesPosting.__table__, "tags"),
+    LogEvent.__tablename__: (LogPosting.__table__, "attrs"),
+    Span.__tablename__: (SpanPosting.__table__, "tags"),
+}
+
+
+def parse_tag_filter(values: list[str]) -> TagFilter:
+    # one clause per value; "|" separates the alternatives within a clause
+    clauses = []
+    for value in values:
+        terms = [term.strip() for term in value.split("|")]
+        for term in terms:
+            key, sep, _ = term.partition(":")
+            if not sep or not key:
+                raise ValueError(f"invalid tag filter: {value}")
+        clauses.append(sorted(set(terms)))
+    return clauses
+
+
+def tag_terms(tags: dict | None) -> list[str]:
+    # scalar values only; nested attrs are left out of the index
+    terms = []
+    for key, value in (tags or {}).items():
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        elif value is None or isinstance(value, (dict, list)):
+            continue
+        term = f"{key}:{value}"
+        if len(term) <= MAX_TERM_LENGTH:
+            terms.append(term)
+    return terms
+
+
+def has_terms(base: Table, rows: list[dict]) -> bool:
+    field = POSTINGS[base.name][1]
+    return any(tag_terms(row.get(field)) for row in rows)
+
+
+def write_postings(session: Session, base: Table, ids: list[int], rows: list[dict]) -> None:
+    table, field = POSTINGS[base.name]
+    ts_column = PARTITIONED.get(base.name)
+    postings = []
+    for ref_id, row in zip(ids, rows):
+        for term in tag_terms(row.get(field)):
+            posting = {"tag": term, "ref_id": ref_id}
+            if ts_column:
+                posting["ts"] = row[ts_column]
+            postings.append(posting)
+    if not postings:
+        return
+    if ts_column is None:
+        # series are re-resolved after cache misses, so their postings may exist
+        session.execute(insert_ignore(session, table, ["tag", "ref_id"]), postings)
+    elif partition_router.partitioned(table):
+        partition_router.write(session, table, postings)
+    else:
+        session.execute(table.insert(), postings)
+
+
+def matching_ids(table: Table, tags: TagFilter) -> Select:
+    # each clause reads its sorted postings off the (tag, ref_id) key; the
+    # database intersects the clauses
+    clauses = [
+        select(table.c.ref_id).where(
+            table.c.tag == terms[0] if len(terms) == 1 else table.c.tag.in_(terms)
+        )
+        for terms in tags
+    ]
+    return clauses[0] if len(clauses) == 1 else intersect(*clauses)
+
+
+def posting_filter(base: Table, tags: TagFilter) -> Refine:
+    # each partition is matched against the postings partition of the same day
+    postings = POSTINGS[base.name][0]
+
+    def refine(stmt: Select, table: Table, day: date | None) -> Select:
+        source = postings if day is None else partition_router.partition(postings, day)
+        if source is None:
+            return stmt.where(false())
+        return stmt.where(table.c.id.in_(matching_ids(source, tags)))
+
+    return refine
@@ -0,0 +1,39 @@
+from datetime import datetime
+
+from sqlmodel import select
+from sqlalchemy.sql import Select
+
+from ..models import Span
+from ..utils.cursor import Cursor, before_cursor
+from .partitions import partition_router
+from .tag_index import TagFilter, posting_filter
+
+SPANS = Span.__table__
+
+
+def trace_search_stmt(
+    service: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    min_duration_ms: int | None = None,
+    status: str | None = None,
+    tags: TagFilter | None = None,
+    limit: int | None = 100,
+    cursor: Cursor | None = None,
+) -> Select:
+    refine = [posting_filter(SPANS, tags)] if tags else []
+    source = partition_router.source(SPANS, start, end, refine)
+    stmt = select(source)
+    if service:
+        stmt = stmt.where(source.c.service == service)
+    if start:
+        stmt = stmt.where(source.c.start_ts >= start)
+    if end:
+        stmt = stmt.where(source.c.start_ts <= end)
+    if min_duration_ms:
+        stmt = stmt.where(source.c.duration_ms >= min_duration_ms)
+    if status:
+        stmt = stmt.where(source.c.status == status)
+    if cursor:
+        stmt = stmt.where(before_cursor(source.c.start_ts, source.c.id, cursor))
+    return stmt.order_by(source.c.start_ts.desc(), source.c.id.desc()).limit(limit)
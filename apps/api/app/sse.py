@@ -11,6 +11,13 @@ class LogBroadcaster:
         for queue in list(self._queues[service]):
             await queue.put(payload)
 
+    def publish_rows(self, rows: list[dict]) -> None:
+        # must run on the event loop; the ingest writer schedules it there
+        # with call_soon_threadsafe once the rows are committed
+        for row in rows:
+            for queue in list(self._queues.get(row["service"], [])):
+                queue.put_nowait(row)
+
     async def subscribe(self, service: str) -> AsyncGenerator[dict, None]:
         queue: asyncio.Queue = asyncio.Queue()
         self._queues[service].append(queue)
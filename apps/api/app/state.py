@@ -1,7 +1,39 @@
+from collections import Counter
+
+from .config import get_settings
+from .db import get_session
+from .services.dogstatsd_agg import DogstatsdAggregator
+from .services.dogstatsd_udp import DogstatsdProtocol
+from .services.ingest_queue import IngestQueue
+from .services.monitor_scheduler import MonitorScheduler
+from .services.retention import RetentionCompactor, build_policies
 from .sse import LogBroadcaster
 
+settings = get_settings()
 
 broadcaster = LogBroadcaster()
+ingest_queue = IngestQueue(
+    get_session,
+    maxsize=settings.ingest_queue_size,
+    max_batches=settings.ingest_group_commit_batches,
+    max_rows=settings.ingest_group_commit_rows,
+    flush_interval_sec=settings.ingest_flush_interval_ms / 1000,
+)
+dogstatsd_aggregator = DogstatsdAggregator()
+dogstatsd_http_counters: Counter[str] = Counter()
+dogstatsd_protocol = DogstatsdProtocol(
+    ingest_queue, dogstatsd_aggregator if settings.dogstatsd_aggregate else None
+)
+
+retention_compactor = RetentionCompactor(
+    get_session, build_policies(settings), chunk_rows=settings.retention_chunk_rows
+)
+
+monitor_scheduler = MonitorScheduler(
+    settings.monitor_min_interval_sec,
+    settings.monitor_max_interval_sec,
+    jitter=settings.monitor_jitter,
+)
 
 
 def get_broadcaster() -> LogBroadcaster:
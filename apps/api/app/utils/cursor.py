@@ -0,0 +1,33 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+from sqlalchemy.sql import ColumnElement
+
+# Opaque keyset cursor: the (ts, id) of the last row on a page, newest first.
+Cursor = tuple[datetime, int]
+
+
+class CursorError(ValueError):
+    pass
+
+
+def encode_cursor(ts: datetime, row_id: int) -> str:
+    raw = json.dumps([ts.isoformat(), row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Cursor:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        ts, row_id = json.loads(raw)
+        return datetime.fromisoformat(ts), int(row_id)
+    except (ValueError, TypeError) as exc:
+        raise CursorError("invalid cursor") from exc
+
+
+def before_cursor(ts_column, id_column, cursor: Cursor) -> ColumnElement:
+    # (ts, id) < cursor, written so the ts bound can drive an index range
+    ts, row_id = cursor
+    return and_(ts_column <= ts, or_(ts_column < ts, id_column < row_id))
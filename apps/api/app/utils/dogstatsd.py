@@ -1,37 +1,186 @@
+import math
+import sys
+from array import array
+from dataclasses import dataclass, field
 from datetime import datetime
 
 
+METRIC_TYPES = {"g", "c", "ms", "h", "s", "d"}
+
+
 class DogstatsdParseError(ValueError):
     pass
 
 
 def parse_line(line: str) -> dict:
-    # format: metric.name:value|g|#tag1,tag2
+    # format: metric.name:value|type|@sample_rate|#tag1,tag2
     if not line or ":" not in line:
         raise DogstatsdParseError("invalid format")
     name_part, rest = line.split(":", 1)
     if "|" not in rest:
         raise DogstatsdParseError("invalid format")
     value_part, *sections = rest.split("|")
-    try:
-        value = float(value_part)
-    except ValueError as exc:
-        raise DogstatsdParseError("invalid value") from exc
 
+    metric_type = "g"
+    if sections and sections[0][:1] not in ("#", "@"):
+        metric_type = sections.pop(0)
+        if metric_type not in METRIC_TYPES:
+            raise DogstatsdParseError("invalid type")
+    if metric_type == "s":
+        if not value_part:
+            raise DogstatsdParseError("invalid value")
+        value = value_part
+    else:
+        value = _parse_value(value_part)
+
+    sample_rate = 1.0
     tags = {}
     for section in sections:
         if section.startswith("#"):
-            tag_items = section[1:].split(",") if section[1:] else []
-            for item in tag_items:
-                if ":" in item:
-                    key, val = item.split(":", 1)
-                    tags[key] = val
-                else:
-                    tags[item] = "true"
+            tags.update(_parse_tags(section[1:]))
+        elif section.startswith("@"):
+            sample_rate = _parse_sample_rate(section[1:])
     return {
         "name": name_part,
         "ts": datetime.utcnow(),
         "value": value,
         "tags": tags,
         "service": tags.get("service", "unknown"),
+        "type": metric_type,
+        "sample_rate": sample_rate,
     }
+
+
+def _parse_tags(raw: str) -> dict[str, str]:
+    tags = {}
+    for item in raw.split(",") if raw else []:
+        if ":" in item:
+            key, val = item.split(":", 1)
+            tags[sys.intern(key)] = sys.intern(val)
+        else:
+            tags[sys.intern(item)] = "true"
+    return tags
+
+
+def _parse_value(raw: str) -> float:
+    try:
+        value = float(raw)
+    except ValueError as exc:
+        raise DogstatsdParseError("invalid value") from exc
+    # nan/inf parse as floats but would poison aggregates and rollups
+    if not math.isfinite(value):
+        raise DogstatsdParseError("invalid value")
+    return value
+
+
+def _parse_sample_rate(raw: str) -> float:
+    try:
+        sample_rate = float(raw)
+    except ValueError as exc:
+        raise DogstatsdParseError("invalid sample rate") from exc
+    if not 0 < sample_rate <= 1:
+        raise DogstatsdParseError("invalid sample rate")
+    return sample_rate
+
+
+@dataclass
+class DogstatsdBatch:
+    ts: datetime
+    names: list[str] = field(default_factory=list)
+    types: list[str] = field(default_factory=list)
+    values: array = field(default_factory=lambda: array("d"))
+    sample_rates: array = field(default_factory=lambda: array("d"))
+    tagset_ids: array = field(default_factory=lambda: array("I"))
+    tagsets: list[dict[str, str]] = field(default_factory=list)
+    # set members by row index; their slot in `values` holds 0.0
+    set_members: dict[int, str] = field(default_factory=dict)
+    rejected: int = 0
+    errors: list[tuple[int, str]] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def value(self, index: int):
+        if index in self.set_members:
+            return self.set_members[index]
+        return self.values[index]
+
+    def rows(self) -> list[dict]:
+        # raw (unaggregated) storage: every set member counts as one observation
+        services = [tags.get("service", "unknown") for tags in self.tagsets]
+        return [
+            {
+                "name": self.names[i],
+                "ts": self.ts,
+                "value": 1.0 if i in self.set_members else self.values[i],
+                "tags": self.tagsets[self.tagset_ids[i]],
+                "service": services[self.tagset_ids[i]],
+            }
+            for i in range(len(self.names))
+        ]
+
+
+def parse_batch(
+    payload: str | bytes, strict: bool = True, max_errors: int = 100
+) -> DogstatsdBatch:
+    if isinstance(payload, bytes):
+        payload = payload.decode("utf-8", errors="replace")
+    batch = DogstatsdBatch(ts=datetime.utcnow())
+    names = batch.names
+    types = batch.types
+    values = batch.values
+    sample_rates = batch.sample_rates
+    tagset_ids = batch.tagset_ids
+    tag_index: dict[str, int] = {"": 0}
+    batch.tagsets.append({})
+    interned: dict[str, str] = {}
+    for lineno, line in enumerate(payload.split("\n")):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            name, _, rest = line.partition(":")
+            if not rest or "|" not in rest:
+                raise DogstatsdParseError("invalid format")
+            value_part, *sections = rest.split("|")
+            metric_type = "g"
+            if sections and sections[0][:1] not in ("#", "@"):
+                metric_type = sections.pop(0)
+                if metric_type not in METRIC_TYPES:
+                    raise DogstatsdParseError("invalid type")
+            member = None
+            if metric_type == "s":
+                if not value_part:
+                    raise DogstatsdParseError("invalid value")
+                member = value_part
+                value = 0.0
+            else:
+                value = _parse_value(value_part)
+            sample_rate = 1.0
+            raw_tags = ""
+            for section in sections:
+                if section[:1] == "#":
+                    raw_tags = f"{raw_tags},{section[1:]}" if raw_tags else section[1:]
+                elif section[:1] == "@":
+                    sample_rate = _parse_sample_rate(section[1:])
+            tagset_id = tag_index.get(raw_tags)
+            if tagset_id is None:
+                tagset_id = tag_index[raw_tags] = len(batch.tagsets)
+                batch.tagsets.append(_parse_tags(raw_tags))
+        except DogstatsdParseError as exc:
+            if strict:
+                raise DogstatsdParseError(f"line {lineno + 1}: {exc}") from exc
+            batch.rejected += 1
+            if len(batch.errors) < max_errors:
+                batch.errors.append((lineno + 1, str(exc)))
+            continue
+        if member is not None:
+            batch.set_members[len(names)] = member
+        name = interned.get(name) or interned.setdefault(name, sys.intern(name))
+        names.append(name)
+        types.append(metric_type)
+        values.append(value)
+        sample_rates.append(sample_rate)
+        tagset_ids.append(tagset_id)
+    return batch
+
@@ -0,0 +1,49 @@
+import json
+import math
+from datetime import date, datetime
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json produces the same documents, only slower
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+_encode = json.JSONEncoder(
+    ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default
+).encode
+
+
+def _finite(value):
+    # orjson writes NaN and +/-inf as null; stdlib json has to be told to
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    return value
+
+
+def dumps(content) -> bytes:
+    # orjson writes naive datetimes exactly like isoformat(), so both paths agree
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    try:
+        return _encode(content).encode()
+    except ValueError:
+        # only non-finite floats get here, so the common case skips the copy
+        return _encode(_finite(content)).encode()
+
+
+def to_columns(keys, rows) -> dict[str, list]:
+    # one list per column instead of one object per row: smaller and far
+    # cheaper to encode for long results
+    keys = list(keys)
+    values = list(zip(*rows)) or [()] * len(keys)
+    return {key: list(column) for key, column in zip(keys, values)}
@@ -0,0 +1,160 @@
+import struct
+import sys
+from array import array
+from typing import Iterator, Sequence
+
+# Gorilla-style block encoding (Pelkonen et al., VLDB 2015): delta-of-delta
+# timestamps and XOR'd float bits, interleaved per point and packed MSB first.
+# Timestamps are integer microseconds, so the delta-of-delta buckets are wider
+# than the paper's second-resolution ones and the escape bucket is 64 bits.
+HEADER = struct.Struct("<qqII")  # first_ts, last_ts, count, payload bytes
+PAD = 8  # payloads are whole 64-bit words plus one spare
+DOD_BUCKETS = ((0b10, 2, 7), (0b110, 3, 14), (0b1110, 4, 20), (0b11110, 5, 32))
+DOD_ESCAPE = (0b11111, 5, 64)
+
+
+class BitWriter:
+    def __init__(self) -> None:
+        self.out = bytearray()
+        self.acc = 0
+        self.nbits = 0
+
+    def write(self, value: int, nbits: int) -> None:
+        self.acc = (self.acc << nbits) | value
+        self.nbits += nbits
+        if self.nbits >= 64:
+            nbytes, rest = divmod(self.nbits, 8)
+            self.out += (self.acc >> rest).to_bytes(nbytes, "big")
+            self.acc &= (1 << rest) - 1
+            self.nbits = rest
+
+    def getvalue(self) -> bytes:
+        nbytes = (self.nbits + 7) // 8
+        tail = (self.acc << (nbytes * 8 - self.nbits)).to_bytes(nbytes, "big")
+        payload = bytes(self.out) + tail
+        return payload + bytes(PAD + -len(payload) % 8)
+
+
+class BitReader:
+    # reads from big-endian 64-bit words; a read spans at most two of them
+    def __init__(self, payload: memoryview) -> None:
+        self.words = array("Q")
+        self.words.frombytes(payload)
+        if sys.byteorder == "little":
+            self.words.byteswap()
+        self.words.append(0)
+        self.pos = 0
+
+    def peek(self, nbits: int) -> int:
+        word = self.pos >> 6
+        window = (self.words[word] << 64) | self.words[word + 1]
+        return (window >> (128 - (self.pos & 63) - nbits)) & ((1 << nbits) - 1)
+
+    def read(self, nbits: int) -> int:
+        value = self.peek(nbits)
+        self.pos += nbits
+        return value
+
+
+def _write_dod(writer: BitWriter, dod: int) -> None:
+    if dod == 0:
+        writer.write(0, 1)
+        return
+    for prefix, prefix_bits, value_bits in (*DOD_BUCKETS, DOD_ESCAPE):
+        limit = 1 << (value_bits - 1)
+        if -limit <= dod < limit or value_bits == 64:
+            writer.write(prefix, prefix_bits)
+            writer.write(dod & ((1 << value_bits) - 1), value_bits)
+            return
+
+
+def _read_dod(reader: BitReader) -> int:
+    prefix = reader.peek(5)
+    if prefix < 0b10000:
+        reader.pos += 1
+        return 0
+    for bucket_prefix, prefix_bits, value_bits in (*DOD_BUCKETS, DOD_ESCAPE):
+        if prefix >> (5 - prefix_bits) == bucket_prefix:
+            break
+    reader.pos += prefix_bits
+    value = reader.read(value_bits)
+    if value >= 1 << (value_bits - 1):
+        value -= 1 << value_bits
+    return value
+
+
+def encode_block(timestamps: Sequence[int], values: Sequence[float]) -> bytes:
+    bits = array("Q")
+    bits.frombytes(array("d", values).tobytes())
+    writer = BitWriter()
+    writer.write(timestamps[0], 64)
+    writer.write(bits[0], 64)
+    prev_ts, prev_delta, prev_bits = timestamps[0], 0, bits[0]
+    prev_leading = prev_trailing = -1
+    for i in range(1, len(timestamps)):
+        delta = timestamps[i] - prev_ts
+        _write_dod(writer, delta - prev_delta)
+        prev_ts, prev_delta = timestamps[i], delta
+        xor = bits[i] ^ prev_bits
+        prev_bits = bits[i]
+        if xor == 0:
+            writer.write(0, 1)
+            continue
+        leading = min(64 - xor.bit_length(), 31)
+        trailing = (xor & -xor).bit_length() - 1
+        if prev_leading >= 0 and leading >= prev_leading and trailing >= prev_trailing:
+            writer.write(0b10, 2)
+            writer.write(xor >> prev_trailing, 64 - prev_leading - prev_trailing)
+            continue
+        significant = 64 - leading - trailing
+        writer.write(0b11, 2)
+        writer.write(leading, 5)
+        writer.write(significant - 1, 6)
+        writer.write(xor >> trailing, significant)
+        prev_leading, prev_trailing = leading, trailing
+    payload = writer.getvalue()
+    return HEADER.pack(timestamps[0], timestamps[-1], len(timestamps), len(payload)) + payload
+
+
+def iter_blocks(buf: memoryview, size: int) -> Iterator[tuple[int, int, int, int]]:
+    # (offset, first_ts, last_ts, count) for each block in buf[:size]
+    offset = 0
+    while offset < size:
+        first_ts, last_ts, count, nbytes = HEADER.unpack_from(buf, offset)
+        yield offset, first_ts, last_ts, count
+        offset += HEADER.size + nbytes
+
+
+def decode_block(buf: memoryview, offset: int) -> tuple[array, array]:
+    # decodes straight into preallocated arrays; the float bits are written
+    # through an unsigned view of the value array, so nothing is copied twice
+    _first, _last, count, nbytes = HEADER.unpack_from(buf, offset)
+    start = offset + HEADER.size
+    reader = BitReader(buf[start : start + nbytes])
+    read = reader.read
+    timestamps = array("q", bytes(8 * count))
+    values = array("d", bytes(8 * count))
+    raw = memoryview(values).cast("B").cast("Q")
+    ts = timestamps[0] = read(64)
+    prev_bits = raw[0] = read(64)
+    delta = 0
+    leading = trailing = 0
+    for i in range(1, count):
+        delta += _read_dod(reader)
+        ts += delta
+        timestamps[i] = ts
+        control = reader.peek(2)
+        if control == 0b11:
+            reader.pos += 2
+            leading = read(5)
+            trailing = 64 - leading - read(6) - 1
+        elif control == 0b10:
+            reader.pos += 2
+        else:
+            reader.pos += 1
+            raw[i] = prev_bits
+            continue
+        prev_bits ^= read(64 - leading - trailing) << trailing
+        raw[i] = prev_bits
+    raw.release()
+    return timestamps, values
@@ -0,0 +1,162 @@
+import re
+from dataclasses import dataclass, field
+
+# Log search syntax, shared by SQLite FTS5 and Postgres tsquery:
+#   timeout            word
+#   time*              prefix
+#   "connection reset" phrase ("conn res"* for a prefix on the last word)
+#   a b / a AND b      both
+#   a OR b             either
+#   a NOT b            a without b (NOT needs a left operand, as in FTS5)
+#   ( ... )            grouping
+
+
+class LogQueryError(ValueError):
+    pass
+
+
+@dataclass
+class Phrase:
+    words: list[str]
+    prefix: bool = False
+
+
+@dataclass
+class AllOf:
+    include: list
+    exclude: list = field(default_factory=list)
+
+
+@dataclass
+class AnyOf:
+    options: list
+
+
+TOKEN_RE = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"(\*)?|([^\s()"]+))')
+WORD_RE = re.compile(r"[^\W_]+")
+OPERATORS = {"AND", "OR", "NOT"}
+
+
+def tokenize(query: str) -> list[tuple[str, object]]:
+    tokens = []
+    pos = 0
+    query = query.rstrip()
+    while pos < len(query):
+        match = TOKEN_RE.match(query, pos)
+        if not match or match.end() == pos:
+            raise LogQueryError("unbalanced quotes")
+        pos = match.end()
+        lparen, rparen, phrase, phrase_prefix, word = match.groups()
+        if lparen:
+            tokens.append(("(", None))
+        elif rparen:
+            tokens.append((")", None))
+        elif phrase is not None:
+            tokens.append(("phrase", Phrase(WORD_RE.findall(phrase), bool(phrase_prefix))))
+        elif word in OPERATORS:
+            tokens.append((word, None))
+        else:
+            prefix = word.endswith("*")
+            tokens.append(("phrase", Phrase(WORD_RE.findall(word.rstrip("*")), prefix)))
+    return tokens
+
+
+class Parser:
+    def __init__(self, tokens: list[tuple[str, object]]) -> None:
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self) -> str | None:
+        return self.tokens[self.pos][0] if self.pos < len(self.tokens) else None
+
+    def take(self) -> tuple[str, object]:
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def parse(self):
+        node = self.any()
+        if self.peek() is not None:
+            raise LogQueryError(f"unexpected {self.peek()}")
+        return node
+
+    def any(self):
+        options = [self.all()]
+        while self.peek() == "OR":
+            self.take()
+            if self.peek() in (None, ")", "OR"):
+                raise LogQueryError("OR needs a term after it")
+            options.append(self.all())
+        options = [option for option in options if option is not None]
+        if not options:
+            return None
+        return options[0] if len(options) == 1 else AnyOf(options)
+
+    def all(self):
+        node = AllOf([])
+        while self.peek() not in (None, ")", "OR"):
+            kind, _ = self.tokens[self.pos]
+            if kind == "AND":
+                self.take()
+                continue
+            negate = kind == "NOT"
+            if negate:
+                self.take()
+                if not node.include:
+                    raise LogQueryError("NOT needs a term before it")
+            operand = self.atom()
+            if operand is not None:
+                (node.exclude if negate else node.include).append(operand)
+        if not node.include:
+            return None
+        if len(node.include) == 1 and not node.exclude:
+            return node.include[0]
+        return node
+
+    def atom(self):
+        if self.peek() is None:
+            raise LogQueryError("query ends with an operator")
+        kind, value = self.take()
+        if kind == "(":
+            node = self.any()
+            if self.peek() != ")":
+                raise LogQueryError("unbalanced parentheses")
+            self.take()
+            return node
+        if kind == "phrase":
+            # punctuation-only terms carry no words and match nothing useful
+            return value if value.words else None
+        raise LogQueryError(f"unexpected {kind}")
+
+
+def parse_log_query(query: str):
+    node = Parser(tokenize(query)).parse()
+    if node is None:
+        raise LogQueryError("empty query")
+    return node
+
+
+def to_fts5(node) -> str:
+    if isinstance(node, Phrase):
+        return f'"{" ".join(node.words)}"' + ("*" if node.prefix else "")
+    if isinstance(node, AnyOf):
+        return "(" + " OR ".join(to_fts5(option) for option in node.options) + ")"
+    expr = " AND ".join(to_fts5(part) for part in node.include)
+    if len(node.include) > 1:
+        expr = f"({expr})"
+    for part in node.exclude:
+        expr = f"({expr} NOT {to_fts5(part)})"
+    return expr
+
+
+def to_tsquery(node) -> str:
+    if isinstance(node, Phrase):
+        words = list(node.words)
+        if node.prefix:
+            words[-1] += ":*"
+        return "(" + " <-> ".join(words) + ")"
+    if isinstance(node, AnyOf):
+        return "(" + " | ".join(to_tsquery(option) for option in node.options) + ")"
+    parts = [to_tsquery(part) for part in node.include]
+    parts += [f"!{to_tsquery(part)}" for part in node.exclude]
+    return "(" + " & ".join(parts) + ")"
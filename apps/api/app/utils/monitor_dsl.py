@@ -1,5 +1,5 @@
 import re
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 @dataclass
@@ -9,6 +9,8 @@ class MonitorQuery:
     window: str
     metric: str | None
     filter_service: str | None
+    # tags other than service: AND of ORs, e.g. {host:a|host:b,env:prod}
+    filter_tags: list[list[str]] = field(default_factory=list)
 
 
 class MonitorQueryError(ValueError):
@@ -33,13 +35,20 @@ def parse_query(query: str) -> MonitorQuery:
         metric = None
         source = "logs"
     filter_service = None
-    if tag_str:
-        tags = dict(item.split(":", 1) for item in tag_str.split(",") if ":" in item)
-        filter_service = tags.get("service")
+    filter_tags = []
+    for item in tag_str.split(",") if tag_str else []:
+        key, sep, value = item.strip().partition(":")
+        if not sep:
+            continue
+        if key == "service":
+            filter_service = value
+        else:
+            filter_tags.append(sorted({term.strip() for term in item.split("|")}))
     return MonitorQuery(
         source=source,
         aggregation=aggregation,
         window=window,
         metric=metric,
         filter_service=filter_service,
+        filter_tags=filter_tags,
     )
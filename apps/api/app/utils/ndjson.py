@@ -0,0 +1,22 @@
+from collections.abc import Iterable, Iterator, Mapping
+
+from .fastjson import dumps
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def wants_ndjson(accept: str | None) -> bool:
+    return bool(accept) and NDJSON_MEDIA_TYPE in accept
+
+
+def encode_lines(rows: Iterable[Mapping], chunk_rows: int) -> Iterator[bytes]:
+    # one JSON document per line, flushed every chunk_rows rows so the client
+    # sees the first rows while the cursor is still being read
+    lines = []
+    for row in rows:
+        lines.append(dumps(dict(row)))
+        if len(lines) >= chunk_rows:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
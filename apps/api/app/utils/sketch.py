@@ -0,0 +1,65 @@
+import math
+
+# Log-bucketed quantile sketch (DDSketch style): every value lands in bucket
+# ceil(log_gamma(|v|)), so quantiles are within RELATIVE_ACCURACY of the true
+# value and two sketches merge by adding bucket counts.
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+MIN_VALUE = 1e-9
+
+
+def new_sketch() -> dict:
+    return {"pos": {}, "neg": {}, "zero": 0}
+
+
+def _key(value: float) -> str:
+    return str(math.ceil(math.log(abs(value)) / LOG_GAMMA))
+
+
+def add(sketch: dict, value: float, count: int = 1) -> dict:
+    if abs(value) < MIN_VALUE:
+        sketch["zero"] += count
+        return sketch
+    store = sketch["pos"] if value > 0 else sketch["neg"]
+    key = _key(value)
+    store[key] = store.get(key, 0) + count
+    return sketch
+
+
+def merge(into: dict, other: dict) -> dict:
+    for side in ("pos", "neg"):
+        store = into[side]
+        for key, count in other[side].items():
+            store[key] = store.get(key, 0) + count
+    into["zero"] += other["zero"]
+    return into
+
+
+def count(sketch: dict) -> int:
+    return sum(sketch["pos"].values()) + sum(sketch["neg"].values()) + sketch["zero"]
+
+
+def quantile(sketch: dict, q: float) -> float | None:
+    total = count(sketch)
+    if not total:
+        return None
+    rank = q * (total - 1)
+    seen = 0
+    neg = sorted(sketch["neg"].items(), key=lambda item: -int(item[0]))
+    for key, bucket_count in neg:
+        seen += bucket_count
+        if seen > rank:
+            return -_value(int(key))
+    seen += sketch["zero"]
+    if seen > rank:
+        return 0.0
+    for key, bucket_count in sorted(sketch["pos"].items(), key=lambda item: int(item[0])):
+        seen += bucket_count
+        if seen > rank:
+            return _value(int(key))
+    return None
+
+
+def _value(key: int) -> float:
+    return 2 * GAMMA**key / (GAMMA + 1)
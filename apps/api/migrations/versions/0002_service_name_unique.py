@@ -0,0 +1,25 @@
+"""service name unique
+
+Revision ID: 0002_service_name_unique
+Revises: 0001_initial
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from alembic import op
+
+revision = "0002_service_name_unique"
+down_revision = "0001_initial"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "DELETE FROM service WHERE id NOT IN (SELECT MIN(id) FROM service GROUP BY name)"
+    )
+    with op.batch_alter_table("service") as batch_op:
+        batch_op.create_unique_constraint("uq_service_name", ["name"])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("service") as batch_op:
+        batch_op.drop_constraint("uq_service_name", type_="unique")
@@ -0,0 +1,32 @@
+"""query indexes
+
+Revision ID: 0003_query_indexes
+Revises: 0002_service_name_unique
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from alembic import op
+
+revision = "0003_query_indexes"
+down_revision = "0002_service_name_unique"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_metricpoint_name_service_ts", "metricpoint", ["name", "service", "ts"])
+    op.create_index("ix_logevent_service_ts", "logevent", ["service", "ts"])
+    op.create_index("ix_logevent_level_ts", "logevent", ["level", "ts"])
+    op.create_index("ix_span_trace_id", "span", ["trace_id"])
+    op.create_index("ix_span_service_start_ts", "span", ["service", "start_ts"])
+    op.create_index("ix_alert_monitor_id", "alert", ["monitor_id"])
+    op.create_index("ix_syntheticresult_check_id_ts", "syntheticresult", ["check_id", "ts"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_syntheticresult_check_id_ts", table_name="syntheticresult")
+    op.drop_index("ix_alert_monitor_id", table_name="alert")
+    op.drop_index("ix_span_service_start_ts", table_name="span")
+    op.drop_index("ix_span_trace_id", table_name="span")
+    op.drop_index("ix_logevent_level_ts", table_name="logevent")
+    op.drop_index("ix_logevent_service_ts", table_name="logevent")
+    op.drop_index("ix_metricpoint_name_service_ts", table_name="metricpoint")
@@ -0,0 +1,127 @@
+"""metric rollups
+
+Revision ID: 0004_metric_rollups
+Revises: 0003_query_indexes
+Create Date: 2026-10-18 00:00:00.000000
+"""
+import json
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+from apps.api.app.services.metric_rollups import partial_rollups
+from apps.api.app.utils import sketch
+
+revision = "0004_metric_rollups"
+down_revision = "0003_query_indexes"
+branch_labels = None
+depends_on = None
+
+PARTITION_RE = re.compile(r"^metricpoint_\d{8}$")
+CHUNK_ROWS = 10_000
+
+rollup = sa.table(
+    "metricrollup",
+    sa.column("resolution", sa.Integer()),
+    sa.column("name", sa.String()),
+    sa.column("service", sa.String()),
+    sa.column("tagset", sa.String()),
+    sa.column("bucket", sa.DateTime()),
+    sa.column("count", sa.Integer()),
+    sa.column("sum", sa.Float()),
+    sa.column("min", sa.Float()),
+    sa.column("max", sa.Float()),
+    sa.column("sketch", sa.JSON()),
+)
+
+
+def point_table(name: str) -> sa.TableClause:
+    return sa.table(
+        name,
+        sa.column("name", sa.String()),
+        sa.column("service", sa.String()),
+        sa.column("ts", sa.DateTime()),
+        sa.column("value", sa.Float()),
+        sa.column("tags", sa.Text()),
+    )
+
+
+def merge_into(totals: dict, partials: dict) -> None:
+    for key, partial in partials.items():
+        total = totals.get(key)
+        if total is None:
+            totals[key] = partial
+            continue
+        total["count"] += partial["count"]
+        total["sum"] += partial["sum"]
+        total["min"] = min(total["min"], partial["min"])
+        total["max"] = max(total["max"], partial["max"])
+        sketch.merge(total["sketch"], partial["sketch"])
+
+
+def flush(bind, totals: dict) -> None:
+    if totals:
+        bind.execute(
+            rollup.insert(),
+            [
+                dict(zip(("resolution", "name", "service", "tagset", "bucket"), key), **partial)
+                for key, partial in totals.items()
+            ],
+        )
+    totals.clear()
+
+
+def backfill(bind) -> None:
+    # Existing points get their rollups too, or any window long enough to be
+    # served from rollups would come back empty for data written before this
+    # revision. Points stream in ts order, and every 1m/1h/1d bucket closes at
+    # the next UTC midnight, so only one day of partials is held at a time.
+    names = sa.inspect(bind).get_table_names()
+    tables = ["metricpoint", *sorted(name for name in names if PARTITION_RE.match(name))]
+    selects = [sa.select(point_table(name)) for name in tables]
+    stmt = (selects[0] if len(selects) == 1 else sa.union_all(*selects)).order_by("ts")
+    totals: dict = {}
+    day = None
+    result = bind.execution_options(yield_per=CHUNK_ROWS).execute(stmt)
+    for chunk in result.partitions():
+        rows = []
+        for name, service, ts, value, tags in chunk:
+            if ts.date() != day:
+                merge_into(totals, partial_rollups(rows))
+                rows = []
+                flush(bind, totals)
+                day = ts.date()
+            tags = json.loads(tags) if isinstance(tags, str) else tags
+            rows.append({"name": name, "service": service, "ts": ts, "value": value, "tags": tags})
+        merge_into(totals, partial_rollups(rows))
+    flush(bind, totals)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "metricrollup",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("resolution", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("service", sa.String(), nullable=False),
+        sa.Column("tagset", sa.String(), nullable=False),
+        sa.Column("bucket", sa.DateTime(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("sum", sa.Float(), nullable=False),
+        sa.Column("min", sa.Float(), nullable=False),
+        sa.Column("max", sa.Float(), nullable=False),
+        sa.Column("sketch", sa.JSON(), nullable=False),
+        sa.UniqueConstraint(
+            "resolution", "name", "service", "tagset", "bucket", name="uq_metricrollup_key"
+        ),
+    )
+    op.create_index(
+        "ix_metricrollup_resolution_bucket", "metricrollup", ["resolution", "bucket"]
+    )
+    backfill(op.get_bind())
+
+
+def downgrade() -> None:
+    op.drop_index("ix_metricrollup_resolution_bucket", table_name="metricrollup")
+    op.drop_table("metricrollup")
@@ -0,0 +1,43 @@
+"""metric segments
+
+Revision ID: 0005_metric_segments
+Revises: 0004_metric_rollups
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_metric_segments"
+down_revision = "0004_metric_rollups"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "series",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("service", sa.String(), nullable=False),
+        sa.Column("tagset", sa.String(), nullable=False),
+        sa.Column("tags", sa.JSON(), nullable=False),
+        sa.UniqueConstraint("name", "service", "tagset", name="uq_series_key"),
+    )
+    op.create_table(
+        "metricsegment",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("series_id", sa.Integer(), sa.ForeignKey("series.id"), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("start_ts", sa.DateTime(), nullable=False),
+        sa.Column("end_ts", sa.DateTime(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.UniqueConstraint("series_id", "day", name="uq_metricsegment_series_day"),
+    )
+    op.create_index("ix_metricsegment_day", "metricsegment", ["day"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_metricsegment_day", table_name="metricsegment")
+    op.drop_table("metricsegment")
+    op.drop_table("series")
@@ -0,0 +1,102 @@
+"""metricpoint series ids
+
+Revision ID: 0006_metricpoint_series
+Revises: 0005_metric_segments
+Create Date: 2026-10-18 00:00:00.000000
+"""
+import json
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_metricpoint_series"
+down_revision = "0005_metric_segments"
+branch_labels = None
+depends_on = None
+
+PARTITION_RE = re.compile(r"^metricpoint_\d{8}$")
+
+series = sa.table(
+    "series",
+    sa.column("id", sa.Integer()),
+    sa.column("name", sa.String()),
+    sa.column("service", sa.String()),
+    sa.column("tagset", sa.String()),
+    sa.column("tags", sa.JSON()),
+)
+
+
+def metricpoint_tables(bind) -> list[str]:
+    names = sa.inspect(bind).get_table_names()
+    return ["metricpoint", *sorted(name for name in names if PARTITION_RE.match(name))]
+
+
+def series_ids(bind) -> dict[tuple[str, str, str], int]:
+    rows = bind.execute(sa.select(series.c.id, series.c.name, series.c.service, series.c.tagset))
+    return {(name, service, tagset): series_id for series_id, name, service, tagset in rows}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    known = series_ids(bind)
+    for table in metricpoint_tables(bind):
+        op.add_column(table, sa.Column("series_id", sa.Integer(), nullable=True))
+        # tags compare as text: Postgres has no equality operator for json
+        distinct = bind.execute(
+            sa.text(f"SELECT DISTINCT name, service, CAST(tags AS TEXT) FROM {table}")
+        ).all()
+        for name, service, tags_text in distinct:
+            tags = json.loads(tags_text) if tags_text else {}
+            tagset = json.dumps(tags, sort_keys=True, separators=(",", ":"))
+            key = (name, service, tagset)
+            if key not in known:
+                insert = series.insert().values(
+                    name=name, service=service, tagset=tagset, tags=tags
+                )
+                known[key] = bind.execute(insert.returning(series.c.id)).scalar_one()
+            bind.execute(
+                sa.text(
+                    f"UPDATE {table} SET series_id = :series_id "
+                    "WHERE name = :name AND service = :service AND CAST(tags AS TEXT) = :tags"
+                ),
+                {"series_id": known[key], "name": name, "service": service, "tags": tags_text},
+            )
+        with op.batch_alter_table(table) as batch:
+            batch.drop_index(f"ix_{table}_name_service_ts")
+            batch.alter_column("series_id", existing_type=sa.Integer(), nullable=False)
+            batch.drop_column("name")
+            batch.drop_column("tags")
+            batch.drop_column("service")
+            batch.create_index(f"ix_{table}_series_ts", ["series_id", "ts"])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    for table in metricpoint_tables(bind):
+        with op.batch_alter_table(table) as batch:
+            batch.add_column(sa.Column("name", sa.String(), nullable=True))
+            batch.add_column(sa.Column("tags", sa.JSON(), nullable=True))
+            batch.add_column(sa.Column("service", sa.String(), nullable=True))
+        for series_id, name, service, tags in bind.execute(
+            sa.select(series.c.id, series.c.name, series.c.service, series.c.tags)
+        ):
+            bind.execute(
+                sa.text(
+                    f"UPDATE {table} SET name = :name, service = :service, tags = :tags "
+                    "WHERE series_id = :series_id"
+                ),
+                {
+                    "name": name,
+                    "service": service,
+                    "tags": json.dumps(tags or {}),
+                    "series_id": series_id,
+                },
+            )
+        with op.batch_alter_table(table) as batch:
+            batch.drop_index(f"ix_{table}_series_ts")
+            batch.alter_column("name", existing_type=sa.String(), nullable=False)
+            batch.alter_column("tags", existing_type=sa.JSON(), nullable=False)
+            batch.alter_column("service", existing_type=sa.String(), nullable=False)
+            batch.drop_column("series_id")
+            batch.create_index(f"ix_{table}_name_service_ts", ["name", "service", "ts"])
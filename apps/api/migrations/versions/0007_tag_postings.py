@@ -0,0 +1,75 @@
+"""tag postings
+
+Revision ID: 0007_tag_postings
+Revises: 0006_metricpoint_series
+Create Date: 2026-10-18 00:00:00.000000
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007_tag_postings"
+down_revision = "0006_metricpoint_series"
+branch_labels = None
+depends_on = None
+
+PARTITION_RE = re.compile(r"^(logposting|spanposting)_\d{8}$")
+MAX_TERM_LENGTH = 200
+
+series = sa.table("series", sa.column("id", sa.Integer()), sa.column("tags", sa.JSON()))
+seriesposting = sa.table(
+    "seriesposting", sa.column("tag", sa.String()), sa.column("ref_id", sa.Integer())
+)
+
+
+def tag_terms(tags: dict | None) -> list[str]:
+    terms = []
+    for key, value in (tags or {}).items():
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        elif value is None or isinstance(value, (dict, list)):
+            continue
+        term = f"{key}:{value}"
+        if len(term) <= MAX_TERM_LENGTH:
+            terms.append(term)
+    return terms
+
+
+def upgrade() -> None:
+    op.create_table(
+        "seriesposting",
+        sa.Column("tag", sa.String(), primary_key=True),
+        sa.Column("ref_id", sa.Integer(), primary_key=True),
+        sqlite_with_rowid=False,
+    )
+    for name in ("logposting", "spanposting"):
+        op.create_table(
+            name,
+            sa.Column("tag", sa.String(), primary_key=True),
+            sa.Column("ref_id", sa.Integer(), primary_key=True),
+            sa.Column("ts", sa.DateTime(), nullable=False),
+            sqlite_with_rowid=False,
+        )
+        op.create_index(f"ix_{name}_ref_id", name, ["ref_id"])
+    # existing series get their postings; logs and spans are indexed from
+    # here on
+    bind = op.get_bind()
+    postings = [
+        {"tag": term, "ref_id": series_id}
+        for series_id, tags in bind.execute(sa.select(series.c.id, series.c.tags))
+        for term in tag_terms(tags)
+    ]
+    if postings:
+        bind.execute(seriesposting.insert(), postings)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    for name in sa.inspect(bind).get_table_names():
+        if PARTITION_RE.match(name):
+            op.drop_table(name)
+    for name in ("spanposting", "logposting"):
+        op.drop_index(f"ix_{name}_ref_id", table_name=name)
+        op.drop_table(name)
+    op.drop_table("seriesposting")
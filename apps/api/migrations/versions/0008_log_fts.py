@@ -0,0 +1,64 @@
+"""log full-text index
+
+Revision ID: 0008_log_fts
+Revises: 0007_tag_postings
+Create Date: 2026-10-18 00:00:00.000000
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008_log_fts"
+down_revision = "0007_tag_postings"
+branch_labels = None
+depends_on = None
+
+LOG_TABLE_RE = re.compile(r"^logevent(_\d{8})?$")
+
+
+def log_tables(bind) -> list[str]:
+    return sorted(name for name in sa.inspect(bind).get_table_names() if LOG_TABLE_RE.match(name))
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    for name in log_tables(bind):
+        if bind.dialect.name == "postgresql":
+            op.execute(
+                f"CREATE INDEX IF NOT EXISTS ix_{name}_message_fts ON {name} "
+                "USING gin (to_tsvector('simple', message))"
+            )
+            continue
+        fts = f"{name}_fts"
+        insert = f"INSERT INTO {fts}(rowid, message) VALUES (new.id, new.message);"
+        delete = (
+            f"INSERT INTO {fts}({fts}, rowid, message) VALUES ('delete', old.id, old.message);"
+        )
+        op.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"message, content='{name}', content_rowid='id', prefix='2 3')"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {name} BEGIN {insert} END"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {name} BEGIN {delete} END"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF message ON {name} "
+            f"BEGIN {delete} {insert} END"
+        )
+        # index the messages already stored
+        op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    for name in log_tables(bind):
+        if bind.dialect.name == "postgresql":
+            op.execute(f"DROP INDEX IF EXISTS ix_{name}_message_fts")
+            continue
+        for suffix in ("ai", "ad", "au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {name}_fts_{suffix}")
+        op.execute(f"DROP TABLE IF EXISTS {name}_fts")
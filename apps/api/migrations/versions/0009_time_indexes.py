@@ -0,0 +1,41 @@
+"""time indexes for keyset paging
+
+Revision ID: 0009_time_indexes
+Revises: 0008_log_fts
+Create Date: 2026-10-18 00:00:00.000000
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009_time_indexes"
+down_revision = "0008_log_fts"
+branch_labels = None
+depends_on = None
+
+# base table -> (time column, table name pattern covering its daily partitions)
+TIME_COLUMNS = {
+    "logevent": ("ts", re.compile(r"^logevent(_\d{8})?$")),
+    "span": ("start_ts", re.compile(r"^span(_\d{8})?$")),
+}
+
+
+def indexes(bind) -> list[tuple[str, str, str]]:
+    names = sorted(sa.inspect(bind).get_table_names())
+    return [
+        (f"ix_{name}_{column}", name, column)
+        for column, pattern in TIME_COLUMNS.values()
+        for name in names
+        if pattern.match(name)
+    ]
+
+
+def upgrade() -> None:
+    for index, table, column in indexes(op.get_bind()):
+        op.create_index(index, table, [column])
+
+
+def downgrade() -> None:
+    for index, table, _column in indexes(op.get_bind()):
+        op.drop_index(index, table_name=table)
@@ -0,0 +1,86 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+from apps.api.app import models  # noqa: F401
+from apps.api.app.main import app
+from apps.api.app.routes import query
+from apps.api.app.services.partitions import partition_router
+from apps.api.app.services.series_registry import series_registry
+from apps.api.app.services.service_registry import service_registry
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session(engine):
+    with Session(engine) as session:
+        service_registry.load(session)
+        series_registry.clear()
+        yield session
+
+
+@pytest.fixture
+def client(engine, session, monkeypatch):
+    # query routes read from the test engine instead of the app database
+    @contextmanager
+    def read_session():
+        with Session(engine) as read:
+            yield read
+
+    monkeypatch.setattr(query, "get_read_session", read_session)
+    monkeypatch.setattr(query, "read_engine", engine)
+    monkeypatch.setattr(query.settings, "stream_chunk_rows", 2)
+    return TestClient(app)
+
+
+@pytest.fixture
+def partitioned(session):
+    partition_router.enabled = True
+    partition_router.load(session)
+    yield partition_router
+    partition_router.enabled = False
+    partition_router.load(session)
+
+
+# row factories shared by the storage tests; import them from here
+def metric_rows(
+    ts: datetime, n: int, step: timedelta = timedelta(0), tags: dict | None = None
+) -> list[dict]:
+    return [
+        {
+            "name": "cpu.util",
+            "ts": ts + step * i,
+            "value": float(i),
+            "tags": dict(tags or {}),
+            "service": "web",
+        }
+        for i in range(n)
+    ]
+
+
+def log_rows(ts: datetime, hosts: list[str]) -> list[dict]:
+    return [
+        {
+            "ts": ts + timedelta(seconds=i),
+            "service": "web",
+            "level": "info",
+            "message": f"m{i}",
+            "attrs": {"host": host, "env": "prod" if i % 2 else "dev", "ctx": {"a": 1}},
+        }
+        for i, host in enumerate(hosts)
+    ]
@@ -0,0 +1,29 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from apps.api.app.config import Settings
+from apps.api.app.db import build_engines
+
+
+def test_sqlite_profile(tmp_path):
+    settings = Settings(database_url=f"sqlite:///{tmp_path}/watchdog.db")
+    write_engine, read_engine = build_engines(settings)
+    assert write_engine is not read_engine
+    with write_engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+        assert conn.exec_driver_sql("PRAGMA temp_store").scalar() == 2
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        conn.commit()
+    with read_engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("INSERT INTO t VALUES (1)"))
+
+
+def test_profile_disabled_shares_engine(tmp_path):
+    settings = Settings(
+        database_url=f"sqlite:///{tmp_path}/watchdog.db", sqlite_tuning_enabled=False
+    )
+    write_engine, read_engine = build_engines(settings)
+    assert write_engine is read_engine
@@ -1,6 +1,6 @@
 import pytest
 
-from apps.api.app.utils.dogstatsd import parse_line, DogstatsdParseError
+from apps.api.app.utils.dogstatsd import parse_batch, parse_line, DogstatsdParseError
 
 
 def test_parse_line_basic():
@@ -14,3 +14,35 @@ def test_parse_line_basic():
 def test_parse_line_invalid():
     with pytest.raises(DogstatsdParseError):
         parse_line("nope")
+
+
+def test_parse_batch_columns():
+    batch = parse_batch(b"cpu.util:0.5|g|#service:web\n\nreq:2|c|@0.5|#service:web\nusers:bob|s\n")
+    assert batch.names == ["cpu.util", "req", "users"]
+    assert list(batch.values) == [0.5, 2.0, 0.0]
+    assert list(batch.sample_rates) == [1.0, 0.5, 1.0]
+    assert batch.tagset_ids[0] == batch.tagset_ids[1]
+    assert batch.tagsets[batch.tagset_ids[0]] == {"service": "web"}
+    assert batch.value(2) == "bob"
+    assert [row["service"] for row in batch.rows()] == ["web", "web", "unknown"]
+
+
+def test_parse_batch_strict_reports_line():
+    with pytest.raises(DogstatsdParseError, match="line 2"):
+        parse_batch("a:1|c\nnope\n")
+
+
+def test_parse_batch_lenient_collects_errors():
+    batch = parse_batch("a:1|c\nnope\nb:x|g\nc:1|c", strict=False)
+    assert batch.names == ["a", "c"]
+    assert batch.rejected == 2
+    assert batch.errors == [(2, "invalid format"), (3, "invalid value")]
+
+
+@pytest.mark.parametrize("value", ["nan", "inf", "-inf", "NaN", "infinity"])
+def test_non_finite_values_rejected(value):
+    with pytest.raises(DogstatsdParseError, match="invalid value"):
+        parse_line(f"x:{value}|g")
+    batch = parse_batch(f"a:1|c\nx:{value}|g", strict=False)
+    assert batch.names == ["a"]
+    assert batch.errors == [(2, "invalid value")]
@@ -0,0 +1,58 @@
+from datetime import datetime
+
+import pytest
+
+from apps.api.app.services.dogstatsd_agg import DogstatsdAggregator
+from apps.api.app.utils.dogstatsd import parse_line, DogstatsdParseError
+
+
+def flush(lines: list[str]) -> dict[str, float]:
+    aggregator = DogstatsdAggregator()
+    for line in lines:
+        aggregator.add(parse_line(line))
+    return {row["name"]: row["value"] for row in aggregator.flush(datetime(2026, 1, 1))}
+
+
+def test_parse_line_type_and_sample_rate():
+    parsed = parse_line("req.count:2|c|@0.5|#service:web")
+    assert parsed["type"] == "c"
+    assert parsed["sample_rate"] == 0.5
+    assert parsed["service"] == "web"
+    assert parse_line("users:alice|s")["value"] == "alice"
+    with pytest.raises(DogstatsdParseError):
+        parse_line("req.count:1|x")
+    with pytest.raises(DogstatsdParseError):
+        parse_line("req.count:1|c|@2")
+
+
+def test_counter_sums_scaled_by_sample_rate():
+    assert flush(["req:1|c", "req:2|c|@0.5", "req:1|c"]) == {"req": 6.0}
+
+
+def test_gauge_keeps_last_value_per_tagset():
+    aggregator = DogstatsdAggregator()
+    for line in ["temp:1|g|#host:a", "temp:5|g|#host:a", "temp:3|g|#host:b"]:
+        aggregator.add(parse_line(line))
+    rows = aggregator.flush()
+    assert sorted(row["value"] for row in rows) == [3.0, 5.0]
+
+
+def test_set_counts_distinct_members():
+    assert flush(["users:a|s", "users:b|s", "users:a|s"]) == {"users": 2.0}
+
+
+def test_timer_summary():
+    lines = [f"latency:{i}|ms" for i in range(1, 101)]
+    assert flush(lines) == {
+        "latency.count": 100.0,
+        "latency.avg": 50.5,
+        "latency.max": 100.0,
+        "latency.95percentile": 95.0,
+    }
+
+
+def test_flush_resets_state():
+    aggregator = DogstatsdAggregator()
+    aggregator.add(parse_line("req:1|c"))
+    assert len(aggregator.flush()) == 1
+    assert aggregator.flush() == []
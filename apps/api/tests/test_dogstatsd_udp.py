@@ -0,0 +1,18 @@
+from sqlmodel import Session
+
+from apps.api.app.services.dogstatsd_udp import DogstatsdProtocol
+from apps.api.app.services.ingest_queue import IngestQueue
+
+
+def test_datagram_with_several_metrics(engine):
+    protocol = DogstatsdProtocol(IngestQueue(lambda: Session(engine)))
+    protocol.datagram_received(b"cpu.util:0.5|g|#service:web\nbad\nreq.count:1|c\n", ("", 0))
+    assert protocol.stats() == {"packets": 1, "points": 2, "parse_errors": 1, "dropped": 0}
+
+
+def test_datagram_dropped_when_queue_full(engine):
+    protocol = DogstatsdProtocol(IngestQueue(lambda: Session(engine), maxsize=1))
+    protocol.datagram_received(b"a:1|c", ("", 0))
+    protocol.datagram_received(b"a:1|c\nb:2|c", ("", 0))
+    assert protocol.stats()["points"] == 1
+    assert protocol.stats()["dropped"] == 2
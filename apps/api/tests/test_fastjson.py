@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+from apps.api.app.services.ingest_writer import write_rows
+from apps.api.app.utils import fastjson
+from apps.api.app.utils.fastjson import dumps, to_columns
+
+START = datetime(2026, 1, 10)
+HEADERS = {"X-API-Key": "dev-watchdog-key"}
+
+
+def test_stdlib_fallback_matches_orjson(monkeypatch):
+    content = {"ts": START + timedelta(microseconds=5), "tags": {"host": "a"}, "v": [1.5, None]}
+    fast = dumps(content)
+    monkeypatch.setattr(fastjson, "orjson", None)
+    assert dumps(content) == fast
+    assert fast == b'{"ts":"2026-01-10T00:00:00.000005","tags":{"host":"a"},"v":[1.5,null]}'
+
+
+def test_non_finite_floats_encode_as_null(monkeypatch):
+    content = {"points": [(START, float("nan")), (START, float("inf"))], "min": float("-inf")}
+    expected = (
+        b'{"points":[["2026-01-10T00:00:00",null],["2026-01-10T00:00:00",null]],"min":null}'
+    )
+    assert dumps(content) == expected
+    monkeypatch.setattr(fastjson, "orjson", None)
+    assert dumps(content) == expected
+
+
+def test_to_columns():
+    assert to_columns(["ts", "value"], [(1, 2.0), (3, 4.0)]) == {"ts": [1, 3], "value": [2.0, 4.0]}
+    assert to_columns(["ts", "value"], []) == {"ts": [], "value": []}
+
+
+def test_column_layout_and_next_cursor(client, session):
+    points = [
+        {
+            "name": "cpu.util",
+            "service": "web",
+            "ts": START + timedelta(seconds=i),
+            "value": float(i),
+            "tags": {},
+        }
+        for i in range(3)
+    ]
+    logs = [
+        {
+            "ts": START + timedelta(seconds=i),
+            "service": "web",
+            "level": "info",
+            "message": f"m{i}",
+            "attrs": {},
+        }
+        for i in range(3)
+    ]
+    write_rows(session, "metric", points)
+    write_rows(session, "log", logs)
+    session.commit()
+
+    params = {"name": "cpu.util", "raw": "true", "layout": "columns"}
+    body = client.get("/api/v1/metrics/timeseries", params=params, headers=HEADERS).json()
+    assert body["points"]["value"] == [0.0, 1.0, 2.0]
+    assert body["points"]["ts"][0] == "2026-01-10T00:00:00"
+
+    first = client.get("/api/v1/logs/search", params={"limit": 2}, headers=HEADERS)
+    assert [log["message"] for log in first.json()] == ["m2", "m1"]
+    params = {"limit": 2, "layout": "columns", "cursor": first.headers["X-Next-Cursor"]}
+    rest = client.get("/api/v1/logs/search", params=params, headers=HEADERS)
+    assert rest.json()["message"] == ["m0"]
+    assert "X-Next-Cursor" not in rest.headers
@@ -0,0 +1,56 @@
+from datetime import datetime
+
+import pytest
+from sqlmodel import Session, func, select
+
+from apps.api.app.models import MetricPoint
+from apps.api.app.services.ingest_queue import IngestQueue, IngestQueueFull
+from apps.api.tests.conftest import metric_rows
+
+TS = datetime(2026, 1, 1)
+
+
+def test_group_commit_writes_all_batches(engine, session):
+    ingest_queue = IngestQueue(lambda: Session(engine), max_batches=8, flush_interval_sec=0.01)
+    ingest_queue.start()
+    for _ in range(20):
+        ingest_queue.submit("metric", metric_rows(TS, 5))
+    ingest_queue.flush()
+    ingest_queue.stop()
+    assert session.exec(select(func.count()).select_from(MetricPoint)).one() == 100
+    stats = ingest_queue.stats()
+    assert stats["batches_written"] == 20
+    assert stats["rows_written"] == 100
+    assert stats["commits"] < 20
+    assert stats["commit_latency_ms"]["max"] >= stats["commit_latency_ms"]["avg"]
+
+
+def test_submit_rejects_when_full(engine):
+    ingest_queue = IngestQueue(lambda: Session(engine), maxsize=1)
+    ingest_queue.submit("metric", metric_rows(TS, 1))
+    with pytest.raises(IngestQueueFull):
+        ingest_queue.submit("metric", metric_rows(TS, 1))
+    assert ingest_queue.stats()["rejected"] == 1
+    assert ingest_queue.stats()["depth"] == 1
+
+
+def test_failed_group_drops_only_bad_rows(engine, session):
+    ingest_queue = IngestQueue(lambda: Session(engine), max_batches=8, flush_interval_sec=0.05)
+    bad = metric_rows(TS, 3)
+    bad[1] = {**bad[1], "value": None}
+    committed = []
+    ingest_queue.submit("metric", metric_rows(TS, 5), lambda rows: committed.append(len(rows)))
+    ingest_queue.submit("metric", bad, lambda rows: committed.append(len(rows)))
+    ingest_queue.submit("metric", [bad[1]], lambda rows: committed.append(len(rows)))
+    ingest_queue.submit("metric", metric_rows(TS, 4), lambda rows: committed.append(len(rows)))
+    ingest_queue.start()
+    ingest_queue.flush()
+    ingest_queue.stop()
+    # the bad row is isolated; the rest of its batch and its group are stored
+    assert session.exec(select(func.count()).select_from(MetricPoint)).one() == 11
+    assert committed == [5, 2, 4]
+    stats = ingest_queue.stats()
+    assert stats["batches_written"] == 3
+    assert stats["rows_written"] == 11
+    assert stats["batches_dropped"] == 1
+    assert stats["rows_dropped"] == 2
@@ -0,0 +1,37 @@
+from fastapi.testclient import TestClient
+
+from apps.api.app.main import app
+
+HEADERS = {"X-API-Key": "dev-watchdog-key", "Content-Type": "text/plain"}
+
+
+def test_dogstatsd_bad_line_rejects_batch():
+    client = TestClient(app)
+    response = client.post("/api/v1/ingest/dogstatsd", headers=HEADERS, content="a:1|c\nbad")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "line 2: invalid format"
+
+
+def test_dogstatsd_partial_success():
+    client = TestClient(app)
+    response = client.post(
+        "/api/v1/ingest/dogstatsd?partial=true",
+        headers=HEADERS,
+        content="a:1|c\nbad\nb:x|g\nc:2|c",
+    )
+    assert response.status_code == 202
+    assert response.json() == {
+        "accepted": 2,
+        "rejected": 2,
+        "errors": [{"line": 2, "error": "invalid format"}, {"line": 3, "error": "invalid value"}],
+    }
+
+
+def test_dogstatsd_partial_rejects_non_finite_values():
+    client = TestClient(app)
+    response = client.post(
+        "/api/v1/ingest/dogstatsd?partial=true", headers=HEADERS, content="x:1|c\nbad\ny:nan|g"
+    )
+    assert response.status_code == 202
+    assert response.json()["accepted"] == 1
+    assert response.json()["rejected"] == 2
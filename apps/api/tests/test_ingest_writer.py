@@ -0,0 +1,25 @@
+from datetime import datetime
+
+import pytest
+from sqlmodel import select
+
+from apps.api.app.models import MetricPoint, Series, Service
+from apps.api.app.schemas import MetricPointIn
+from apps.api.app.services.ingest_writer import to_rows, write_rows
+
+
+@pytest.mark.parametrize("bulk", [True, False])
+def test_write_rows_metrics(session, bulk):
+    ts = datetime(2026, 1, 1)
+    payload = [
+        MetricPointIn(name="cpu.util", ts=ts, value=i, tags={"host": "a"}, service="web")
+        for i in range(3)
+    ]
+    write_rows(session, "metric", to_rows(payload), bulk=bulk)
+    session.commit()
+    points = session.exec(select(MetricPoint).order_by(MetricPoint.value)).all()
+    assert [p.value for p in points] == [0, 1, 2]
+    series = session.exec(select(Series)).one()
+    assert (series.name, series.service, series.tags) == ("cpu.util", "web", {"host": "a"})
+    assert {p.series_id for p in points} == {series.id}
+    assert session.exec(select(Service.name)).all() == ["web"]
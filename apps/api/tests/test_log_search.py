@@ -0,0 +1,164 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import inspect
+from sqlmodel import Session
+
+from apps.api.app.config import Settings
+from apps.api.app.main import app
+from apps.api.app.models import LogEvent
+from apps.api.app.services.ingest_writer import write_rows
+from apps.api.app.services.log_search import log_search_stmt
+from apps.api.app.services.retention import RetentionCompactor, build_policies
+from apps.api.app.services.trace_search import trace_search_stmt
+from apps.api.app.utils.cursor import CursorError, decode_cursor, encode_cursor
+from apps.api.app.utils.log_query import LogQueryError, parse_log_query, to_fts5, to_tsquery
+
+DAY = datetime(2026, 1, 10)
+MESSAGES = [
+    "connection reset by peer",
+    "reset connection pool",
+    "upstream timeout after 30s",
+    "upstream connection refused",
+    "cache miss for user_42",
+]
+
+
+def write_logs(session: Session, start: datetime, messages: list[str], service: str = "web"):
+    rows = [
+        {
+            "ts": start + timedelta(minutes=i),
+            "service": service,
+            "level": "info",
+            "message": message,
+            "attrs": {},
+        }
+        for i, message in enumerate(messages)
+    ]
+    write_rows(session, "log", rows)
+    session.commit()
+
+
+def search(session: Session, q: str, **kw) -> list[str]:
+    stmt = log_search_stmt("sqlite", q=q, **kw)
+    return [log["message"] for log in session.execute(stmt).mappings()]
+
+
+def test_query_translation():
+    node = parse_log_query('"conn reset"* OR (upstream AND time*) NOT refused')
+    assert to_fts5(node) == '("conn reset"* OR (("upstream" AND "time"*) NOT "refused"))'
+    assert to_tsquery(node) == "((conn <-> reset:*) | (((upstream) & (time:*)) & !(refused)))"
+    assert to_fts5(parse_log_query("user_42")) == '"user 42"'
+    for bad in ["", "NOT a", "(a", "a OR", '"a']:
+        with pytest.raises(LogQueryError):
+            parse_log_query(bad)
+
+
+def test_phrase_prefix_and_boolean_queries(session):
+    write_logs(session, DAY, MESSAGES)
+    assert search(session, '"connection reset"') == ["connection reset by peer"]
+    assert search(session, "connection reset") == ["reset connection pool", MESSAGES[0]]
+    assert search(session, "upstr* NOT refused") == ["upstream timeout after 30s"]
+    assert search(session, "timeout OR refused") == MESSAGES[3:1:-1]
+    assert search(session, "user_42") == ["cache miss for user_42"]
+    assert search(session, "connection", limit=1) == ["upstream connection refused"]
+    assert search(session, "connection", service="api") == []
+
+
+def test_rank_order_and_deletes(engine, session):
+    write_logs(session, DAY, ["reset", "reset reset reset", "something else reset later on"])
+    assert search(session, "reset", sort="rank")[0] == "reset reset reset"
+    assert search(session, "reset") == [
+        "something else reset later on",
+        "reset reset reset",
+        "reset",
+    ]
+    policies = build_policies(Settings(retention_log_days=1))
+    RetentionCompactor(lambda: Session(engine), policies, pause_sec=0).run(DAY + timedelta(days=2))
+    assert search(session, "reset") == []
+
+
+def test_search_spans_partitions(session, partitioned):
+    write_logs(session, DAY, MESSAGES[:2])
+    write_logs(session, DAY + timedelta(days=1), MESSAGES[2:4])
+    assert search(session, "connection") == [MESSAGES[3], MESSAGES[1], MESSAGES[0]]
+    assert search(session, "connection", start=DAY + timedelta(days=1)) == [MESSAGES[3]]
+    logs = LogEvent.__table__
+    partitioned.drop(session, logs, DAY.date(), partitioned.partition(logs, DAY.date()))
+    session.commit()
+    assert "logevent_20260110_fts" not in inspect(session.connection()).get_table_names()
+    assert "logevent_20260111_fts" in inspect(session.connection()).get_table_names()
+
+
+def pages(session: Session, stmt_for, ts_key: str, limit: int) -> list[list[tuple]]:
+    # walk the cursor chain the way a client following X-Next-Cursor would
+    result, cursor = [], None
+    while True:
+        rows = session.execute(stmt_for(limit + 1, cursor)).mappings().all()
+        result.append([(row[ts_key], row["id"]) for row in rows[:limit]])
+        if len(rows) <= limit:
+            return result
+        last = rows[limit - 1]
+        cursor = decode_cursor(encode_cursor(last[ts_key], last["id"]))
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(DAY, 42)) == (DAY, 42)
+    for token in ("", "not-a-cursor", encode_cursor(DAY, 1)[:-3]):
+        with pytest.raises(CursorError):
+            decode_cursor(token)
+
+    client = TestClient(app)
+    headers = {"X-API-Key": "dev-watchdog-key"}
+    for path in ("/api/v1/logs/search", "/api/v1/traces/search"):
+        assert client.get(path, params={"cursor": "nope"}, headers=headers).status_code == 400
+    params = {"q": "reset", "sort": "rank", "cursor": encode_cursor(DAY, 1)}
+    assert client.get("/api/v1/logs/search", params=params, headers=headers).status_code == 400
+
+
+def test_log_pages_cover_every_row_once(session, partitioned):
+    # equal timestamps across the page boundary fall back to the id tie-break
+    write_logs(session, DAY, ["a"] * 3 + ["b"] * 2)
+    write_logs(session, DAY, ["a"] * 2)
+    write_logs(session, DAY + timedelta(days=1), ["c"] * 4)
+    walked = pages(
+        session, lambda limit, cursor: log_search_stmt("sqlite", limit=limit, cursor=cursor),
+        "ts", 3,
+    )
+    # ids repeat across daily partitions, so a row is its (ts, id) pair
+    keys = [key for page in walked for key in page]
+    assert [len(page) for page in walked] == [3, 3, 3, 2]
+    assert len(set(keys)) == 11 and keys == sorted(keys, reverse=True)
+    text = pages(
+        session,
+        lambda limit, cursor: log_search_stmt("sqlite", q="a", limit=limit, cursor=cursor),
+        "ts", 2,
+    )
+    assert [len(page) for page in text] == [2, 2, 1]
+
+
+def test_trace_pages(session):
+    rows = [
+        {
+            "trace_id": f"t{i}",
+            "span_id": f"s{i}",
+            "parent_id": None,
+            "service": "web",
+            "name": "GET /",
+            "start_ts": DAY + timedelta(seconds=i // 2),
+            "duration_ms": 10 * i,
+            "status": "ok",
+            "tags": {},
+        }
+        for i in range(7)
+    ]
+    write_rows(session, "span", rows)
+    session.commit()
+    walked = pages(
+        session,
+        lambda limit, cursor: trace_search_stmt(service="web", limit=limit, cursor=cursor),
+        "start_ts", 3,
+    )
+    assert [len(page) for page in walked] == [3, 3, 1]
+    assert sorted(span_id for page in walked for _ts, span_id in page) == list(range(1, 8))
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from apps.api.app.services.ingest_writer import write_rows
+from apps.api.app.services.metric_query import aggregate, bucketed, parse_rollup
+
+START = datetime(2026, 1, 1)
+
+
+def test_parse_rollup():
+    assert parse_rollup("60s") == 60
+    assert parse_rollup("5m") == 300
+    assert parse_rollup("1h") == 3600
+    with pytest.raises(ValueError):
+        parse_rollup("5x")
+    with pytest.raises(ValueError):
+        parse_rollup("0m")
+
+
+def test_bucketed_rollups_in_sql(session):
+    rows = [
+        {
+            "name": "cpu.util",
+            "ts": START + timedelta(seconds=i),
+            "value": float(i % 60),
+            "tags": {},
+            "service": "web",
+        }
+        for i in range(600)
+    ]
+    rows.append({"name": "cpu.util", "ts": START, "value": 100.0, "tags": {}, "service": "api"})
+    write_rows(session, "metric", rows)
+    session.commit()
+    end = START + timedelta(minutes=10)
+    assert aggregate(session, "cpu.util", "web", START, end) == {
+        "avg": 29.5,
+        "min": 0.0,
+        "max": 59.0,
+        "count": 600,
+    }
+    series = bucketed(session, "cpu.util", "web", START, end, 300)
+    assert [bucket["ts"] for bucket in series] == [START, START + timedelta(minutes=5)]
+    assert [bucket["count"] for bucket in series] == [300, 300]
+    assert series[0]["max"] == 59.0
+
+
+def test_tag_filters_use_postings(session):
+    rows = [
+        {
+            "name": "cpu.util",
+            "ts": START + timedelta(seconds=i),
+            "value": float(i),
+            "tags": {"host": f"node{i % 3}", "region": "us%east"},
+            "service": "web",
+        }
+        for i in range(30)
+    ]
+    write_rows(session, "metric", rows)
+    session.commit()
+    end = START + timedelta(minutes=1)
+    assert aggregate(session, "cpu.util", "web", START, end, [["host:node1"]])["count"] == 10
+    assert aggregate(session, "cpu.util", None, START, end, [["region:us%east"]])["count"] == 30
+    assert aggregate(session, "cpu.util", None, START, end, [["region:us"]]) == {}
+    either = [["host:node1", "host:node2"]]
+    assert aggregate(session, "cpu.util", None, START, end, either)["count"] == 20
+    both = [["host:node1"], ["region:us%east"]]
+    assert aggregate(session, "cpu.util", None, START, end, both)["count"] == 10
+    assert aggregate(session, "cpu.util", None, START, end, [["host:node1"], ["host:node2"]]) == {}
+    # long enough to be answered from rollups, matched through series.tagset
+    day = aggregate(session, "cpu.util", "web", START, START + timedelta(hours=2), either)
+    assert day["count"] == 20
+
+
+def test_aggregate_empty(session):
+    assert aggregate(session, "missing", None, None, None) == {}
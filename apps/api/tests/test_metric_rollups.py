@@ -0,0 +1,110 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from pydantic import ValidationError
+from sqlmodel import Session, SQLModel, create_engine, func, select
+
+from apps.api.app.models import MetricPoint, MetricRollup
+from apps.api.app.schemas import MetricPointIn
+from apps.api.app.services.ingest_writer import write_rows
+from apps.api.app.services.metric_query import aggregate, bucketed, choose_resolution
+from apps.api.app.services.metric_rollups import floor_ts, update_rollups
+from apps.api.app.utils import sketch
+
+START = datetime(2026, 1, 1)
+STEP = timedelta(seconds=1)
+
+
+def rows(start: datetime, count: int, step: timedelta) -> list[dict]:
+    return [
+        {
+            "name": "cpu.util",
+            "ts": start + step * i,
+            "value": float(i % 10),
+            "tags": {"host": "a"},
+            "service": "web",
+        }
+        for i in range(count)
+    ]
+
+
+def test_floor_ts():
+    ts = datetime(2026, 1, 1, 13, 47, 31)
+    assert floor_ts(ts, 60) == datetime(2026, 1, 1, 13, 47)
+    assert floor_ts(ts, 3600) == datetime(2026, 1, 1, 13)
+    assert floor_ts(ts, 86400) == datetime(2026, 1, 1)
+
+
+def test_rollups_maintained_incrementally(session):
+    write_rows(session, "metric", rows(START, 30, timedelta(seconds=1)))
+    write_rows(session, "metric", rows(START + timedelta(seconds=30), 30, timedelta(seconds=1)))
+    session.commit()
+    rollups = session.exec(select(MetricRollup).order_by(MetricRollup.resolution)).all()
+    assert [rollup.resolution for rollup in rollups] == [60, 3600, 86400]
+    minute = rollups[0]
+    assert (minute.count, minute.sum, minute.min, minute.max) == (60, 270.0, 0.0, 9.0)
+    assert minute.tagset == '{"host":"a"}'
+    assert sketch.count(minute.sketch) == 60
+    assert abs(sketch.quantile(minute.sketch, 0.5) - 4.5) <= 0.5
+
+
+def test_choose_resolution():
+    assert choose_resolution(START, START + timedelta(minutes=5)) is None
+    assert choose_resolution(START, START + timedelta(hours=1)) == 60
+    assert choose_resolution(START, START + timedelta(days=7)) == 3600
+    assert choose_resolution(START, START + timedelta(days=90)) == 86400
+    assert choose_resolution(START, START + timedelta(days=7), rollup_sec=300) == 60
+    assert choose_resolution(None, START) is None
+
+
+def test_long_window_reads_rollups(session):
+    write_rows(session, "metric", rows(START, 7 * 24, timedelta(hours=1)))
+    session.commit()
+    end = START + timedelta(days=7)
+    assert aggregate(session, "cpu.util", "web", START, end)["count"] == 7 * 24
+    series = bucketed(session, "cpu.util", "web", START, end, 86400)
+    assert [bucket["count"] for bucket in series] == [24] * 7
+
+
+def test_concurrent_writers_merge_rollups(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'rollups.db'}", connect_args={"timeout": 30}
+    )
+    SQLModel.metadata.create_all(engine)
+
+    def writer(offset: int) -> None:
+        for i in range(5):
+            with Session(engine) as session:
+                point = rows(START + timedelta(seconds=offset + i), 1, STEP)[0]
+                update_rollups(session, [{**point, "value": float(offset + i)}])
+                session.commit()
+
+    threads = [threading.Thread(target=writer, args=(offset,)) for offset in range(0, 40, 5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with Session(engine) as session:
+        rollups = session.exec(select(MetricRollup).order_by(MetricRollup.resolution)).all()
+    assert [(rollup.resolution, rollup.count) for rollup in rollups] == [
+        (60, 40),
+        (3600, 40),
+        (86400, 40),
+    ]
+    assert all(sketch.count(rollup.sketch) == 40 for rollup in rollups)
+    assert (rollups[0].min, rollups[0].max, rollups[0].sum) == (0.0, 39.0, 780.0)
+    engine.dispose()
+
+
+def test_non_finite_point_does_not_sink_its_batch(session):
+    good, bad = rows(START, 2, STEP)
+    write_rows(session, "metric", [good, {**bad, "value": float("nan")}])
+    write_rows(session, "metric", [{**bad, "value": float("inf")}])
+    session.commit()
+    assert session.exec(select(func.count()).select_from(MetricPoint)).one() == 1
+    minute = session.exec(select(MetricRollup).where(MetricRollup.resolution == 60)).one()
+    assert (minute.count, minute.sum) == (1, 0.0)
+    assert sketch.count(minute.sketch) == 1
+    with pytest.raises(ValidationError):
+        MetricPointIn(**{**good, "value": float("nan")})
@@ -20,3 +20,9 @@ def test_parse_query_logs():
     assert query.source == "logs"
     assert query.metric is None
     assert query.filter_service == "api"
+
+
+def test_parse_query_tags():
+    query = parse_query("metric:avg(last_5m):cpu.util{service:web,host:b|host:a,env:prod}")
+    assert query.filter_service == "web"
+    assert query.filter_tags == [["host:a", "host:b"], ["env:prod"]]
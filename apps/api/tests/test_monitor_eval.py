@@ -0,0 +1,123 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+from apps.api.app.models import Alert, Monitor
+from apps.api.app.services import monitor_eval
+from apps.api.app.services.ingest_writer import write_rows
+from apps.api.app.services.monitor_eval import evaluate_monitor, evaluate_monitors, upsert_alerts
+
+
+@pytest.fixture
+def read_session(engine, monkeypatch):
+    @contextmanager
+    def session_factory():
+        with Session(engine) as session:
+            yield session
+
+    monkeypatch.setattr(monitor_eval, "get_read_session", session_factory)
+    monkeypatch.setattr(monitor_eval, "get_session", session_factory)
+
+
+def write_points(session: Session, values: dict[str, list[float]]) -> None:
+    now = datetime.utcnow()
+    rows = [
+        {
+            "name": "cpu.util",
+            "service": service,
+            "ts": now - timedelta(seconds=i),
+            "value": value,
+            "tags": {"host": service[0]},
+        }
+        for service, series in values.items()
+        for i, value in enumerate(series)
+    ]
+    write_rows(session, "metric", rows)
+    session.commit()
+
+
+def monitor(query: str, threshold: float, window: str = "5m", **kw) -> Monitor:
+    return Monitor(
+        name="m",
+        type="metric",
+        query=query,
+        threshold=threshold,
+        window=window,
+        severity="high",
+        **kw,
+    )
+
+
+def test_error_rate_is_one_aggregate(session, read_session):
+    now = datetime.utcnow()
+    levels = ["error", "ERROR", "info", "warn", "error"]
+    rows = [
+        {
+            "ts": now - timedelta(seconds=10 + i),
+            "service": "web" if i < 4 else "api",
+            "level": level,
+            "message": "m",
+            "attrs": {"host": "a" if i % 2 else "b"},
+        }
+        for i, level in enumerate(levels)
+    ]
+    # outside the window
+    rows.append({**rows[0], "ts": now - timedelta(hours=1)})
+    write_rows(session, "log", rows)
+    session.commit()
+
+    result = evaluate_monitor(monitor("logs:error_rate(5m){service:web}", 0.4))
+    assert result == {"value": 0.5, "triggered": True}
+    result = evaluate_monitor(monitor("logs:error_rate(5m){host:a}", 0.4))
+    assert result == {"value": 0.5, "triggered": True}
+    result = evaluate_monitor(monitor("logs:error_rate(5m){service:db}", 0.4))
+    assert result == {"value": 0.0, "triggered": False}
+
+
+def test_metric_average(session, read_session):
+    write_points(session, {"web": [10.0, 20.0, 60.0]})
+    result = evaluate_monitor(monitor("metric:avg(5m):cpu.util{service:web}", 25.0))
+    assert result == {"value": 30.0, "triggered": True}
+
+
+def test_single_monitor_raises_on_bad_query(read_session):
+    with pytest.raises(ValueError):
+        evaluate_monitor(monitor("metric:avg(5m):cpu.util", 25.0))
+    with pytest.raises(ValueError):
+        evaluate_monitor(monitor("metric:avg(5m):cpu.util{}", 25.0, window="5d"))
+    assert evaluate_monitors([monitor("metric:avg(5m):cpu.util", 25.0)]) == [None]
+
+
+def test_batch_shares_one_scan_per_group(engine, session, read_session):
+    write_points(session, {"web": [10.0, 30.0], "api": [50.0], "db": [90.0]})
+    monitors = [
+        monitor(f"metric:avg(5m):cpu.util{{service:{service}}}", 25.0)
+        for service in ["web", "api", "db", "web", "missing"] * 100
+    ]
+    monitors += [
+        monitor("metric:avg(5m):cpu.util{}", 25.0),
+        monitor("metric:avg(5m):cpu.util{host:w|host:a}", 25.0),
+        monitor("metric:avg(5m):cpu.util{}", 25.0, window="1h"),
+        monitor("not a query", 1.0),
+    ]
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    results = evaluate_monitors(monitors)
+    # one GROUP BY per (metric, window, tags) group: all services, host tags, 1h window
+    assert sum("GROUP BY" in statement for statement in statements) == 3
+    assert [result["value"] for result in results[:5]] == [20.0, 50.0, 90.0, 20.0, 0.0]
+    assert [result["value"] for result in results[-4:-1]] == [45.0, 30.0, 45.0]
+    assert results[-1] is None
+
+
+def test_upsert_alerts_fires_and_resolves(engine, session, read_session):
+    firing, quiet = monitor("q", 1.0, id=1), monitor("q", 1.0, id=2)
+    upsert_alerts(
+        [(firing, {"value": 2.0, "triggered": True}), (quiet, {"value": 0.0, "triggered": False})]
+    )
+    upsert_alerts([(firing, {"value": 0.5, "triggered": False})])
+    alerts = session.exec(select(Alert)).all()
+    assert [(alert.monitor_id, alert.status) for alert in alerts] == [(1, "resolved")]
@@ -0,0 +1,104 @@
+import random
+
+from apps.api.app.models import Monitor
+from apps.api.app.services.monitor_scheduler import MonitorScheduler
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def monitor(id: int, window: str = "5m", severity: str = "medium") -> Monitor:
+    return Monitor(
+        id=id,
+        name=f"m{id}",
+        type="metric",
+        query="metric:avg(5m):cpu.util{}",
+        threshold=1.0,
+        window=window,
+        severity=severity,
+    )
+
+
+def scheduler(clock: Clock, jitter: float = 0.1) -> MonitorScheduler:
+    return MonitorScheduler(5, 300, jitter=jitter, clock=clock, rng=random.Random(7))
+
+
+def run(sched: MonitorScheduler, clock: Clock, until: float, step: float = 1.0) -> dict:
+    runs: dict[int, int] = {}
+    while clock.now < until:
+        clock.now += step
+        batch = sched.take_due()
+        for schedule in batch:
+            runs[schedule.monitor.id] = runs.get(schedule.monitor.id, 0) + 1
+        sched.finish(batch)
+    return runs
+
+
+def test_interval_follows_window_and_severity():
+    sched = scheduler(Clock())
+    assert sched.interval(monitor(1)) == 30
+    assert sched.interval(monitor(1, severity="critical")) == 7.5
+    assert sched.interval(monitor(1, window="1m", severity="critical")) == 5
+    assert sched.interval(monitor(1, window="1h", severity="low")) == 300
+    assert sched.interval(monitor(1, window="bogus")) == 300
+
+
+def test_severe_monitors_run_more_often_and_spread_out():
+    clock = Clock()
+    sched = scheduler(clock)
+    monitors = [monitor(index, severity="high") for index in range(50)]
+    monitors.append(monitor(100, severity="low"))
+    sched.sync(monitors)
+    first = [schedule.due for schedule in sched._schedules.values()]
+    # the first round lands anywhere in each monitor's interval, not at once
+    assert len({round(due) for due in first}) > 10
+    runs = run(sched, clock, clock.now + 600)
+    assert 35 <= runs[0] <= 45
+    assert 9 <= runs[100] <= 11
+    assert sched.stats()["max_lag_sec"] < 1.0
+
+
+def test_running_monitor_skips_its_turn():
+    clock = Clock()
+    sched = scheduler(clock, jitter=0.0)
+    sched.sync([monitor(1)])
+    clock.now = sched.next_due()
+    batch = sched.take_due()
+    assert [schedule.monitor.id for schedule in batch] == [1]
+    # still evaluating when it comes due again
+    clock.now += 31
+    assert sched.take_due() == []
+    sched.finish(batch)
+    stats = sched.stats()
+    assert stats["skipped"] == 1
+    assert stats["per_monitor"][1]["duration_sec"] == 31
+    assert stats["per_monitor"][1]["runs"] == 1
+    clock.now += 30
+    assert [schedule.monitor.id for schedule in sched.take_due()] == [1]
+
+
+def test_lagging_monitor_reports_lag_without_catching_up():
+    clock = Clock()
+    sched = scheduler(clock, jitter=0.0)
+    sched.sync([monitor(1)])
+    clock.now = sched.next_due() + 100
+    assert len(sched.take_due()) == 1
+    assert sched.stats()["per_monitor"][1]["lag_sec"] == 100
+    assert sched.next_due() == clock.now + 30
+
+
+def test_sync_drops_deleted_and_reschedules_edited_monitors():
+    clock = Clock()
+    sched = scheduler(clock)
+    sched.sync([monitor(1), monitor(2)])
+    sched.sync([monitor(1, severity="critical")])
+    assert sched.stats()["per_monitor"].keys() == {1}
+    assert sched.stats()["per_monitor"][1]["interval_sec"] == 7.5
+    assert sched.next_due() <= clock.now + 7.5
+    runs = run(sched, clock, clock.now + 60)
+    assert runs.keys() == {1}
@@ -0,0 +1,189 @@
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import Session, select
+
+from apps.api.app.models import Alert, Monitor
+from apps.api.app.services import ingest_writer
+from apps.api.app.services.ingest_writer import write_rows
+from apps.api.app.services.monitor_stream import Matcher, StreamingEvaluator
+from apps.api.app.services.monitor_eval import group_key
+from apps.api.app.utils.monitor_dsl import parse_query
+
+
+@pytest.fixture
+def stream(engine, monkeypatch):
+    @contextmanager
+    def session_factory():
+        with Session(engine) as session:
+            yield session
+
+    evaluator = StreamingEvaluator(session_factory, enabled=True)
+    monkeypatch.setattr(ingest_writer, "monitor_stream", evaluator)
+    return evaluator
+
+
+def logs(levels: list[str], service: str = "web", **attrs) -> list[dict]:
+    now = datetime.utcnow()
+    return [
+        {"ts": now, "service": service, "level": level, "message": "m", "attrs": attrs}
+        for level in levels
+    ]
+
+
+def alert_states(session: Session) -> list[tuple[int, str]]:
+    session.expire_all()
+    return [(alert.monitor_id, alert.status) for alert in session.exec(select(Alert))]
+
+
+def test_matcher_routes_rows_to_groups():
+    keys = {
+        group_key(parse_query(query), timedelta(minutes=5)): scope
+        for query, scope in [
+            ("metric:avg(5m):cpu.util{service:web}", frozenset({"web"})),
+            ("metric:avg(5m):cpu.util{host:a|host:b}", None),
+            ("logs:error_rate(5m){}", None),
+        ]
+    }
+    web, tagged, all_logs = keys
+    matcher = Matcher(keys)
+    row = {"name": "cpu.util", "service": "web", "tags": {"host": "a"}}
+    assert matcher.match("metric", row) == [web, tagged]
+    assert matcher.match("metric", {**row, "service": "api"}) == [tagged]
+    assert matcher.match("metric", {**row, "tags": {"host": "c"}}) == [web]
+    assert matcher.match("metric", {**row, "name": "mem"}) == []
+    assert matcher.match("log", {"service": "db", "attrs": {}}) == [all_logs]
+
+
+def test_alerts_fire_and_resolve_on_ingest(session, stream):
+    monitors = [
+        Monitor(
+            id=1,
+            name="errors",
+            type="logs",
+            query="logs:error_rate(5m){service:web}",
+            threshold=0.5,
+            window="5m",
+            severity="high",
+        ),
+        Monitor(
+            id=2,
+            name="tagged errors",
+            type="logs",
+            query="logs:error_rate(5m){region:eu}",
+            threshold=0.5,
+            window="5m",
+            severity="high",
+        ),
+    ]
+    write_rows(session, "log", logs(["info", "info"]))
+    session.commit()
+    # the first tick builds the windows and compiles the matcher
+    assert [result["triggered"] for result in stream.evaluate(monitors)] == [False, False]
+
+    write_rows(session, "log", logs(["error"] * 3))
+    assert alert_states(session) == [(1, "firing")]
+    write_rows(session, "log", logs(["error"] * 4, region="eu"))
+    session.commit()
+    assert alert_states(session) == [(1, "firing"), (2, "firing")]
+
+    write_rows(session, "log", logs(["info"] * 10, service="api"))
+    write_rows(session, "log", logs(["info"] * 10))
+    session.commit()
+    assert alert_states(session) == [(1, "resolved"), (2, "firing")]
+    assert stream.stats()["alerts_changed"] == 3
+
+    # the next tick reconciles against the database and agrees
+    results = stream.evaluate(monitors)
+    assert [result["value"] for result in results] == [7 / 19, 1.0]
+
+
+def test_rolled_back_batches_leave_windows_alone(session, stream):
+    monitor = Monitor(
+        id=1,
+        name="errors",
+        type="logs",
+        query="logs:error_rate(5m){}",
+        threshold=0.5,
+        window="5m",
+        severity="high",
+    )
+    stream.evaluate([monitor])
+    write_rows(session, "log", logs(["error"]))
+    session.rollback()
+    write_rows(session, "log", logs(["info"]))
+    session.commit()
+    assert alert_states(session) == []
+    assert stream.stats()["slices"] == 1
+    parts = next(iter(stream._groups.values())).parts()
+    assert parts == {"web": [(1, 0)]}
+
+
+def error_rate_monitor() -> Monitor:
+    return Monitor(
+        id=1,
+        name="errors",
+        type="logs",
+        query="logs:error_rate(5m){}",
+        threshold=0.5,
+        window="5m",
+        severity="high",
+    )
+
+
+def window_totals(stream: StreamingEvaluator) -> tuple[int, int]:
+    parts = next(iter(stream._groups.values())).parts()
+    return tuple(sum(part[i] for part in parts.get("web", [])) for i in (0, 1))
+
+
+def test_commit_during_window_read_is_counted_once(engine, session, stream, monkeypatch):
+    stream.evaluate([error_rate_monitor()])
+    original = stream._read
+
+    def read(*args):
+        rows = original(*args)
+        # an ingest commit lands after the read, before its merge
+        with Session(engine) as other:
+            write_rows(other, "log", logs(["error"] * 2))
+            other.commit()
+        return rows
+
+    write_rows(session, "log", logs(["info"] * 3))
+    session.commit()
+    monkeypatch.setattr(stream, "_read", read)
+    stream.evaluate([error_rate_monitor()])
+    assert window_totals(stream) == (5, 2)
+
+
+def test_window_read_waits_for_commit_in_flight(engine, session, stream, monkeypatch):
+    stream.evaluate([error_rate_monitor()])
+    applying, release = threading.Event(), threading.Event()
+    original = stream._apply
+
+    def slow_apply(pending):
+        # rows are committed, but their delta is not in the windows yet
+        applying.set()
+        release.wait(5)
+        original(pending)
+
+    monkeypatch.setattr(stream, "_apply", slow_apply)
+
+    def ingest():
+        with Session(engine) as other:
+            write_rows(other, "log", logs(["error"] * 3))
+            other.commit()
+
+    writer = threading.Thread(target=ingest)
+    writer.start()
+    assert applying.wait(5)
+    tick = threading.Thread(target=stream.evaluate, args=([error_rate_monitor()],))
+    tick.start()
+    tick.join(0.2)
+    # the read must not start before the commit's delta is applied
+    assert tick.is_alive()
+    release.set()
+    writer.join(5)
+    tick.join(5)
+    assert window_totals(stream) == (3, 3)
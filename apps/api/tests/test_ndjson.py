@@ -0,0 +1,82 @@
+import json
+from datetime import datetime, timedelta
+
+from apps.api.app.services.ingest_writer import write_rows
+from apps.api.app.utils.ndjson import encode_lines, wants_ndjson
+
+START = datetime(2026, 1, 10)
+HEADERS = {"X-API-Key": "dev-watchdog-key", "Accept": "application/x-ndjson"}
+
+
+def lines(response) -> list[dict]:
+    assert response.headers["content-type"] == "application/x-ndjson"
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_encode_lines_chunks():
+    rows = [{"ts": START, "n": i} for i in range(5)]
+    chunks = list(encode_lines(rows, 2))
+    assert len(chunks) == 3
+    assert chunks[0].splitlines()[1] == b'{"ts":"2026-01-10T00:00:00","n":1}'
+    assert wants_ndjson("application/json, application/x-ndjson")
+    assert not wants_ndjson(None)
+
+
+def test_stream_logs_traces_and_points(client, session):
+    logs = [
+        {
+            "ts": START + timedelta(seconds=i),
+            "service": "web",
+            "level": "info",
+            "message": f"request {i}",
+            "attrs": {},
+        }
+        for i in range(1500)
+    ]
+    spans = [
+        {
+            "trace_id": "t1",
+            "span_id": f"s{i}",
+            "parent_id": None,
+            "service": "web",
+            "name": "GET /",
+            "start_ts": START + timedelta(seconds=i),
+            "duration_ms": 5,
+            "status": "ok",
+            "tags": {},
+        }
+        for i in range(3)
+    ]
+    points = [
+        {
+            "name": "cpu.util",
+            "service": "web",
+            "ts": START + timedelta(seconds=i),
+            "value": float(i),
+            "tags": {},
+        }
+        for i in range(5)
+    ]
+    write_rows(session, "log", logs)
+    write_rows(session, "span", spans)
+    write_rows(session, "metric", points)
+    session.commit()
+
+    # streams are not capped at one JSON page
+    streamed = lines(client.get("/api/v1/logs/search", params={"q": "request"}, headers=HEADERS))
+    assert len(streamed) == 1500 and streamed[0]["message"] == "request 1499"
+    paged = client.get(
+        "/api/v1/logs/search", params={"limit": 1500}, headers={"X-API-Key": "dev-watchdog-key"}
+    )
+    assert paged.status_code == 400
+
+    streamed = lines(client.get("/api/v1/traces/search", params={"limit": 2}, headers=HEADERS))
+    assert [span["span_id"] for span in streamed] == ["s2", "s1"]
+    streamed = lines(client.get("/api/v1/traces/t1", headers=HEADERS))
+    assert [span["span_id"] for span in streamed] == ["s0", "s1", "s2"]
+
+    params = {"name": "cpu.util", "raw": "true", "rollup": "1m"}
+    streamed = lines(client.get("/api/v1/metrics/timeseries", params=params, headers=HEADERS))
+    assert [line["kind"] for line in streamed] == ["rollups", "series"] + ["points"] * 5
+    assert streamed[0]["count"] == 5
+    assert [line["value"] for line in streamed[2:]] == [0.0, 1.0, 2.0, 3.0, 4.0]
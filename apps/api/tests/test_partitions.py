@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import inspect
+from sqlmodel import Session, func, select
+
+from apps.api.app.config import Settings
+from apps.api.app.models import LogEvent, MetricPoint
+from apps.api.app.services.ingest_writer import write_rows
+from apps.api.app.services.metric_query import aggregate, raw_points
+from apps.api.app.services.retention import RetentionCompactor, build_policies
+from apps.api.tests.conftest import metric_rows
+
+DAY = datetime(2026, 1, 10)
+
+
+def test_rows_routed_to_daily_tables(session, partitioned):
+    write_rows(session, "metric", metric_rows(DAY, 3) + metric_rows(DAY + timedelta(days=1), 2))
+    session.commit()
+    tables = inspect(session.connection()).get_table_names()
+    assert {"metricpoint_20260110", "metricpoint_20260111"} <= set(tables)
+    assert "ix_metricpoint_20260110_series_ts" in {
+        index["name"] for index in inspect(session.connection()).get_indexes("metricpoint_20260110")
+    }
+    assert session.exec(select(func.count()).select_from(MetricPoint)).one() == 0
+    base = MetricPoint.__table__
+    assert [table.name for table in partitioned.tables(base, DAY, DAY)] == ["metricpoint_20260110"]
+
+
+def test_queries_read_overlapping_partitions(session, partitioned):
+    partitioned.enabled = False
+    write_rows(session, "metric", metric_rows(DAY, 1))
+    partitioned.enabled = True
+    write_rows(session, "metric", metric_rows(DAY + timedelta(minutes=10), 4))
+    write_rows(session, "metric", metric_rows(DAY + timedelta(days=3), 4))
+    session.commit()
+    end = DAY + timedelta(minutes=30)
+    assert aggregate(session, "cpu.util", "web", DAY, end)["count"] == 5
+    assert aggregate(session, "cpu.util", None, None, None)["count"] == 9
+    points = raw_points(session, "cpu.util", "web", DAY, end)
+    assert [point["value"] for point in points] == [0.0, 0.0, 1.0, 2.0, 3.0]
+
+
+def test_retention_drops_expired_partitions(engine, session, partitioned):
+    log = {"service": "web", "level": "info", "message": "hi", "attrs": {}}
+    write_rows(session, "log", [{**log, "ts": DAY}, {**log, "ts": DAY + timedelta(days=4)}])
+    session.commit()
+    compactor = RetentionCompactor(lambda: Session(engine), build_policies(Settings()))
+    report = compactor.run(DAY + timedelta(days=4, hours=12))
+    assert report["tables"]["logevent"] == {
+        "rows_deleted": 1,
+        "partitions_dropped": 1,
+        "seconds": report["tables"]["logevent"]["seconds"],
+    }
+    tables = set(inspect(session.connection()).get_table_names())
+    assert "logevent_20260110" not in tables
+    assert "logevent_20260114" in tables
+    assert [table.name for table in partitioned.tables(LogEvent.__table__)] == [
+        "logevent_20260114"
+    ]
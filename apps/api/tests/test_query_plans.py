@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import select
+
+from apps.api.app.models import Alert, LogEvent, MetricPoint, Span, SyntheticResult
+from apps.api.app.services.monitor_eval import log_error_stmt
+from apps.api.app.services.partitions import partition_router
+from apps.api.app.services.log_search import log_search_stmt
+from apps.api.app.services.trace_search import trace_search_stmt
+from apps.api.app.services.metric_query import (
+    aggregate_stmt,
+    bucket_stmt,
+    metric_filters,
+    series_stmt,
+)
+from apps.api.app.services.tag_index import posting_filter
+
+END = datetime(2026, 1, 1)
+START = END - timedelta(minutes=5)
+METRICS = MetricPoint.__table__
+TAGGED_LOGS = partition_router.source(
+    LogEvent.__table__, refine=[posting_filter(LogEvent.__table__, [["host:a"]])]
+)
+
+
+def query_plan(session, stmt) -> str:
+    compiled = stmt.compile(dialect=session.get_bind().dialect)
+    params = tuple(None for _ in compiled.positiontup)
+    rows = session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params)
+    return " | ".join(row[-1] for row in rows)
+
+
+CASES = [
+    (
+        "metrics_timeseries",
+        aggregate_stmt(METRICS, metric_filters(METRICS, "cpu.util", "web", START, END)),
+        "ix_metricpoint_series_ts",
+    ),
+    (
+        "metrics_timeseries rollup",
+        bucket_stmt(METRICS, metric_filters(METRICS, "cpu.util", "web", START, END), 60, "sqlite"),
+        "ix_metricpoint_series_ts",
+    ),
+    (
+        "series lookup",
+        series_stmt("cpu.util", "web", [["host:a"], ["env:prod"]]),
+        "sqlite_autoindex_series_1",
+    ),
+    (
+        "series tag postings",
+        series_stmt("cpu.util", "web", [["host:a"], ["env:prod"]]),
+        "seriesposting USING PRIMARY KEY (tag=?)",
+    ),
+    (
+        "search_logs by tag",
+        select(TAGGED_LOGS).where(TAGGED_LOGS.c.ts >= START),
+        "logposting USING PRIMARY KEY (tag=?)",
+    ),
+    (
+        "search_logs text",
+        log_search_stmt("sqlite", q='"connection reset"', service="web"),
+        "logevent_fts VIRTUAL TABLE INDEX",
+    ),
+    (
+        "search_logs ranked",
+        log_search_stmt("sqlite", q="timeout", sort="rank"),
+        "logevent_fts VIRTUAL TABLE INDEX",
+    ),
+    (
+        "search_logs page",
+        log_search_stmt("sqlite", limit=101, cursor=(END, 500)),
+        "ix_logevent_ts",
+    ),
+    (
+        "search_traces page",
+        trace_search_stmt(limit=101, cursor=(END, 500)),
+        "ix_span_start_ts",
+    ),
+    (
+        "evaluate_monitor metric",
+        select(MetricPoint).where(
+            MetricPoint.series_id == 1, MetricPoint.ts >= START, MetricPoint.ts <= END
+        ),
+        "ix_metricpoint_series_ts",
+    ),
+    (
+        "evaluate_monitor logs",
+        log_error_stmt(["web"], None, START, END),
+        "ix_logevent_service_ts",
+    ),
+    (
+        "evaluate_monitor logs, all services",
+        log_error_stmt(None, None, START, END),
+        "ix_logevent_ts",
+    ),
+    (
+        "search_logs by level",
+        select(LogEvent).where(LogEvent.level == "error", LogEvent.ts >= START),
+        "ix_logevent_level_ts",
+    ),
+    (
+        "trace_detail",
+        select(Span).where(Span.trace_id == "abc"),
+        "ix_span_trace_id",
+    ),
+    (
+        "search_traces",
+        select(Span).where(Span.service == "web", Span.start_ts >= START),
+        "ix_span_service_start_ts",
+    ),
+    (
+        "upsert_alert",
+        select(Alert).where(Alert.monitor_id == 1),
+        "ix_alert_monitor_id",
+    ),
+    (
+        "list_results",
+        select(SyntheticResult)
+        .where(SyntheticResult.check_id == 1)
+        .order_by(SyntheticResult.ts.desc())
+        .limit(20),
+        "ix_syntheticresult_check_id_ts",
+    ),
+]
+
+
+@pytest.mark.parametrize("route,stmt,index", CASES, ids=[case[0] for case in CASES])
+def test_route_uses_index(session, route, stmt, index):
+    plan = query_plan(session, stmt)
+    assert index in plan, plan
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+from sqlmodel import Session, func, select
+
+from apps.api.app.config import Settings
+from apps.api.app.models import LogEvent, MetricPoint, MetricRollup, Span
+from apps.api.app.services import ingest_writer
+from apps.api.app.services.ingest_writer import write_rows
+from apps.api.app.services.retention import (
+    RetentionCompactor,
+    RetentionPolicy,
+    build_policies,
+)
+from apps.api.tests.conftest import metric_rows
+
+NOW = datetime(2026, 2, 1)
+
+
+def count(session: Session, model) -> int:
+    return session.exec(select(func.count()).select_from(model)).one()
+
+
+def test_build_policies_skips_disabled():
+    settings = Settings(retention_log_days=0, metric_rollups_enabled=False)
+    policies = {policy.name: policy for policy in build_policies(settings)}
+    assert "logevent" not in policies
+    assert policies["metricpoint"].downsample
+    assert policies["metricrollup_1h"].resolution == 3600
+
+
+def test_compactor_deletes_in_chunks(engine, session):
+    write_rows(session, "metric", metric_rows(NOW - timedelta(days=10), 5))
+    write_rows(session, "metric", metric_rows(NOW - timedelta(days=1), 3))
+    log = {"service": "web", "level": "info", "message": "hi", "attrs": {}}
+    write_rows(
+        session,
+        "log",
+        [{**log, "ts": NOW - timedelta(days=5)}, {**log, "ts": NOW - timedelta(hours=1)}],
+    )
+    session.commit()
+    compactor = RetentionCompactor(
+        lambda: Session(engine),
+        build_policies(Settings(retention_rollup_1m_days=7)),
+        chunk_rows=2,
+        pause_sec=0,
+    )
+    report = compactor.run(NOW)
+    assert count(session, MetricPoint) == 3
+    assert count(session, LogEvent) == 1
+    assert report["tables"]["metricpoint"]["rows_deleted"] == 5
+    assert report["tables"]["logevent"]["rows_deleted"] == 1
+    # only the 1m rollup of the 10 day old points is past its retention
+    assert report["tables"]["metricrollup_1m"]["rows_deleted"] == 1
+    assert report["rows_deleted"] == 7
+    assert compactor.stats()["runs"] == 1
+
+
+def test_compactor_downsamples_before_expiry(engine, session, monkeypatch):
+    monkeypatch.setattr(ingest_writer.settings, "metric_rollups_enabled", False)
+    session.add_all(
+        Span(
+            trace_id="t",
+            span_id=str(i),
+            service="web",
+            name="GET /",
+            start_ts=NOW - timedelta(days=30),
+            duration_ms=5,
+            status="ok",
+        )
+        for i in range(3)
+    )
+    write_rows(session, "metric", metric_rows(NOW - timedelta(days=10), 4))
+    session.commit()
+    policies = [
+        RetentionPolicy("metricpoint", MetricPoint, "ts", timedelta(days=7), downsample=True),
+        RetentionPolicy("span", Span, "start_ts", timedelta(days=7)),
+    ]
+    RetentionCompactor(lambda: Session(engine), policies, chunk_rows=3, pause_sec=0).run(NOW)
+    assert count(session, MetricPoint) == 0
+    assert count(session, Span) == 0
+    hourly = session.exec(select(MetricRollup).where(MetricRollup.resolution == 3600)).one()
+    assert (hourly.count, hourly.sum, hourly.max) == (4, 6.0, 3.0)
@@ -0,0 +1,122 @@
+import math
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import Session, func, select
+
+from apps.api.app.models import MetricPoint, MetricSegment, Series
+from apps.api.app.services.ingest_writer import write_rows
+from apps.api.app.services import metric_query
+from apps.api.app.services.metric_query import aggregate, bucketed, raw_points
+from apps.api.app.services.segment_store import segment_store, to_micros
+from apps.api.app.utils.gorilla import decode_block, encode_block, iter_blocks
+from apps.api.tests.conftest import metric_rows
+
+START = datetime(2026, 1, 1)
+STEP = timedelta(seconds=10)
+HOST_A, HOST_B = {"host": "a"}, {"host": "b"}
+
+
+@pytest.fixture
+def store(tmp_path):
+    root, enabled = segment_store.root, segment_store.enabled
+    segment_store.root, segment_store.enabled = tmp_path, True
+    yield segment_store
+    segment_store.root, segment_store.enabled = root, enabled
+
+
+def test_gorilla_round_trip():
+    timestamps = [to_micros(START) + 10_000_000 * i + (i % 3) * 1000 for i in range(300)]
+    values = [0.0, 1.5, -2.25, math.inf, 1e-300, 42.0] * 50
+    block = encode_block(timestamps, values) + encode_block(timestamps[:1], values[:1])
+    buf = memoryview(block)
+    offsets = [offset for offset, _first, _last, _count in iter_blocks(buf, len(block))]
+    assert len(offsets) == 2
+    decoded_ts, decoded_values = decode_block(buf, offsets[0])
+    assert list(decoded_ts) == timestamps
+    assert list(decoded_values) == values
+    assert list(decode_block(buf, offsets[1])[1]) == values[:1]
+
+
+def test_seal_moves_points_into_segments(engine, session, store):
+    rows = metric_rows(START, 30, STEP, HOST_A) + metric_rows(START, 5, STEP, HOST_B)
+    write_rows(session, "metric", rows)
+    write_rows(session, "metric", metric_rows(START + timedelta(hours=1), 3, STEP, HOST_A))
+    session.commit()
+    sealed = store.seal(lambda: Session(engine), now=START + timedelta(minutes=30))
+    assert sealed == 35
+    assert session.exec(select(func.count()).select_from(MetricPoint)).one() == 3
+    assert session.exec(select(func.count()).select_from(Series)).one() == 2
+    segment = session.exec(select(MetricSegment).order_by(MetricSegment.id)).first()
+    assert (segment.count, segment.start_ts, segment.end_ts) == (
+        30,
+        START,
+        START + timedelta(seconds=290),
+    )
+    assert store.path(segment.day, segment.series_id).stat().st_size == segment.size
+
+    end = START + timedelta(minutes=59)
+    assert aggregate(session, "cpu.util", "web", START, end) == {
+        "avg": (sum(range(30)) + sum(range(5))) / 35,
+        "min": 0.0,
+        "max": 29.0,
+        "count": 35,
+    }
+    series = bucketed(session, "cpu.util", "web", START, START + timedelta(hours=2), 3600)
+    assert [bucket["count"] for bucket in series] == [35, 3]
+    points = raw_points(session, "cpu.util", "web", START, START + timedelta(seconds=20))
+    assert [(point["tags"]["host"], point["value"]) for point in points] == [
+        ("a", 0.0),
+        ("b", 0.0),
+        ("a", 1.0),
+        ("b", 1.0),
+        ("a", 2.0),
+        ("b", 2.0),
+    ]
+
+
+def test_aggregates_read_rollups_not_segments(engine, session, store, monkeypatch):
+    write_rows(session, "metric", metric_rows(START, 30, STEP, HOST_A))
+    session.commit()
+    store.seal(lambda: Session(engine), now=START + timedelta(hours=1))
+    scan = store.scan
+    monkeypatch.setattr(store, "scan", lambda *args: pytest.fail("decoded segments"))
+    end = START + timedelta(minutes=5)
+    assert aggregate(session, "cpu.util", "web", START, end)["count"] == 30
+    assert [b["count"] for b in bucketed(session, "cpu.util", "web", START, end, 60)] == [6] * 5
+    # without rollups the segments are the only copy of sealed points
+    monkeypatch.setattr(store, "scan", scan)
+    monkeypatch.setattr(metric_query.settings, "metric_rollups_enabled", False)
+    assert aggregate(session, "cpu.util", "web", START, end)["count"] == 30
+    assert len(raw_points(session, "cpu.util", "web", START, end)) == 30
+
+
+def test_appends_and_recovers_past_committed_size(engine, session, store):
+    write_rows(session, "metric", metric_rows(START, 4, STEP, HOST_A))
+    session.commit()
+    store.seal(lambda: Session(engine), now=START + timedelta(hours=1))
+    segment = session.exec(select(MetricSegment)).one()
+    path = store.path(segment.day, segment.series_id)
+    with path.open("ab") as handle:
+        handle.write(b"torn block")
+    store.recover(session)
+    assert path.stat().st_size == segment.size
+
+    write_rows(session, "metric", metric_rows(START + timedelta(minutes=1), 2, STEP, HOST_A))
+    session.commit()
+    store.seal(lambda: Session(engine), now=START + timedelta(hours=1))
+    session.refresh(segment)
+    assert segment.count == 6
+    assert aggregate(session, "cpu.util", "web", START, START + timedelta(minutes=5))["count"] == 6
+
+
+def test_expire_drops_whole_days(engine, session, store):
+    write_rows(session, "metric", metric_rows(START, 3, STEP, HOST_A))
+    write_rows(session, "metric", metric_rows(START + timedelta(days=1), 2, STEP, HOST_A))
+    session.commit()
+    store.seal(lambda: Session(engine), now=START + timedelta(days=2))
+    assert store.expire(session, START + timedelta(days=1, hours=6)) == 3
+    session.commit()
+    assert not (store.root / "20260101").exists()
+    assert (store.root / "20260102").exists()
+    assert session.exec(select(func.count()).select_from(MetricSegment)).one() == 1
@@ -0,0 +1,28 @@
+from sqlmodel import func, select
+
+from apps.api.app.models import Series
+from apps.api.app.services.series_registry import SeriesRegistry
+
+
+def row(host: str, **extra) -> dict:
+    return {"name": "cpu.util", "service": "web", "tags": {"host": host, **extra}}
+
+
+def test_resolve_interns_canonical_tagsets(session):
+    registry = SeriesRegistry()
+    ids = registry.resolve(session, [row("a", az="1"), row("b"), {**row("a"), "tags": {}}])
+    reordered = {"name": "cpu.util", "service": "web", "tags": {"az": "1", "host": "a"}}
+    same = registry.resolve(session, [reordered])
+    assert same[0] == ids[0]
+    assert len(set(ids)) == 3
+    assert session.exec(select(func.count()).select_from(Series)).one() == 3
+
+
+def test_cache_fills_after_commit_and_evicts(session):
+    registry = SeriesRegistry(capacity=2)
+    registry.resolve(session, [row("a"), row("b"), row("c")])
+    assert registry.stats()["size"] == 0
+    session.commit()
+    assert registry.stats()["size"] == 2
+    registry.resolve(session, [row("c")])
+    assert (registry.stats()["hits"], registry.stats()["misses"]) == (1, 3)
@@ -0,0 +1,33 @@
+from sqlmodel import select
+
+from apps.api.app.models import Service
+from apps.api.app.services.service_registry import ServiceRegistry
+
+
+def test_ensure_inserts_only_unknown_services(session):
+    session.add(Service(name="web", env="prod"))
+    session.commit()
+    registry = ServiceRegistry()
+    registry.load(session)
+    assert registry.ensure(session, ["web", "api", "api"]) == ["api"]
+    session.commit()
+    assert "api" in registry
+    assert registry.ensure(session, ["api", "web"]) == []
+    names = sorted(session.exec(select(Service.name)).all())
+    assert names == ["api", "web"]
+
+
+def test_ensure_tolerates_rows_created_elsewhere(session):
+    registry = ServiceRegistry()
+    session.add(Service(name="worker", env="prod"))
+    session.commit()
+    assert registry.ensure(session, ["worker"]) == ["worker"]
+    session.commit()
+    assert len(session.exec(select(Service)).all()) == 1
+
+
+def test_rolled_back_services_are_not_cached(session):
+    registry = ServiceRegistry()
+    registry.ensure(session, ["db"])
+    session.rollback()
+    assert "db" not in registry
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import inspect
+from sqlmodel import Session, func, select
+
+from apps.api.app.config import Settings
+from apps.api.app.models import LogEvent, LogPosting, Span, SpanPosting
+from apps.api.app.services.ingest_writer import write_rows
+from apps.api.app.services.partitions import partition_router
+from apps.api.app.services.retention import RetentionCompactor, build_policies
+from apps.api.app.services.tag_index import parse_tag_filter, posting_filter, tag_terms
+from apps.api.tests.conftest import log_rows
+
+DAY = datetime(2026, 1, 10)
+LOGS = LogEvent.__table__
+
+
+def search(session: Session, base, tags: list[str], start=None, end=None) -> list[str]:
+    refine = [posting_filter(base, parse_tag_filter(tags))]
+    source = partition_router.source(base, start, end, refine)
+    column = source.c.message if base is LOGS else source.c.span_id
+    return sorted(session.execute(select(column)).scalars())
+
+
+def test_parse_tag_filter_and_terms():
+    assert parse_tag_filter(["env:prod", "host:b|host:a", "ver:1:2"]) == [
+        ["env:prod"],
+        ["host:a", "host:b"],
+        ["ver:1:2"],
+    ]
+    with pytest.raises(ValueError):
+        parse_tag_filter(["host:a|oops"])
+    assert tag_terms({"a": 1, "b": True, "c": None, "d": [1], "e": "x" * 300}) == ["a:1", "b:true"]
+
+
+@pytest.mark.parametrize("bulk", [True, False])
+def test_logs_and_spans_filter_through_postings(session, bulk):
+    write_rows(session, "log", log_rows(DAY, ["a", "b", "a", "c"]), bulk=bulk)
+    span = {"trace_id": "t", "service": "web", "name": "GET /", "start_ts": DAY}
+    spans = [
+        {**span, "span_id": "s1", "duration_ms": 5, "status": "ok", "tags": {"route": "/a"}},
+        {**span, "span_id": "s2", "duration_ms": 9, "status": "error", "tags": {}},
+    ]
+    write_rows(session, "span", spans, bulk=bulk)
+    session.commit()
+    assert search(session, LOGS, ["host:a"]) == ["m0", "m2"]
+    assert search(session, LOGS, ["host:a|host:c"]) == ["m0", "m2", "m3"]
+    assert search(session, LOGS, ["host:a|host:c", "env:prod"]) == ["m3"]
+    assert search(session, LOGS, ["ctx:{'a': 1}"]) == []
+    assert search(session, Span.__table__, ["route:/a"]) == ["s1"]
+    assert session.exec(select(func.count()).select_from(SpanPosting)).one() == 1
+
+
+def test_postings_follow_partitions(engine, session, partitioned):
+    partitioned.enabled = False
+    write_rows(session, "log", log_rows(DAY, ["a", "b"]))
+    partitioned.enabled = True
+    write_rows(session, "log", log_rows(DAY, ["a"]) + log_rows(DAY + timedelta(days=1), ["a"]))
+    session.commit()
+    tables = set(inspect(session.connection()).get_table_names())
+    assert {"logposting_20260110", "logposting_20260111"} <= tables
+    # ids repeat across partitions; each partition reads its own postings
+    assert search(session, LOGS, ["host:a"]) == ["m0", "m0", "m0"]
+    assert search(session, LOGS, ["host:b"], DAY, DAY + timedelta(hours=1)) == ["m1"]
+
+    policies = build_policies(Settings(retention_log_days=1))
+    compactor = RetentionCompactor(lambda: Session(engine), policies, pause_sec=0)
+    compactor.run(DAY + timedelta(days=2, hours=1))
+    tables = set(inspect(session.connection()).get_table_names())
+    assert "logposting_20260110" not in tables
+    assert "logposting_20260111" in tables
+    assert session.exec(select(func.count()).select_from(LogPosting)).one() == 0
@@ -0,0 +1,39 @@
+"""DogStatsD parsing throughput: a parse_line loop vs parse_batch.
+
+Usage: python scripts/bench_dogstatsd.py [lines]
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from apps.api.app.utils.dogstatsd import parse_batch, parse_line  # noqa: E402
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    payload = "\n".join(
+        f"cpu.util:{i % 100 / 100}|g|#service:web,env:prod,host:node{i % 32}"
+        for i in range(count)
+    )
+
+    start = time.perf_counter()
+    lines = [line.strip() for line in payload.splitlines() if line.strip()]
+    points = [parse_line(line) for line in lines]
+    line_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = parse_batch(payload)
+    batch_elapsed = time.perf_counter() - start
+
+    assert len(batch) == len(points)
+    print(
+        f"parse_line loop: {count / line_elapsed:,.0f} lines/s, "
+        f"parse_batch: {count / batch_elapsed:,.0f} lines/s "
+        f"({line_elapsed / batch_elapsed:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
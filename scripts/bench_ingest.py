@@ -0,0 +1,61 @@
+"""Compare ORM and bulk Core ingest throughput.
+
+Usage: python scripts/bench_ingest.py
+"""
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlmodel import Session, SQLModel, create_engine  # noqa: E402
+
+from apps.api.app.schemas import MetricPointIn  # noqa: E402
+from apps.api.app.services.ingest_writer import to_rows, write_rows  # noqa: E402
+
+BATCH_SIZES = [1, 100, 10_000]
+POINTS_PER_RUN = 20_000
+
+
+def make_batch(size: int) -> list[MetricPointIn]:
+    now = datetime.utcnow()
+    return [
+        MetricPointIn(
+            name="cpu.util",
+            ts=now,
+            value=float(i),
+            tags={"service": "web", "host": f"node{i % 16}"},
+            service="web",
+        )
+        for i in range(size)
+    ]
+
+
+def run(bulk: bool, batch_size: int) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db")
+        SQLModel.metadata.create_all(engine)
+        batch = make_batch(batch_size)
+        batches = max(POINTS_PER_RUN // batch_size, 2)
+        start = time.perf_counter()
+        for _ in range(batches):
+            with Session(engine) as session:
+                write_rows(session, "metric", to_rows(batch), bulk=bulk)
+                session.commit()
+        elapsed = time.perf_counter() - start
+        engine.dispose()
+    return batches * batch_size / elapsed
+
+
+def main() -> None:
+    print(f"{'batch':>8} {'orm pts/s':>12} {'bulk pts/s':>12} {'speedup':>8}")
+    for size in BATCH_SIZES:
+        orm = run(False, size)
+        bulk = run(True, size)
+        print(f"{size:>8} {orm:>12.0f} {bulk:>12.0f} {bulk / orm:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
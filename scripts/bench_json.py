@@ -0,0 +1,84 @@
+"""Serialization cost per 10k points: the old model_dump + jsonable_encoder path
+vs the fast JSON layer (row and column layouts, orjson and stdlib fallback).
+
+Usage: python scripts/bench_json.py [points]
+"""
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from apps.api.app.models import MetricPoint  # noqa: E402
+from apps.api.app.services.metric_query import POINT_KEYS  # noqa: E402
+from apps.api.app.utils import fastjson  # noqa: E402
+from apps.api.app.utils.fastjson import dumps, to_columns  # noqa: E402
+
+START = datetime(2026, 1, 1)
+TAGS = {"host": "web-1", "env": "prod"}
+
+
+def make_rows(count: int) -> list[tuple]:
+    return [
+        (i, "cpu.util", START + timedelta(seconds=i), i * 0.5, TAGS, "web")
+        for i in range(count)
+    ]
+
+
+def per_10k(fn, count: int, repeat: int = 3) -> tuple[float, int]:
+    best, size = float("inf"), 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(fn())
+        best = min(best, time.perf_counter() - start)
+    return best * 1000 * 10_000 / count, size
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rows = make_rows(count)
+    models = [MetricPoint(id=row[0], series_id=1, ts=row[2], value=row[3]) for row in rows]
+    dicts = [dict(zip(POINT_KEYS, row)) for row in rows]
+
+    def stdlib(fn):
+        def run():
+            saved, fastjson.orjson = fastjson.orjson, None
+            try:
+                return fn()
+            finally:
+                fastjson.orjson = saved
+
+        return run
+
+    def old_path(items):
+        # what FastAPI did for a list return value before FastJSONResponse
+        body = jsonable_encoder(items)
+        return json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def as_dicts():
+        return dumps([dict(zip(POINT_KEYS, row)) for row in rows])
+
+    def as_columns():
+        return dumps(to_columns(POINT_KEYS, rows))
+
+    cases = [
+        ("model_dump + jsonable_encoder", lambda: old_path([m.model_dump() for m in models])),
+        ("dict rows + jsonable_encoder", lambda: old_path(dicts)),
+        ("fastjson, rows", as_dicts),
+        ("fastjson, columns", as_columns),
+        ("stdlib fallback, rows", stdlib(as_dicts)),
+        ("stdlib fallback, columns", stdlib(as_columns)),
+    ]
+    print(f"{count} points, orjson {'on' if fastjson.orjson else 'missing'}")
+    print(f"{'path':>30} {'ms/10k':>8} {'bytes/pt':>9}")
+    for label, fn in cases:
+        ms, size = per_10k(fn, count)
+        print(f"{label:>30} {ms:>8.1f} {size / count:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
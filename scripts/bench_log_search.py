@@ -0,0 +1,95 @@
+"""Log search latency: Python substring scan vs the full-text index.
+
+Usage: python scripts/bench_log_search.py [logs]
+"""
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlmodel import Session, SQLModel, create_engine, select  # noqa: E402
+
+from apps.api.app.models import LogEvent  # noqa: E402
+from apps.api.app.services.log_search import log_search_stmt  # noqa: E402
+
+START = datetime(2026, 1, 1)
+SERVICES = ["web", "api", "worker"]
+WORDS = "request served user cache miss hit queue job retry upstream latency ok".split()
+QUERIES = [
+    ("common word", "request", None),
+    ("rare phrase", '"connection reset"', None),
+    ("rare phrase, service", '"connection reset"', "web"),
+    ("prefix", "upstr*", None),
+    ("boolean", "cache AND (miss OR retry) NOT job", None),
+]
+
+
+def make_rows(count: int) -> list[dict]:
+    random.seed(7)
+    rows = []
+    for i in range(count):
+        words = random.sample(WORDS, 5)
+        if i % 10_000 == 0:
+            words.append("connection reset by peer")
+        rows.append(
+            {
+                "ts": START + timedelta(milliseconds=50 * i),
+                "service": SERVICES[i % len(SERVICES)],
+                "level": "error" if i % 50 == 0 else "info",
+                "message": " ".join(words) + f" id={i}",
+                "attrs": {},
+            }
+        )
+    return rows
+
+
+def substring_search(session: Session, q: str, service: str | None, limit: int) -> list:
+    # the previous implementation: load, filter and sort in Python
+    stmt = select(LogEvent)
+    if service:
+        stmt = stmt.where(LogEvent.service == service)
+    needle = q.strip('"*').split()[0].lower()
+    logs = [log for log in session.exec(stmt).all() if needle in log.message.lower()]
+    return sorted(logs, key=lambda log: log.ts, reverse=True)[:limit]
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db")
+        SQLModel.metadata.create_all(engine)
+        start = time.perf_counter()
+        with Session(engine) as session:
+            rows = make_rows(count)
+            for i in range(0, count, 50_000):
+                session.execute(LogEvent.__table__.insert(), rows[i : i + 50_000])
+            session.commit()
+        print(f"{count} logs indexed in {time.perf_counter() - start:.1f}s")
+        print(f"{'query':>22} {'scan ms':>9} {'fts time ms':>12} {'fts rank ms':>12}")
+        with Session(engine) as session:
+            for label, q, service in QUERIES:
+                scan = timed(lambda: substring_search(session, q, service, 100))
+                by_time, by_rank = (
+                    timed(
+                        lambda sort=sort: session.execute(
+                            log_search_stmt("sqlite", q=q, service=service, sort=sort)
+                        ).all()
+                    )
+                    for sort in ("time", "rank")
+                )
+                print(f"{label:>22} {scan:>9.1f} {by_time:>12.1f} {by_rank:>12.1f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
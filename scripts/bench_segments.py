@@ -0,0 +1,116 @@
+"""Bytes per point and scan speed: metricpoint rows vs Gorilla segments.
+
+Usage: python scripts/bench_segments.py [points]
+"""
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import func, text  # noqa: E402
+from sqlmodel import Session, SQLModel, create_engine, select  # noqa: E402
+
+from apps.api.app.models import MetricPoint, MetricSegment  # noqa: E402
+from apps.api.app.services.metric_query import series_stmt  # noqa: E402
+from apps.api.app.services.segment_store import SegmentStore  # noqa: E402
+from apps.api.app.services.series_registry import SeriesRegistry  # noqa: E402
+
+SERIES = 20
+START = datetime(2026, 1, 1)
+
+
+def make_rows(points: int) -> list[dict]:
+    random.seed(7)
+    rows = []
+    per_series = points // SERIES
+    for series in range(SERIES):
+        value = 50.0
+        for i in range(per_series):
+            value = round(max(0.0, value + random.uniform(-1, 1)), 2)
+            jitter = timedelta(microseconds=random.randint(0, 2000))
+            rows.append(
+                {
+                    "name": "cpu.util",
+                    "ts": START + timedelta(seconds=10 * i) + jitter,
+                    "value": value,
+                    "tags": {"host": f"node{series}", "region": "us-east-1"},
+                    "service": "web",
+                }
+            )
+    return rows
+
+
+def db_bytes(session: Session) -> int:
+    pages = session.execute(text("PRAGMA page_count")).scalar_one()
+    return pages * session.execute(text("PRAGMA page_size")).scalar_one()
+
+
+def main() -> None:
+    points = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rows = make_rows(points)
+    points = len(rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db")
+        SQLModel.metadata.create_all(engine)
+        store = SegmentStore(f"{tmp}/segments", enabled=True, seal_after_sec=0, chunk_rows=50_000)
+        with Session(engine) as session:
+            empty = db_bytes(session)
+            series_ids = SeriesRegistry().resolve(session, rows)
+            session.execute(
+                MetricPoint.__table__.insert(),
+                [
+                    {"series_id": series_id, "ts": row["ts"], "value": row["value"]}
+                    for series_id, row in zip(series_ids, rows)
+                ],
+            )
+            session.commit()
+            sql_bytes = db_bytes(session) - empty
+
+            start = time.perf_counter()
+            values = session.execute(
+                select(MetricPoint.ts, MetricPoint.value).where(
+                    MetricPoint.series_id.in_(series_stmt("cpu.util", "web"))
+                )
+            ).all()
+            sql_scan = time.perf_counter() - start
+            assert len(values) == points
+            start = time.perf_counter()
+            session.execute(
+                select(func.avg(MetricPoint.value)).where(
+                    MetricPoint.series_id.in_(series_stmt("cpu.util", "web"))
+                )
+            ).one()
+            sql_avg = time.perf_counter() - start
+
+        start = time.perf_counter()
+        store.seal(lambda: Session(engine), now=START + timedelta(days=30))
+        seal = time.perf_counter() - start
+        with Session(engine) as session:
+            segment_bytes = session.execute(select(func.sum(MetricSegment.size))).scalar_one()
+            start = time.perf_counter()
+            chunks = store.scan(session, series_stmt("cpu.util", "web"), None, None)
+            segment_scan = time.perf_counter() - start
+            assert sum(len(chunk_values) for _s, _t, chunk_values in chunks) == points
+            start = time.perf_counter()
+            sum(sum(chunk_values) for _s, _t, chunk_values in chunks)
+            segment_avg = segment_scan + time.perf_counter() - start
+        engine.dispose()
+
+    print(f"{points} points, {SERIES} series, sealed in {seal:.2f}s")
+    print(f"{'store':>9} {'bytes/point':>12} {'scan pts/s':>12} {'avg pts/s':>12}")
+    print(
+        f"{'sql':>9} {sql_bytes / points:>12.1f} "
+        f"{points / sql_scan:>12.0f} {points / sql_avg:>12.0f}"
+    )
+    print(
+        f"{'segments':>9} {segment_bytes / points:>12.1f} "
+        f"{points / segment_scan:>12.0f} {points / segment_avg:>12.0f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
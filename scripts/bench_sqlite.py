@@ -0,0 +1,87 @@
+"""Mixed read/write throughput with and without the SQLite profile.
+
+Usage: python scripts/bench_sqlite.py [seconds]
+"""
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import func  # noqa: E402
+from sqlmodel import Session, SQLModel, select  # noqa: E402
+
+from apps.api.app.config import Settings  # noqa: E402
+from apps.api.app.db import build_engines  # noqa: E402
+from apps.api.app.models import MetricPoint, Series  # noqa: E402
+
+READERS = 4
+BATCH = 100
+
+
+def run(tuned: bool, seconds: float) -> tuple[float, float, int]:
+    with tempfile.TemporaryDirectory() as tmp:
+        settings = Settings(database_url=f"sqlite:///{tmp}/bench.db", sqlite_tuning_enabled=tuned)
+        write_engine, read_engine = build_engines(settings)
+        SQLModel.metadata.create_all(write_engine)
+        with Session(write_engine) as session:
+            series = Series(name="cpu.util", service="web", tagset="{}", tags={})
+            session.add(series)
+            session.commit()
+            series_id = series.id
+        stop = threading.Event()
+        counts = {"rows": 0, "reads": 0, "read_errors": 0}
+
+        def writer() -> None:
+            table = MetricPoint.__table__
+            while not stop.is_set():
+                now = datetime.utcnow()
+                rows = [
+                    {"series_id": series_id, "ts": now, "value": i} for i in range(BATCH)
+                ]
+                with Session(write_engine) as session:
+                    session.execute(table.insert(), rows)
+                    session.commit()
+                counts["rows"] += BATCH
+
+        def reader() -> None:
+            while not stop.is_set():
+                since = datetime.utcnow() - timedelta(seconds=5)
+                try:
+                    with Session(read_engine) as session:
+                        session.exec(
+                            select(func.avg(MetricPoint.value)).where(
+                                MetricPoint.series_id == series_id,
+                                MetricPoint.ts >= since,
+                            )
+                        ).one()
+                    counts["reads"] += 1
+                except Exception:  # noqa: BLE001
+                    counts["read_errors"] += 1
+
+        threads = [threading.Thread(target=writer)]
+        threads += [threading.Thread(target=reader) for _ in range(READERS)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        write_engine.dispose()
+        read_engine.dispose()
+    return counts["rows"] / seconds, counts["reads"] / seconds, counts["read_errors"]
+
+
+def main() -> None:
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    print(f"{'profile':>8} {'write rows/s':>13} {'reads/s':>9} {'read errors':>12}")
+    for tuned in (False, True):
+        rows, reads, errors = run(tuned, seconds)
+        print(f"{'tuned' if tuned else 'default':>8} {rows:>13.0f} {reads:>9.0f} {errors:>12}")
+
+
+if __name__ == "__main__":
+    main()
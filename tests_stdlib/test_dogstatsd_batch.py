@@ -0,0 +1,20 @@
+import unittest
+
+from apps.api.app.utils.dogstatsd import parse_batch, parse_line
+
+LINES = 5_000
+
+
+class TestDogstatsdBatch(unittest.TestCase):
+    def test_parse_batch_matches_parse_line(self):
+        payload = "\n".join(
+            f"cpu.util:{i % 100 / 100}|g|#service:web,env:prod,host:node{i % 32}"
+            for i in range(LINES)
+        )
+        points = [parse_line(line) for line in payload.splitlines()]
+        batch = parse_batch(payload)
+
+        self.assertEqual(len(batch), len(points))
+        self.assertEqual(batch.names[-1], points[-1]["name"])
+        self.assertEqual(batch.values[-1], points[-1]["value"])
+        self.assertEqual(len(batch.tagsets), 33)